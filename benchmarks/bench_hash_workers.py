@@ -0,0 +1,72 @@
+# benchmarks/bench_hash_workers.py - Hashing pipeline speedup vs worker count
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+# Make the src modules importable when run from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from rich.console import Console
+from rich.table import Table
+
+from file_tracker import FileTracker
+
+console = Console()
+
+def build_tree(root: str, file_count: int, file_size: int) -> list:
+    """Create file_count files of file_size random bytes under root"""
+    paths = []
+    for i in range(file_count):
+        subdir = os.path.join(root, f"pkg{i % 16}")
+        os.makedirs(subdir, exist_ok=True)
+        relative_path = os.path.join(f"pkg{i % 16}", f"module_{i}.py")
+        with open(os.path.join(root, relative_path), 'wb') as f:
+            f.write(os.urandom(file_size))
+        paths.append(relative_path)
+    return paths
+
+def run_benchmark(file_count: int, file_size: int, worker_counts: list, repeats: int) -> None:
+    """Time FileTracker.hash_files for each worker count and print the speedup"""
+    root = tempfile.mkdtemp(prefix='ridge_bench_')
+    try:
+        paths = build_tree(root, file_count, file_size)
+        total_mb = file_count * file_size / (1024 * 1024)
+        console.print(f"[dim]{file_count} files, {total_mb:.0f} MB total, best of {repeats}[/dim]")
+        
+        table = Table(title="Hashing pipeline")
+        table.add_column("Workers", justify="right")
+        table.add_column("Seconds", justify="right")
+        table.add_column("MB/s", justify="right")
+        table.add_column("Speedup", justify="right", style="green")
+        
+        baseline = None
+        for workers in worker_counts:
+            # Paranoid mode bypasses the shared hash cache so every repeat reads the files
+            tracker = FileTracker(paranoid=True, hash_workers=workers)
+            best = float('inf')
+            for _ in range(repeats):
+                start = time.perf_counter()
+                tracker.hash_files(root, iter(paths))
+                best = min(best, time.perf_counter() - start)
+            
+            baseline = baseline or best
+            table.add_row(str(workers), f"{best:.3f}", f"{total_mb / best:.0f}", f"{baseline / best:.2f}x")
+        
+        console.print(table)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=400, help='Number of files to generate')
+    parser.add_argument('--size-kb', type=int, default=1024, help='Size of each file in KB')
+    parser.add_argument('--workers', default='1,2,4,8', help='Comma-separated worker counts')
+    parser.add_argument('--repeats', type=int, default=3, help='Runs per worker count (best is kept)')
+    args = parser.parse_args()
+    
+    run_benchmark(args.files, args.size_kb * 1024,
+                  [int(w) for w in args.workers.split(',')], args.repeats)
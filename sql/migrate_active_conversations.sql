@@ -0,0 +1,5 @@
+-- sql/migrate_active_conversations.sql
+-- Partial index over non-archived conversations for set-based reset/restore and active-context queries
+
+-- Long-lived projects archive most of their history; this index stays the size of the active context
+CREATE INDEX IF NOT EXISTS idx_conversations_active ON conversations (project_id, id) WHERE NOT archived;
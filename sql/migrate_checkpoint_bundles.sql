@@ -0,0 +1,9 @@
+-- sql/migrate_checkpoint_bundles.sql
+-- Migration script to store a compressed context bundle with each checkpoint
+
+ALTER TABLE checkpoints ADD COLUMN IF NOT EXISTS context_key VARCHAR(64);
+ALTER TABLE checkpoints ADD COLUMN IF NOT EXISTS context_bundle BYTEA;  -- zlib-compressed JSON
+
+-- Bundles are looked up by the state they were built from; older checkpoints simply have none
+CREATE INDEX IF NOT EXISTS idx_checkpoints_context_key ON checkpoints(project_id, context_key)
+    WHERE context_key IS NOT NULL;
@@ -0,0 +1,35 @@
+-- sql/migrate_conversation_summaries.sql
+-- Migration script for compacting old conversations into hierarchical summaries (ridge context compact)
+
+CREATE TABLE IF NOT EXISTS conversation_summaries (
+    id SERIAL PRIMARY KEY,
+    project_id INTEGER NOT NULL REFERENCES projects(id),
+    level INTEGER NOT NULL,  -- 1 = run of conversations, n+1 = run of level n summaries
+    parent_id INTEGER REFERENCES conversation_summaries(id),  -- NULL until folded into the next level
+    first_conversation_id INTEGER NOT NULL,
+    last_conversation_id INTEGER NOT NULL,
+    conversation_count INTEGER NOT NULL,
+    started_at TIMESTAMP,
+    ended_at TIMESTAMP,
+    summary TEXT NOT NULL,
+    token_count INTEGER,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_conversation_summaries_roots
+    ON conversation_summaries(project_id, level, first_conversation_id) WHERE parent_id IS NULL;
+
+-- Compacted conversations move here so the hot table only holds recent history
+CREATE TABLE IF NOT EXISTS conversations_archive (
+    id INTEGER PRIMARY KEY,  -- Original conversations.id
+    project_id INTEGER NOT NULL REFERENCES projects(id),
+    timestamp TIMESTAMP,
+    command VARCHAR(1024),
+    context_snapshot TEXT,
+    response TEXT,
+    archived BOOLEAN,
+    token_count INTEGER,
+    summary_id INTEGER REFERENCES conversation_summaries(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_conversations_archive_summary ON conversations_archive(summary_id);
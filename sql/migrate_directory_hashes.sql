@@ -0,0 +1,11 @@
+-- sql/migrate_directory_hashes.sql
+-- Migration script to store Merkle rollup hashes and mtimes per tracked directory
+
+CREATE TABLE IF NOT EXISTS directories_tracked (
+    id SERIAL PRIMARY KEY,
+    project_id INTEGER NOT NULL REFERENCES projects(id),
+    path VARCHAR(1024) NOT NULL,  -- '' is the project root
+    hash VARCHAR(64),  -- Rollup over child file and directory hashes
+    mtime_ns BIGINT,  -- Directory mtime when last walked
+    CONSTRAINT uq_directories_tracked_project_path UNIQUE (project_id, path)
+);
@@ -0,0 +1,16 @@
+-- sql/migrate_file_stat_cache.sql
+-- Migration script to store stat signatures for tracked files
+
+-- Size, mtime (ns) and inode let the tracker skip rehashing unchanged files
+ALTER TABLE files_tracked
+ADD COLUMN IF NOT EXISTS size BIGINT;
+
+ALTER TABLE files_tracked
+ADD COLUMN IF NOT EXISTS mtime_ns BIGINT;
+
+ALTER TABLE files_tracked
+ADD COLUMN IF NOT EXISTS inode BIGINT;
+
+-- Hashes were stored as SHA-256 hex digests by the ORM
+ALTER TABLE files_tracked
+ALTER COLUMN hash TYPE VARCHAR(64);
@@ -0,0 +1,24 @@
+-- sql/migrate_files_tracked_unique.sql
+-- Migration script to make (project_id, path) unique for bulk file sync upserts
+
+-- Remove duplicate tracking rows, keeping the most recent one per path
+DELETE FROM files_tracked older
+USING files_tracked newer
+WHERE older.project_id = newer.project_id
+  AND older.path = newer.path
+  AND older.id < newer.id;
+
+-- Unique constraint used by INSERT ... ON CONFLICT (project_id, path)
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'uq_files_tracked_project_path'
+    ) THEN
+        ALTER TABLE files_tracked
+        ADD CONSTRAINT uq_files_tracked_project_path UNIQUE (project_id, path);
+    END IF;
+END $$;
+
+-- The unique constraint's index covers (project_id, path) lookups
+DROP INDEX IF EXISTS idx_files_project_path;
+DROP INDEX IF EXISTS idx_files_tracked_project_path;
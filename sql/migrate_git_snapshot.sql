@@ -0,0 +1,12 @@
+-- sql/migrate_git_snapshot.sql
+-- Migration script to store per-project git snapshots for change detection
+
+-- HEAD commit, snapshot key and newline-separated dirty paths from the last sync
+ALTER TABLE projects
+ADD COLUMN IF NOT EXISTS snapshot_head VARCHAR(64);
+
+ALTER TABLE projects
+ADD COLUMN IF NOT EXISTS snapshot_key VARCHAR(64);
+
+ALTER TABLE projects
+ADD COLUMN IF NOT EXISTS snapshot_dirty TEXT;
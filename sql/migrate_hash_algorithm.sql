@@ -0,0 +1,10 @@
+-- sql/migrate_hash_algorithm.sql
+-- Migration script to record which algorithm produced each tracked file hash
+
+-- Digests from different algorithms never compare; the tracker rehashes rows
+-- whose algorithm differs from RIDGE_HASH_ALGORITHM instead
+ALTER TABLE files_tracked
+ADD COLUMN IF NOT EXISTS hash_algorithm VARCHAR(16);
+
+-- Rows written before this column existed were hashed with the SHA-256 default
+UPDATE files_tracked SET hash_algorithm = 'sha256' WHERE hash_algorithm IS NULL;
@@ -0,0 +1,20 @@
+-- sql/migrate_memory_fts.sql
+-- Full-text search for `ridge memory search`: generated tsvector columns plus GIN indexes
+
+-- Commands weigh more than responses, decisions more than their reasoning
+ALTER TABLE conversations
+ADD COLUMN IF NOT EXISTS search_vector tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(command, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(response, '')), 'B')
+) STORED;
+
+ALTER TABLE decisions
+ADD COLUMN IF NOT EXISTS search_vector tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(decision, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(reasoning, '')), 'B')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_conversations_search_vector ON conversations USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_decisions_search_vector ON decisions USING GIN (search_vector);
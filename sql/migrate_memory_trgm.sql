@@ -0,0 +1,10 @@
+-- sql/migrate_memory_trgm.sql
+-- Trigram indexes for `ridge memory search --mode trigram` (identifiers, partial paths, typos)
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- gin_trgm_ops serves both ILIKE '%term%' and the word-similarity operator <%
+CREATE INDEX IF NOT EXISTS idx_conversations_command_trgm ON conversations USING GIN (command gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_conversations_response_trgm ON conversations USING GIN (response gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_decisions_decision_trgm ON decisions USING GIN (decision gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_decisions_reasoning_trgm ON decisions USING GIN (reasoning gin_trgm_ops);
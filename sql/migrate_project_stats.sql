@@ -0,0 +1,35 @@
+-- sql/migrate_project_stats.sql
+-- Migration script to materialize per-project conversation counters for the logging hot path
+
+CREATE TABLE IF NOT EXISTS project_stats (
+    project_id INTEGER PRIMARY KEY REFERENCES projects(id),
+    conversation_count INTEGER NOT NULL DEFAULT 0,
+    active_conversation_count INTEGER NOT NULL DEFAULT 0,  -- Non-archived
+    token_total BIGINT NOT NULL DEFAULT 0,  -- Estimated tokens (~4 chars each), non-archived
+    tokens_since_checkpoint BIGINT NOT NULL DEFAULT 0,
+    latest_message_id INTEGER,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Seed existing projects; later rows are maintained by the application in each logging transaction.
+-- Token sums use the same per-row estimate as project_stats.conversation_tokens() (and the backfill in
+-- migrate_token_counts.sql), so seeded and rebuilt projects agree.
+INSERT INTO project_stats (project_id, conversation_count, active_conversation_count,
+                           token_total, tokens_since_checkpoint, latest_message_id)
+SELECT p.id,
+       COUNT(c.id),
+       COUNT(c.id) FILTER (WHERE NOT COALESCE(c.archived, FALSE)),
+       COALESCE(SUM((LENGTH(COALESCE(c.command, '')) + LENGTH(COALESCE(c.context_snapshot, '')) +
+                     LENGTH(COALESCE(c.response, ''))) / 4)
+                FILTER (WHERE NOT COALESCE(c.archived, FALSE)), 0),
+       COALESCE(SUM((LENGTH(COALESCE(c.command, '')) + LENGTH(COALESCE(c.context_snapshot, '')) +
+                     LENGTH(COALESCE(c.response, ''))) / 4)
+                FILTER (WHERE NOT COALESCE(c.archived, FALSE) AND c.id > COALESCE((
+                    SELECT message_id FROM checkpoints ck
+                    WHERE ck.project_id = p.id
+                    ORDER BY ck.timestamp DESC LIMIT 1), 0)), 0),
+       MAX(c.id)
+FROM projects p
+LEFT JOIN conversations c ON c.project_id = p.id
+GROUP BY p.id
+ON CONFLICT (project_id) DO NOTHING;
@@ -0,0 +1,17 @@
+-- sql/migrate_token_counts.sql
+-- Migration script to store per-row token counts computed at write time
+
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS token_count INTEGER;
+ALTER TABLE decisions ADD COLUMN IF NOT EXISTS token_count INTEGER;
+ALTER TABLE files_tracked ADD COLUMN IF NOT EXISTS token_count INTEGER;
+
+-- Existing rows get the old ~4 characters per token estimate; new rows are counted by the application tokenizer.
+-- Tracked files stay NULL until their content next changes (their text is not in the database).
+UPDATE conversations
+SET token_count = (LENGTH(COALESCE(command, '')) + LENGTH(COALESCE(context_snapshot, '')) +
+                   LENGTH(COALESCE(response, ''))) / 4
+WHERE token_count IS NULL;
+
+UPDATE decisions
+SET token_count = (LENGTH(COALESCE(decision, '')) + LENGTH(COALESCE(reasoning, ''))) / 4
+WHERE token_count IS NULL;
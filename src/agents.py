@@ -1,6 +1,11 @@
 import os
 from pathlib import Path
 
+from cache import MISS, get_cache
+
+# Attributes parsed out of an agent file, cached together
+AGENT_FIELDS = ('content', 'role', 'personality', 'response_style', 'specialties')
+
 class Agent:
     """Represents a single AI agent with personality and instructions"""
     
@@ -19,11 +24,22 @@ class Agent:
     def _load_agent_file(self):
         """Load and parse the .md agent configuration"""
         try:
+            # Keyed by size and mtime so an edited file is parsed again
+            stat = os.stat(self.filepath)
+            cache = get_cache()
+            key = f"agent:{os.path.abspath(self.filepath)}:{stat.st_mtime_ns}:{stat.st_size}"
+            cached = cache.get('agents', key)
+            if cached is not MISS:
+                for field in AGENT_FIELDS:
+                    setattr(self, field, cached[field])
+                return
+            
             with open(self.filepath, 'r', encoding='utf-8') as f:
                 self.content = f.read()
             
             # Parse sections (basic parsing for now)
             self._parse_sections()
+            cache.set(key, {field: getattr(self, field) for field in AGENT_FIELDS})
             
         except Exception as e:
             print(f"Error loading agent {self.name}: {e}")
@@ -2,6 +2,8 @@ import os
 from anthropic import Anthropic
 from dotenv import load_dotenv
 
+from context_packer import PackedContext
+
 # Load environment variables
 load_dotenv()
 
@@ -46,7 +48,9 @@ class RidgeAPI:
             # Get agent's system prompt
             system_prompt = agent.get_system_prompt()
             
-            # Add context if provided
+            # Add context if provided (packed context arrives already fitted to its budgets)
+            if isinstance(context, PackedContext):
+                context = context.context
             if context:
                 system_prompt += f"\n\nProject Context:\n{context}"
             
@@ -2,7 +2,7 @@ import os
 import shutil
 import datetime
 from pathlib import Path
-import hashlib
+from hashing import get_hasher
 
 class BackupManager:
     """Manages file backups before editing operations"""
@@ -44,9 +44,8 @@ class BackupManager:
         return backup_path
     
     def _get_file_hash(self, file_path):
-        """Get SHA-256 has of file content"""
-        with open(file_path,'rb') as f:
-            return hashlib.sha256(f.read()).hexdigest()
+        """Get content hash of file (shared, cached hashing service)"""
+        return get_hasher().hash_file(file_path)
     
     def list_backups(self, file_path=None):
         """List backups, optionally filtered by original file"""
@@ -0,0 +1,249 @@
+# src/cache.py - Redis cache tier with an in-process LRU fallback
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Optional, Set
+
+from rich.console import Console
+
+# Prefix for every key this module writes; create_cache adds the database's key after it
+KEY_PREFIX = 'ridge:'
+
+# Seconds between attempts to get back to Redis after an error
+RECONNECT_INTERVAL = 30.0
+
+# Returned by Cache.get when a key is not cached (None is a cacheable value)
+MISS = object()
+
+
+class LRUBackend:
+    """Bounded in-process store; counters (version keys) are never evicted"""
+
+    name = 'lru'
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+        self.counters: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            if key in self.counters:
+                return str(self.counters[key])
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def incr(self, key: str) -> int:
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+            return self.counters[key]
+
+
+class RedisBackend:
+    """Shared store in Redis, so every process sees the same entries and versions"""
+
+    name = 'redis'
+
+    def __init__(self, url: str):
+        import redis
+        self.client = redis.Redis.from_url(url, socket_connect_timeout=0.25, socket_timeout=0.5,
+                                           decode_responses=True)
+        self.ping()
+
+    def ping(self) -> None:
+        self.client.ping()
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        self.client.set(key, value, ex=ttl or None)
+
+    def incr(self, key: str) -> int:
+        return self.client.incr(key)
+
+
+class Cache:
+    """Read-through cache with per-project version keys
+
+    Entries for a project embed its current version in their key, so
+    bump_project() invalidates all of them at once: writers call it after
+    committing, and stale entries simply age out. Values are stored as JSON.
+    Keys are namespaced by database, so one Redis can serve several.
+    
+    A Redis error moves the process to a private LRU so the cache never
+    fails a command. Version bumps made meanwhile are still sent to Redis,
+    and queued when it is unreachable; they are replayed before the cache
+    goes back to Redis, so other processes never keep serving entries this
+    one invalidated.
+    """
+
+    def __init__(self, backend=None, ttl: int = 3600, fallback_entries: int = 512, namespace: str = ''):
+        self.fallback_entries = fallback_entries
+        self.backend = backend or LRUBackend(fallback_entries)
+        self.ttl = ttl
+        self.prefix = f"{KEY_PREFIX}{namespace}:" if namespace else KEY_PREFIX
+        self.error: Optional[str] = None
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+        self.lock = threading.Lock()
+        self.console = Console()
+
+        # Redis backend set aside after an error, and the bumps it has not seen yet
+        self.shared = None
+        self.reconnect_at = 0.0
+        self.pending_bumps: Set[str] = set()
+
+    def _call(self, operation: str, *args):
+        if self.shared is not None and time.monotonic() >= self.reconnect_at:
+            self._reconnect()
+        try:
+            return getattr(self.backend, operation)(*args)
+        except Exception as e:
+            if self.backend.name == 'lru':
+                raise
+            self._fall_back(e)
+            return getattr(self.backend, operation)(*args)
+
+    def _fall_back(self, error: Exception) -> None:
+        """Serve from a private LRU until Redis answers again"""
+        with self.lock:
+            self.error = str(error)
+            self.reconnect_at = time.monotonic() + RECONNECT_INTERVAL
+            if self.shared is None:
+                self.shared = self.backend
+                self.backend = LRUBackend(self.fallback_entries)
+
+    def _reconnect(self) -> None:
+        """Go back to Redis once it answers, after replaying the bumps it missed"""
+        shared = self.shared
+        if shared is None:
+            return
+        try:
+            shared.ping()
+            with self.lock:
+                pending = sorted(self.pending_bumps)
+            for key in pending:
+                shared.incr(key)
+        except Exception as e:
+            with self.lock:
+                self.error = str(e)
+                self.reconnect_at = time.monotonic() + RECONNECT_INTERVAL
+            return
+        with self.lock:
+            self.pending_bumps.difference_update(pending)
+            if self.shared is shared:
+                self.backend, self.shared = shared, None
+                self.error = None
+
+    def get(self, namespace: str, key: str) -> Any:
+        """Cached value for key, or MISS; counted per namespace"""
+        raw = self._call('get', self.prefix + key)
+        with self.lock:
+            if raw is None:
+                self.misses[namespace] += 1
+            else:
+                self.hits[namespace] += 1
+        return MISS if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self._call('set', self.prefix + key, json.dumps(value), self.ttl if ttl is None else ttl)
+
+    def get_or_load(self, namespace: str, key: str, loader: Callable[[], Any]) -> Any:
+        value = self.get(namespace, key)
+        if value is MISS:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def version(self, scope: str) -> int:
+        raw = self._call('get', f"{self.prefix}version:{scope}")
+        return int(raw) if raw else 0
+
+    def bump(self, scope: str) -> None:
+        key = f"{self.prefix}version:{scope}"
+        if self.shared is not None:
+            # Other processes may still read this scope from Redis, so retry now rather than when due
+            self._reconnect()
+        if self.shared is not None:
+            with self.lock:
+                first = not self.pending_bumps
+                self.pending_bumps.add(key)
+            if first:
+                self.console.print("[yellow]Redis unreachable; cache invalidations are queued until it "
+                                   "returns, and other processes may serve stale entries[/yellow]")
+        self._call('incr', key)
+
+    def project_key(self, project_id: int, kind: str, *parts: Any) -> str:
+        """Key under the project's current version, with parts hashed"""
+        digest = hashlib.sha1(json.dumps(parts, default=str).encode('utf-8')).hexdigest()
+        return f"{kind}:{project_id}:{self.version(f'project:{project_id}')}:{digest}"
+
+    def bump_project(self, project_id: int) -> None:
+        """Invalidate everything cached for a project"""
+        self.bump(f"project:{project_id}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'backend': self.backend.name,
+                'error': self.error,
+                'pending_invalidations': len(self.pending_bumps),
+                'hits': dict(self.hits),
+                'misses': dict(self.misses),
+            }
+
+
+def create_cache(kind: Optional[str] = None) -> Cache:
+    """Build the cache named by kind or RIDGE_CACHE ('auto', 'redis' or 'lru')
+
+    'auto' (the default) uses Redis at RIDGE_REDIS_URL when it answers and
+    the in-process LRU otherwise; 'redis' raises if Redis is unreachable.
+    RIDGE_CACHE_TTL bounds how long Redis keeps entries and
+    RIDGE_CACHE_SIZE how many the LRU holds. Keys are namespaced by the
+    configured database.
+    """
+    from database import database_key
+    kind = kind or os.getenv('RIDGE_CACHE', 'auto')
+    ttl = int(os.getenv('RIDGE_CACHE_TTL', '3600'))
+    entries = int(os.getenv('RIDGE_CACHE_SIZE', '512'))
+    namespace = database_key()
+    error = None
+    if kind in ('auto', 'redis'):
+        try:
+            return Cache(RedisBackend(os.getenv('RIDGE_REDIS_URL', 'redis://localhost:6379/0')), ttl, entries,
+                         namespace)
+        except Exception as e:
+            if kind == 'redis':
+                raise
+            error = str(e)
+    cache = Cache(LRUBackend(entries), ttl, entries, namespace)
+    cache.error = error
+    return cache
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Cache:
+    """Get the process-wide cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = create_cache()
+        return _cache
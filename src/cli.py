@@ -14,8 +14,9 @@ import difflib
 #local imports
 from agents import AgentManager
 from api import RidgeAPI
-from memory import MemoryManager
+from memory import MemoryManager, SEARCH_MODES
 from context import ContextManager
+from context_packer import ContextPacker
 from file_tracker import FileTracker
 from utils import get_file_hash
 from models import Project
@@ -156,6 +157,7 @@ def main(target, action, debug, explain, manager,code, deep, ultra, quick, inter
         agent_manager = AgentManager() 
         api = RidgeAPI()
         memory_manager = MemoryManager()
+        packer = ContextPacker.from_context_manager(ContextManager())
 
         # Ensure we have an active project
         if not memory_manager.current_project:
@@ -177,11 +179,16 @@ def main(target, action, debug, explain, manager,code, deep, ultra, quick, inter
             # Select agent based on flags
             agent = agent_manager.select_agent_from_flags(mode_flags)
             
+            # Fit the file and the project memory most relevant to it into the context budgets
+            context = memory_manager.get_context_for_ai(limit_conversations=20, query=f"{target}\n{file_content}",
+                                                        limit_decisions=10, limit_files=10)
+            packed = packer.pack(context, instructions=agent.get_system_prompt(), files={target: file_content})
+            
             # Build the analysis prompt
             prompt = f"""Please analyze this file: {target}
 
 File content:
-{file_content}
+{packed.files[target]}
 
 Please provide insights about:
 - Code structure and quality
@@ -197,13 +204,15 @@ File path: {target}
                 click.echo(f"\n[DRY RUN] Would analyze {target} with {agent.name} agent")
 
                 click.echo(f"Prompt preview: {prompt[:200]}...")
+                packer.display_report(packed)
                 return
 
             # Show what we're doing
             click.echo(f"\n🔍 Analyzing {target} with {agent.name} agent...")
+            console.print(f"[dim]{packer.summary(packed)}[/dim]")
 
             # Get AI response
-            response = api.chat_with_agent(agent, prompt, mode_flags)
+            response = api.chat_with_agent(agent, prompt, mode_flags, context=packed)
 
             # Display response with Rich formatting
             from rich.panel import Panel
@@ -238,26 +247,35 @@ File path: {target}
             from rich.syntax import Syntax
             import difflib
         
-        # Read current file content
-        file_content = read_file_content(target)
-        if file_content is None:
-            console.print(f"[red]Error: Could not read file {target}[/red]")
-            return
-        
-        # Select agent for editing
-        agent = agent_manager.select_agent_from_flags(mode_flags)
-        
-        # Create backup before editing
-        backup_manager = BackupManager()
-        try:
-            backup_path = backup_manager.create_backups(target)
-            console.print(f"[green]✅ Backup created:[/green] {backup_path}")
-        except Exception as e:
-            console.print(f"[red]❌ Backup failed:[/red] {e}")
-            return
-        
-        # Build edit prompt for AI
-        prompt = f"""Please suggest improvements for this file. Focus on:
+            # Read current file content
+            file_content = read_file_content(target)
+            if file_content is None:
+                console.print(f"[red]Error: Could not read file {target}[/red]")
+                return
+            
+            # Select agent for editing
+            agent = agent_manager.select_agent_from_flags(mode_flags)
+            
+            # The agent must see the whole file to return a complete improved version
+            context = memory_manager.get_context_for_ai(limit_conversations=20, query=f"{target}\n{file_content}",
+                                                        limit_decisions=10, limit_files=10)
+            packed = packer.pack(context, instructions=agent.get_system_prompt(), files={target: file_content})
+            if packed.truncated_files:
+                console.print(f"[red]Error: {target} does not fit the {packer.budgets['files']:,}-token file "
+                              f"budget; edit a smaller file or use analyze[/red]")
+                return
+            
+            # Create backup before editing
+            backup_manager = BackupManager()
+            try:
+                backup_path = backup_manager.create_backups(target)
+                console.print(f"[green]✅ Backup created:[/green] {backup_path}")
+            except Exception as e:
+                console.print(f"[red]❌ Backup failed:[/red] {e}")
+                return
+            
+            # Build edit prompt for AI
+            prompt = f"""Please suggest improvements for this file. Focus on:
 - Code quality and best practices
 - Performance optimizations  
 - Security improvements
@@ -269,46 +287,51 @@ Current file content:
 
 Please provide the complete improved version of the file, maintaining the same functionality but with your recommended improvements."""
 
-        # Get AI suggestions
-        console.print(f"\n[blue]🤖 {agent.name.title()} agent analyzing file for improvements...[/blue]")
-        
-        try:
-            response = api.chat_with_agent(agent, prompt, mode_flags)
-            
-            # Extract improved code from response (simple extraction for now)
-            improved_content = extract_code_from_response(response, file_content)
+            # Get AI suggestions
+            console.print(f"\n[blue]🤖 {agent.name.title()} agent analyzing file for improvements...[/blue]")
+            console.print(f"[dim]{packer.summary(packed)}[/dim]")
             
-            if improved_content and improved_content != file_content:
-                # Show side-by-side diff
-                show_diff_side_by_side(file_content, improved_content, target)
+            try:
+                response = api.chat_with_agent(agent, prompt, mode_flags, context=packed)
                 
-                # Get approval unless --allow-all is set
-                should_apply = allow_all
-                if not allow_all:
-                    should_apply = Confirm.ask(f"\n[yellow]Apply these changes to {target}?[/yellow]")
+                # Extract improved code from response (simple extraction for now)
+                improved_content = extract_code_from_response(response, file_content)
                 
-                if should_apply:
-                    if not dry_run:
-                        # Apply the changes
-                        with open(target, 'w', encoding='utf-8') as f:
-                            f.write(improved_content)
-                        console.print(f"[green]✅ File {target} updated successfully![/green]")
-                        
-                        # Log to memory
-                        memory_manager.log_conversation(
-                            command=f"edit {target} --{agent.name}",
-                            context_snapshot=file_content[:500] + "...",
-                            response=f"Applied improvements: {len(improved_content)} chars"
-                        )
+                if improved_content and improved_content != file_content:
+                    # Show side-by-side diff
+                    show_diff_side_by_side(file_content, improved_content, target)
+                    
+                    # Get approval unless --allow-all is set
+                    should_apply = allow_all
+                    if not allow_all:
+                        should_apply = Confirm.ask(f"\n[yellow]Apply these changes to {target}?[/yellow]")
+                    
+                    if should_apply:
+                        if not dry_run:
+                            # Apply the changes
+                            with open(target, 'w', encoding='utf-8') as f:
+                                f.write(improved_content)
+                            console.print(f"[green]✅ File {target} updated successfully![/green]")
+                            
+                            # Log to memory
+                            memory_manager.log_conversation(
+                                command=f"edit {target} --{agent.name}",
+                                context_snapshot=file_content[:500] + "...",
+                                response=f"Applied improvements: {len(improved_content)} chars"
+                            )
+                        else:
+                            console.print(f"[yellow]🔍 Dry run - changes not applied to {target}[/yellow]")
                     else:
-                        console.print(f"[yellow]🔍 Dry run - changes not applied to {target}[/yellow]")
+                        console.print(f"[yellow]⏭️  Changes not applied to {target}[/yellow]")
                 else:
-                    console.print(f"[yellow]⏭️  Changes not applied to {target}[/yellow]")
-            else:
-                console.print(f"[green]✅ No improvements suggested for {target}[/green]")
-                
-        except Exception as edit_error:
-            console.print(f"[red]❌ Error during editing: {edit_error}[/red]")
+                    console.print(f"[green]✅ No improvements suggested for {target}[/green]")
+                    
+            except Exception as edit_error:
+                console.print(f"[red]❌ Error during editing: {edit_error}[/red]")
+        
+        # Keep reacting to project file changes with the same agent
+        if watch and not dry_run:
+            _watch_files(target, agent, api, memory_manager, FileTracker(), mode_flags)
     
     except Exception as e:
         click.echo(f"Error during analysis: {str(e)}")
@@ -316,24 +339,31 @@ Please provide the complete improved version of the file, maintaining the same f
 
 def _watch_files(target, agent, api, memory_manager, file_tracker, flags):
     """Watch for file changes and respond automatically"""
-    import time
+    from watcher import create_watcher, RESCAN
     
-    if not memory_manager.current_project:
+    project = memory_manager.current_project
+    if not project:
         console.print("[red]Cannot watch files without an active project[/red]")
         return
     
-    last_check = datetime.now()
+    watcher = create_watcher(project.path, file_tracker)
+    console.print(f"\n[dim]Watching {project.path} ({watcher.mode}). Press Ctrl+C to stop.[/dim]")
     
     try:
         while True:
-            time.sleep(2)  # Check every 2 seconds
+            # Blocks while idle; bursts of events arrive as one debounced set
+            changed_paths = watcher.wait_for_changes()
+            
+            if changed_paths is RESCAN:
+                # Kernel event queue overflowed; fall back to a full stat sweep
+                changed_paths = [f['path'] for f in file_tracker.get_changed_files(project)]
             
-            # Get changed files
-            changed_files = file_tracker.get_changed_files(memory_manager.current_project)
+            # Update tracking for the affected rows only
+            changed_files = file_tracker.apply_changes(project, changed_paths)
             
             if changed_files:
                 console.print(f"\n[yellow]Detected {len(changed_files)} file changes[/yellow]")
-                file_tracker.display_file_changes(memory_manager.current_project)
+                file_tracker.display_file_changes(project, changed_files)
                 
                 # Auto-respond to changes
                 change_summary = ", ".join([f"{f['path']} ({f['status']})" for f in changed_files])
@@ -347,17 +377,11 @@ def _watch_files(target, agent, api, memory_manager, file_tracker, flags):
                     command=f"auto-watch: {change_summary}",
                     response=response
                 )
-                
-                # Update file tracking
-                for file_info in changed_files:
-                    if file_info['status'] != 'deleted':
-                        file_tracker.update_file_tracking(
-                            memory_manager.current_project, 
-                            file_info['path']
-                        )
             
     except KeyboardInterrupt:
         console.print("\n[dim]File watching stopped[/dim]")
+    finally:
+        watcher.close()
 
 # Memory commands group
 @cli.group()
@@ -396,10 +420,13 @@ def status():
 
 @memory.command()
 @click.argument('search_term')
-def search(search_term):
+@click.option('--mode', type=click.Choice(SEARCH_MODES), default='fts',
+              help='fts: ranked full-text ("phrase", prefix*); trigram: identifiers and typos; like: substring scan')
+@click.option('--limit', default=10, help='Maximum results per table')
+def search(search_term, mode, limit):
     """Search conversations and decisions"""
     memory_manager = MemoryManager()
-    memory_manager.search_memory(search_term)
+    memory_manager.search_memory(search_term, mode=mode, limit=limit)
 
 @memory.command()
 @click.argument('decision_text')
@@ -454,6 +481,33 @@ def reset_to(checkpoint_identifier):
     else:
         console.print("[red]No active project. Use 'ridge memory init [project]' first.[/red]")
 
+@context.command('restore-to')
+@click.argument('checkpoint_identifier')
+def restore_to(checkpoint_identifier):
+    """Undo a reset, restoring archived conversations up to a later checkpoint"""
+    memory_manager = MemoryManager()
+    context_manager = ContextManager()
+    
+    if memory_manager.current_project:
+        context_manager.set_current_project(memory_manager.current_project)
+        context_manager.restore_to_checkpoint(checkpoint_identifier)
+    else:
+        console.print("[red]No active project. Use 'ridge memory init [project]' first.[/red]")
+
+@context.command()
+@click.option('--older-than', default=30, help='Only compact conversations older than this many days')
+def compact(older_than):
+    """Fold old conversations into summaries and move them out of the hot table"""
+    from compaction import HistoryCompactor
+    
+    memory_manager = MemoryManager()
+    
+    if memory_manager.current_project:
+        compactor = HistoryCompactor()
+        compactor.display_compaction(compactor.compact(memory_manager.current_project, older_than))
+    else:
+        console.print("[red]No active project. Use 'ridge memory init [project]' first.[/red]")
+
 # File tracking commands group
 @cli.group()
 def files():
@@ -461,10 +515,14 @@ def files():
     pass
 
 @files.command()
-def sync():
+@click.option('--paranoid', is_flag=True, help='Rehash every file instead of trusting stat signatures')
+@click.option('--workers', type=int, help='Hashing threads (defaults to RIDGE_HASH_WORKERS or CPU count)')
+@click.option('--trust-dir-mtime', is_flag=True, help='Skip listing directories whose mtime is unchanged')
+def sync(paranoid, workers, trust_dir_mtime):
     """Synchronize project files with tracking database"""
     memory_manager = MemoryManager()
-    file_tracker = FileTracker()
+    file_tracker = FileTracker(paranoid=paranoid, hash_workers=workers,
+                               trust_dir_mtime=trust_dir_mtime or None)
     
     if memory_manager.current_project:
         console.print("[dim]Synchronizing project files...[/dim]")
@@ -480,13 +538,18 @@ def sync():
         console.print("[red]No active project. Use 'ridge memory init [project]' first.[/red]")
 
 @files.command()
-def changes():
+@click.option('--paranoid', is_flag=True, help='Rehash every file instead of trusting stat signatures')
+@click.option('--dirs', is_flag=True, help='Show changed directories by Merkle rollup hash')
+def changes(paranoid, dirs):
     """Show recent file changes"""
     memory_manager = MemoryManager()
-    file_tracker = FileTracker()
+    file_tracker = FileTracker(paranoid=paranoid)
     
     if memory_manager.current_project:
-        file_tracker.display_file_changes(memory_manager.current_project)
+        if dirs:
+            file_tracker.display_directory_changes(memory_manager.current_project)
+        else:
+            file_tracker.display_file_changes(memory_manager.current_project)
     else:
         console.print("[red]No active project. Use 'ridge memory init [project]' first.[/red]")
 
@@ -503,12 +566,11 @@ def health():
         db = Database()
         session = db.get_session()
         db.close_session(session)
-        console.print("[green]✓[/green] PostgreSQL connection: OK")
+        backend = 'SQLite' if db.engine.dialect.name == 'sqlite' else 'PostgreSQL'
+        console.print(f"[green]✓[/green] {backend} connection: OK")
+        console.print(f"  [dim]Pool: {db.engine.pool.status()}[/dim]")
     except Exception as e:
-        console.print(f"[red]✗[/red] PostgreSQL connection: FAILED - {e}")
-    
-    # Test Redis connection (if implemented)
-    console.print("[yellow]○[/yellow] Redis caching: Not implemented yet")
+        console.print(f"[red]✗[/red] Database connection: FAILED - {e}")
     
     # Check agent files
     try:
@@ -518,6 +580,21 @@ def health():
     except Exception as e:
         console.print(f"[red]✗[/red] Agent system: FAILED - {e}")
     
+    # Check the cache tier (after the agents, so their lookups show in the counters)
+    from cache import get_cache
+    stats = get_cache().stats()
+    if stats['backend'] == 'redis':
+        console.print("[green]✓[/green] Redis caching: OK")
+    else:
+        reason = f" (Redis unavailable: {stats['error']})" if stats['error'] else ""
+        console.print(f"[yellow]○[/yellow] Caching: in-process LRU{reason}")
+    if stats['pending_invalidations']:
+        console.print(f"  [yellow]{stats['pending_invalidations']} invalidation(s) waiting "
+                      f"for Redis; other processes may serve stale results[/yellow]")
+    for namespace in sorted(set(stats['hits']) | set(stats['misses'])):
+        console.print(f"  [dim]{namespace}: {stats['hits'].get(namespace, 0)} hits, "
+                      f"{stats['misses'].get(namespace, 0)} misses[/dim]")
+    
     # Check API
     try:
         api = RidgeAPI()
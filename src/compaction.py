@@ -0,0 +1,235 @@
+# src/compaction.py - Rolling compaction of old conversations into hierarchical summaries
+
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from rich.console import Console
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from cache import get_cache
+from database import Database
+from dialect import is_sqlite, lock_project
+from models import Conversation, ConversationArchive, ConversationSummary, Project
+from project_stats import rebuild_project_stats
+from tokenizer import count_tokens
+
+# Conversations per level 1 summary, and summaries folded into each higher-level one
+RUN_SIZE = 20
+FANOUT = 10
+
+# Token budget for each summary, whatever its level
+SUMMARY_TOKENS = 600
+
+# Longest summary line for one conversation
+SUMMARY_LINE_CHARS = 160
+
+# Serializes compaction per project (see dialect.lock_project)
+COMPACTION_LOCK = 4242
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+
+
+def summarize_conversation(command: Optional[str], response: Optional[str],
+                           max_chars: int = SUMMARY_LINE_CHARS) -> str:
+    """One summary line: the command and the first sentence of its response"""
+    text = ' '.join((response or '').split())
+    first_sentence = SENTENCE_END.split(text, 1)[0]
+    line = f"- {command or 'conversation'}: {first_sentence or 'No response'}"
+    if len(line) > max_chars:
+        line = line[:max_chars - 3].rstrip() + '...'
+    return line
+
+
+def merge_summaries(header: str, children: List[List[str]], budget: int = SUMMARY_TOKENS) -> str:
+    """Fold children (lists of lines, most important first) into one summary within budget
+
+    Lines are taken round-robin, so every child keeps its first line before
+    any child gets a second, and the result keeps the children's order.
+    """
+    spent = count_tokens(header)
+    taken = [0] * len(children)
+    depth = 0
+    full = False
+    while not full and any(depth < len(lines) for lines in children):
+        for index, lines in enumerate(children):
+            if depth < len(lines):
+                cost = count_tokens(lines[depth]) + 1
+                if spent + cost > budget:
+                    full = True
+                    break
+                spent += cost
+                taken[index] += 1
+        depth += 1
+    body = [line for lines, count in zip(children, taken) for line in lines[:count]]
+    return '\n'.join([header] + body)
+
+
+def summary_header(first_id: int, last_id: int, started_at: Optional[datetime],
+                   ended_at: Optional[datetime]) -> str:
+    span = ""
+    if started_at and ended_at:
+        span = f" ({started_at:%Y-%m-%d} to {ended_at:%Y-%m-%d})"
+    return f"Conversations {first_id}-{last_id}{span}:"
+
+
+class HistoryCompactor:
+    """Fold old conversations into summaries and move them out of the hot table
+
+    Runs of RUN_SIZE conversations older than the cutoff become level 1
+    summaries, and the rows move to conversations_archive. Every FANOUT
+    unfolded summaries at a level fold into one summary at the next level,
+    so the unfolded roots cover all compacted history in a bounded number
+    of records. Each run and fold is its own transaction and progress is
+    read back from the summaries, so an interrupted job resumes where it
+    stopped.
+    """
+
+    def __init__(self, run_size: int = RUN_SIZE, fanout: int = FANOUT):
+        self.console = Console()
+        self.db = Database()
+        self.run_size = run_size
+        self.fanout = fanout
+
+    def compact(self, project: Project, older_than_days: int = 30) -> Dict[str, int]:
+        """Compact a project's conversations older than the cutoff"""
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=older_than_days)
+        stats = {'conversations': 0, 'summaries': 0, 'folded': 0}
+
+        while True:
+            compacted = self._run_transaction(self._compact_next_run, project.id, cutoff)
+            if not compacted:
+                break
+            stats['conversations'] += compacted
+            stats['summaries'] += 1
+
+            # Fold upward as levels fill so the number of roots stays bounded
+            level = 1
+            while self._run_transaction(self._fold_level, project.id, level):
+                stats['folded'] += 1
+                level += 1
+
+        if stats['conversations']:
+            self._run_transaction(self._rebuild_stats, project.id)
+            get_cache().bump_project(project.id)
+        return stats
+
+    def _run_transaction(self, step, project_id: int, *args) -> int:
+        """Run one step under the project's compaction lock; returns its result (0 on error)"""
+        session = self.db.get_session()
+        try:
+            lock_project(session, COMPACTION_LOCK, project_id)
+            result = step(session, project_id, *args)
+            session.commit()
+            return result
+        except Exception as e:
+            session.rollback()
+            self.console.print(f"[red]Error compacting conversations: {e}[/red]")
+            return 0
+        finally:
+            self.db.close_session(session)
+
+    def _rebuild_stats(self, session: Session, project_id: int) -> int:
+        """Recount project_stats over the rows left in the hot table"""
+        rebuild_project_stats(session, project_id)
+        return 1
+
+    def _compact_next_run(self, session: Session, project_id: int, cutoff: datetime) -> int:
+        """Summarize and move the next full run of old conversations; returns its size"""
+        watermark = session.query(func.max(ConversationSummary.last_conversation_id)).filter(
+            ConversationSummary.project_id == project_id,
+            ConversationSummary.level == 1
+        ).scalar() or 0
+
+        run = session.query(
+            Conversation.id, Conversation.timestamp, Conversation.command, Conversation.response
+        ).filter(
+            Conversation.project_id == project_id,
+            Conversation.id > watermark
+        ).order_by(Conversation.id).limit(self.run_size).all()
+
+        # Only whole runs of old rows; a partial run waits for the next job
+        if len(run) < self.run_size or any(row.timestamp and row.timestamp >= cutoff for row in run):
+            return 0
+
+        # Size lines so the whole run fits the summary budget (~4 characters per token)
+        max_chars = max(40, min(SUMMARY_LINE_CHARS, SUMMARY_TOKENS * 4 // len(run)))
+        first, last = run[0], run[-1]
+        text = merge_summaries(summary_header(first.id, last.id, first.timestamp, last.timestamp),
+                               [[summarize_conversation(row.command, row.response, max_chars)] for row in run])
+        summary = ConversationSummary(
+            project_id=project_id,
+            level=1,
+            first_conversation_id=first.id,
+            last_conversation_id=last.id,
+            conversation_count=len(run),
+            started_at=first.timestamp,
+            ended_at=last.timestamp,
+            summary=text,
+            token_count=count_tokens(text)
+        )
+        session.add(summary)
+        session.flush()
+
+        # Move the rows to cold storage
+        columns = ['id', 'project_id', 'timestamp', 'command', 'context_snapshot', 'response',
+                   'archived', 'token_count']
+        in_run = (Conversation.project_id == project_id, Conversation.id.between(first.id, last.id))
+        if is_sqlite(session):
+            # SQLite has no DML in CTEs: copy, then delete, in the same transaction
+            session.execute(insert(ConversationArchive).from_select(
+                columns + ['summary_id'],
+                select(*(getattr(Conversation, column) for column in columns), literal(summary.id)).where(*in_run)
+            ))
+            session.execute(delete(Conversation).where(*in_run))
+        else:
+            moved = delete(Conversation).where(*in_run).returning(
+                *(getattr(Conversation, column) for column in columns)).cte('moved')
+            session.execute(insert(ConversationArchive).from_select(
+                columns + ['summary_id'],
+                select(*(moved.c[column] for column in columns), literal(summary.id))
+            ))
+        return len(run)
+
+    def _fold_level(self, session: Session, project_id: int, level: int) -> int:
+        """Fold the oldest FANOUT unfolded summaries at a level into one at the next level"""
+        children = session.query(ConversationSummary).filter(
+            ConversationSummary.project_id == project_id,
+            ConversationSummary.level == level,
+            ConversationSummary.parent_id == None
+        ).order_by(ConversationSummary.first_conversation_id).limit(self.fanout).all()
+        if len(children) < self.fanout:
+            return 0
+
+        first, last = children[0], children[-1]
+        text = merge_summaries(
+            summary_header(first.first_conversation_id, last.last_conversation_id,
+                           first.started_at, last.ended_at),
+            [child.summary.split('\n') for child in children])
+        parent = ConversationSummary(
+            project_id=project_id,
+            level=level + 1,
+            first_conversation_id=first.first_conversation_id,
+            last_conversation_id=last.last_conversation_id,
+            conversation_count=sum(child.conversation_count for child in children),
+            started_at=first.started_at,
+            ended_at=last.ended_at,
+            summary=text,
+            token_count=count_tokens(text)
+        )
+        session.add(parent)
+        session.flush()
+
+        for child in children:
+            child.parent_id = parent.id
+        return 1
+
+    def display_compaction(self, stats: Dict[str, int]) -> None:
+        """Show what a compaction run did"""
+        if not stats['conversations']:
+            self.console.print("[yellow]Nothing to compact[/yellow]")
+            return
+        self.console.print(f"[green]✓[/green] Compacted {stats['conversations']} conversations into "
+                           f"{stats['summaries']} summaries ({stats['folded']} higher-level folds)")
+
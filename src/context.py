@@ -4,9 +4,14 @@ from typing import List, Optional, Dict, Any
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from models import Project, Checkpoint, Conversation
+from cache import get_cache
 from database import Database
+from project_stats import get_project_stats, rebuild_project_stats, record_checkpoint
+from memory import build_context_bundle
+from rows import CheckpointRow, select_checkpoints, fetch_rows
 import json
 
 class ContextManager:
@@ -39,21 +44,16 @@ class ContextManager:
         
         session = self.db.get_session()
         try:
-            # Get conversation count
-            conversation_count = session.query(Conversation).filter_by(
-                project_id=self.current_project.id).count()
+            # Conversation count and context size come from the materialized stats row
+            stats = get_project_stats(session, self.current_project.id)
+            session.commit()  # Persist the row if it was just seeded
+            conversation_count = stats.conversation_count
+            estimated_tokens = stats.tokens_since_checkpoint
             
-            # Get checkpoints
-            checkpoints = session.query(Checkpoint).filter_by(
-                project_id=self.current_project.id
-            ).order_by(Checkpoint.timestamp.desc()).limit(50).all()
-            
-            # Estimate current context size
-            recent_conversations = session.query(Conversation).filter_by(
-                project_id=self.current_project.id
-            ).order_by(Conversation.timestamp.desc()).limit(50).all()
-
-            estimated_tokens = self._estimate_context_tokens(recent_conversations)
+            # Get checkpoints (without their context bundles)
+            checkpoints = fetch_rows(session, select_checkpoints().where(
+                Checkpoint.project_id == self.current_project.id
+            ).order_by(Checkpoint.timestamp.desc()).limit(50), CheckpointRow)
 
             # Create status display
             self._display_context_status(conversation_count, checkpoints, estimated_tokens)
@@ -70,22 +70,24 @@ class ContextManager:
         session = self.db.get_session()
         try:
             # Get latest conversation ID for checkpoint reference
-            latest_conversation = session.query(Conversation).filter_by(
-                project_id=self.current_project.id
-            ).order_by(Conversation.timestamp.desc()).first()
-
-            message_id = latest_conversation.id if latest_conversation else 0
+            stats = get_project_stats(session, self.current_project.id)
+            message_id = stats.latest_message_id or 0
 
-            # Create checkpoint
+            # Create checkpoint, with the context to resume from
+            bundle_key, bundle = build_context_bundle(session, self.current_project)
             checkpoint = Checkpoint(
                 project_id=self.current_project.id,
                 message_id=message_id,
                 description=description,
-                timestamp=datetime.now(timezone.utc)
+                timestamp=datetime.now(timezone.utc),
+                context_key=bundle_key,
+                context_bundle=bundle
             )
 
             session.add(checkpoint)
+            record_checkpoint(session, self.current_project.id)
             session.commit()
+            get_cache().bump_project(self.current_project.id)
 
             self.console.print(f"[green]✓[/green] Checkpoint created: '{description}'")
             return True
@@ -97,6 +99,31 @@ class ContextManager:
         finally:
             self.db.close_session(session)
 
+    def _find_checkpoint(self, session: Session, checkpoint_identifier: str) -> Optional[CheckpointRow]:
+        """Find a checkpoint by description, or the most recent one for 'latest'"""
+        stmt = select_checkpoints().where(Checkpoint.project_id == self.current_project.id)
+        if checkpoint_identifier == "latest":
+            # Get the most recent checkpoint
+            stmt = stmt.order_by(Checkpoint.timestamp.desc())
+        else:
+            # Find checkpoint by description
+            stmt = stmt.where(Checkpoint.description == checkpoint_identifier)
+        
+        rows = fetch_rows(session, stmt.limit(1), CheckpointRow)
+        return rows[0] if rows else None
+
+    def _set_archived(self, session: Session, archived: bool, *criteria) -> int:
+        """Flip archived on matching conversations with one UPDATE; returns the row count"""
+        result = session.execute(
+            update(Conversation).where(
+                Conversation.project_id == self.current_project.id,
+                Conversation.archived == (not archived),
+                *criteria
+            ).values(archived=archived),
+            execution_options={'synchronize_session': False}
+        )
+        return result.rowcount
+
     def reset_to_checkpoint(self, checkpoint_identifier: str) -> bool:
         """Reset context to a specific checkpoint"""
         if not self.current_project:
@@ -105,46 +132,61 @@ class ContextManager:
         
         session = self.db.get_session()
         try:
-            checkpoint = None
+            checkpoint = self._find_checkpoint(session, checkpoint_identifier)
+            if not checkpoint:
+                self.console.print(f"[red]Checkpoint '{checkpoint_identifier}' not found.[/red]")
+                return False
+            
+            # Archive conversations after checkpoint (soft delete)
+            archived_count = self._set_archived(session, True, Conversation.id > checkpoint.message_id)
 
-            if checkpoint_identifier == "latest":
-                # Get the most recent checkpoint
-                checkpoint = session.query(Checkpoint).filter_by(
-                    project_id=self.current_project.id
-                ).order_by(Checkpoint.timestamp.desc()).first()
+            if archived_count:
+                rebuild_project_stats(session, self.current_project.id)
+                session.commit()
+                get_cache().bump_project(self.current_project.id)
+
+                self.console.print(f"[green]✓[/green] Reset to checkpoint '{checkpoint.description}'")
+                self.console.print(f"[dim]Archived {archived_count} conversations after checkpoint[/dim]")
             else:
-                # Find checkpoint by description
-                checkpoint = session.query(Checkpoint).filter_by(
-                    project_id=self.current_project.id,
-                    description=checkpoint_identifier
-                ).first()
+                self.console.print(f"[yellow]Already at checkpoint '{checkpoint.description}'[/yellow]")
             
+            return True
+        except Exception as e:
+            session.rollback()
+            self.console.print(f"[red]error resetting to checkpoint: {e}[/red]")
+            return False
+        finally:
+            self.db.close_session(session)
+
+    def restore_to_checkpoint(self, checkpoint_identifier: str) -> bool:
+        """Undo a reset up to a later checkpoint by un-archiving conversations up to it"""
+        if not self.current_project:
+            self.console.print("[red]No active project. Use 'ridge memory init [project]' first.[/red]")
+            return False
+        
+        session = self.db.get_session()
+        try:
+            checkpoint = self._find_checkpoint(session, checkpoint_identifier)
             if not checkpoint:
                 self.console.print(f"[red]Checkpoint '{checkpoint_identifier}' not found.[/red]")
                 return False
             
-            # Archive conversations after checkpoint
-            conversations_to_archive = session.query(Conversation).filter(
-                Conversation.project_id == self.current_project.id,
-                Conversation.id > checkpoint.message_id
-            ).all()
-
-            if conversations_to_archive:
-                # Mark conversations as archived (soft delete)
-                for conv in conversations_to_archive:
-                    conv.archived = True
+            restored_count = self._set_archived(session, False, Conversation.id <= checkpoint.message_id)
 
+            if restored_count:
+                rebuild_project_stats(session, self.current_project.id)
                 session.commit()
+                get_cache().bump_project(self.current_project.id)
 
-                self.console.print(f"[green]✓[/green]) Reset to checkpoint '{checkpoint.description}'")
-                self.console.print(f"[dim]Archived {len(conversations_to_archive)} conversations after checkpoint]/dim]")
+                self.console.print(f"[green]✓[/green] Restored to checkpoint '{checkpoint.description}'")
+                self.console.print(f"[dim]Restored {restored_count} archived conversations[/dim]")
             else:
-                self.console.print(f"[yellow]Already at checkpoint '{checkpoint.description}'[/yellow]")
+                self.console.print(f"[yellow]Nothing archived up to checkpoint '{checkpoint.description}'[/yellow]")
             
             return True
         except Exception as e:
             session.rollback()
-            self.console.print(f"[red]error resetting to checkpoint: {e}[/red]")
+            self.console.print(f"[red]error restoring to checkpoint: {e}[/red]")
             return False
         finally:
             self.db.close_session(session)
@@ -164,30 +206,29 @@ class ContextManager:
         
         session = self.db.get_session()
         try:
-            conversation_count = session.query(Conversation).filter_by(
-                project_id=self.current_project.id,
-                archived=False
-            ).count()
+            stats = get_project_stats(session, self.current_project.id)
+            conversation_count = stats.active_conversation_count
 
             description = f"auto-checkpoint at {conversation_count} messages"
 
             # Create checkpoint 
-            latest_conversation = session.query(Conversation).filter_by(
-                project_id=self.current_project.id
-            ).order_by(Conversation.timestamp.desc()).first()
-
-            message_id = latest_conversation.id if latest_conversation else 0
+            message_id = stats.latest_message_id or 0
 
+            bundle_key, bundle = build_context_bundle(session, self.current_project)
             checkpoint = Checkpoint(
                 project_id=self.current_project.id,
                 message_id=message_id,
                 description=description,
                 timestamp=datetime.now(timezone.utc),
-                auto_created=True
+                auto_created=True,
+                context_key=bundle_key,
+                context_bundle=bundle
             )
 
             session.add(checkpoint)
+            record_checkpoint(session, self.current_project.id)
             session.commit()
+            get_cache().bump_project(self.current_project.id)
 
             self.console.print(f"]dim]Auto-checkpoint created: {description}[/dim]")
             return True
@@ -198,19 +239,7 @@ class ContextManager:
         finally:
             self.db.close_session(session)
         
-    def _estimate_context_tokens(self, conversations: List[Conversation]) -> int:
-        """rough estimation of token count for conversations"""
-        total_chars = 0
-        for conv in conversations:
-            if conv.context_snapshot:
-                total_chars += len(conv.context_snapshot)
-            if conv.response:
-                total_chars += len(conv.response)
-
-        # Rough approximation: ~4 characters per token
-        return total_chars // 4 
-    
-    def _display_context_status(self, conversation_count: int, checkpoints: List[Checkpoint], estimated_tokens: int):
+    def _display_context_status(self, conversation_count: int, checkpoints: List[CheckpointRow], estimated_tokens: int):
         """display context status with Rich formatting"""
 
         # Context usage panel
@@ -0,0 +1,199 @@
+# src/context_fetch.py - Project, history and checkpoint bundle for AI context in one round trip
+
+import json
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Integer, String, case, cast, exists, false, func, null, select, true
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session
+
+from dialect import in_values, is_sqlite, position_in
+from models import Checkpoint, Conversation, ConversationSummary, Decision, FileTracked, Project
+
+# Timestamps in context keys; fixed width so keys compare as stored
+KEY_TIME_FORMAT = 'YYYY-MM-DD"T"HH24:MI:SS.US'
+SQLITE_KEY_TIME_FORMAT = '%Y-%m-%dT%H:%M:%f'
+
+CONVERSATION_FIELDS = ('command', 'response', 'timestamp')
+DECISION_FIELDS = ('category', 'decision', 'reasoning', 'timestamp')
+FILE_FIELDS = ('path', 'insights', 'last_analyzed')
+SUMMARY_FIELDS = ('level', 'first_conversation_id', 'last_conversation_id', 'summary', 'token_count')
+
+
+class FetchedContext(NamedTuple):
+    """One fetch_context result: state watermarks plus either a stored bundle or a fresh context"""
+    context_key: Optional[str]  # None without active conversations
+    conversation_id: Optional[int]  # Newest conversation, archived or not
+    decision_id: Optional[int]
+    insights_at: Optional[datetime]  # Latest analysis of a file with insights
+    bundle: Optional[bytes]  # Checkpoint bundle matching context_key, when one exists
+    context: Optional[Dict[str, Any]]  # get_context_for_ai dict; None when bundle is set
+
+
+class _JSON:
+    """JSON constructors for the session's backend
+
+    SQLite has json_object/json_group_array, and its aggregates take no
+    ORDER BY, so rows are aggregated from an ordered subquery. JSON read
+    back from a subquery loses its type there and is re-parsed with json(),
+    and an empty json_group_array() becomes NULL like an empty json_agg().
+    """
+
+    def __init__(self, session: Session):
+        self.sqlite = is_sqlite(session)
+
+    def object(self, *pairs) -> Any:
+        return func.json_object(*pairs) if self.sqlite else func.json_build_object(*pairs)
+
+    def row(self, source, fields) -> Any:
+        pairs = []
+        for name in fields:
+            pairs += [name, source.c[name]]
+        return self.object(*pairs)
+
+    def rows(self, rows, fields, *order_by) -> Any:
+        """Rows of a CTE as a JSON array of objects, in order (NULL when empty)"""
+        if self.sqlite:
+            ordered = select(*rows.c).order_by(*order_by).subquery()
+            rows_json = func.nullif(func.json_group_array(self.row(ordered, fields)), '[]')
+            return self.value(select(rows_json).scalar_subquery())
+        return select(func.json_agg(aggregate_order_by(self.row(rows, fields), *order_by))).scalar_subquery()
+
+    def value(self, subquery) -> Any:
+        return func.json(subquery) if self.sqlite else subquery
+
+    def empty_array(self) -> Any:
+        return func.json_array() if self.sqlite else func.json_build_array()
+
+    def boolean(self, condition) -> Any:
+        return func.json(case((condition, 'true'), else_='false')) if self.sqlite else condition
+
+
+def _ranked_or_recent(build: _JSON, ranked, recent, fields, *recent_order) -> Tuple[Any, Any]:
+    """JSON rows of the ranked CTE, or of the recent one when no ranked row qualifies"""
+    recent_rows = build.rows(recent, fields, *recent_order)
+    if ranked is None:
+        return func.coalesce(recent_rows, build.empty_array()), build.boolean(false())
+    return (func.coalesce(build.rows(ranked, fields, ranked.c.position), recent_rows, build.empty_array()),
+            build.boolean(exists(select(ranked.c.position))))
+
+
+def _ranked(session: Session, stmt, key_column, keys: List[Any], key_type, name: str, limit: int):
+    """CTE of stmt's rows whose key is among the index hits, best first (None without hits)"""
+    if not keys:
+        return None
+    return stmt.add_columns(
+        position_in(session, key_column, f"{name}_positions", keys, key_type).label('position')
+    ).where(
+        in_values(session, key_column, f"{name}_keys", keys, key_type)
+    ).order_by('position').limit(limit).cte(f"ranked_{name}")
+
+
+def fetch_context(session: Session, project_id: int, limits: Dict[str, int],
+                  ranked: Optional[Dict[str, List[Tuple[str, float]]]] = None,
+                  use_bundle: bool = True) -> FetchedContext:
+    """Fetch everything get_context_for_ai needs in one statement
+
+    The context key (newest active conversation, decision and summary, and
+    the latest file analysis) is computed server-side; when use_bundle is
+    set and a checkpoint was created at that exact state its stored bundle
+    comes back instead of the history. Otherwise the project, conversations,
+    decisions, file insights and summary roots are assembled with json_agg.
+    Index hits in ranked ('conversation', 'decision', 'file') are returned in
+    rank order, falling back to recency for any kind with no qualifying hit.
+    Bundles are recency-only, so they are never used for a ranked fetch.
+    """
+    ranked = ranked or {}
+    build = _JSON(session)
+
+    conversation_state = select(
+        func.max(Conversation.id).filter(Conversation.archived == False).label('active_id'),
+        func.max(Conversation.id).label('conversation_id')
+    ).where(Conversation.project_id == project_id).cte('conversation_state')
+    file_state = select(
+        func.max(FileTracked.last_analyzed).label('analyzed_at'),
+        func.max(FileTracked.last_analyzed).filter(FileTracked.insights.isnot(None)).label('insights_at')
+    ).where(FileTracked.project_id == project_id).cte('file_state')
+    decision_id = select(func.max(Decision.id)).where(Decision.project_id == project_id).scalar_subquery()
+    summary_id = select(func.max(ConversationSummary.id)).where(
+        ConversationSummary.project_id == project_id).scalar_subquery()
+
+    if build.sqlite:
+        analyzed_at = func.strftime(SQLITE_KEY_TIME_FORMAT, file_state.c.analyzed_at)
+    else:
+        analyzed_at = func.to_char(file_state.c.analyzed_at, KEY_TIME_FORMAT)
+    context_key = case((conversation_state.c.active_id.isnot(None), (
+        cast(conversation_state.c.active_id, String) + ':' +
+        cast(func.coalesce(decision_id, 0), String) + ':' +
+        cast(func.coalesce(summary_id, 0), String) + ':' +
+        func.coalesce(analyzed_at, '')
+    )))
+    state = select(
+        context_key.label('context_key'),
+        conversation_state.c.conversation_id,
+        decision_id.label('decision_id'),
+        file_state.c.insights_at
+    ).select_from(conversation_state.join(file_state, true())).cte('state')
+
+    conversations = select(Conversation.id, Conversation.timestamp, Conversation.command, Conversation.response).where(
+        Conversation.project_id == project_id, Conversation.archived == False)
+    recent_conversations = conversations.order_by(Conversation.timestamp.desc()).limit(
+        limits['conversations']).cte('recent_conversations')
+    conversation_rows, conversations_ranked = _ranked_or_recent(
+        build, _ranked(session, conversations, Conversation.id, [int(key) for key, _ in ranked.get('conversation') or []],
+                Integer, 'conversations', limits['conversations']),
+        recent_conversations, CONVERSATION_FIELDS, recent_conversations.c.timestamp)
+
+    decisions = select(Decision.id, Decision.timestamp, Decision.category, Decision.decision, Decision.reasoning).where(
+        Decision.project_id == project_id)
+    recent_decisions = decisions.order_by(Decision.timestamp.desc()).limit(limits['decisions']).cte('recent_decisions')
+    decision_rows, _ = _ranked_or_recent(
+        build, _ranked(session, decisions, Decision.id, [int(key) for key, _ in ranked.get('decision') or []],
+                Integer, 'decisions', limits['decisions']),
+        recent_decisions, DECISION_FIELDS, recent_decisions.c.timestamp.desc())
+
+    files = select(FileTracked.path, FileTracked.insights, FileTracked.last_analyzed).where(
+        FileTracked.project_id == project_id)
+    recent_files = files.order_by(FileTracked.last_analyzed.desc()).limit(limits['tracked_files']).cte('recent_files')
+    file_rows, _ = _ranked_or_recent(
+        build, _ranked(session, files, FileTracked.path, [key for key, _ in ranked.get('file') or []],
+                String, 'files', limits['tracked_files']),
+        recent_files, FILE_FIELDS, recent_files.c.last_analyzed.desc())
+
+    summaries = select(*(getattr(ConversationSummary, name) for name in SUMMARY_FIELDS)).where(
+        ConversationSummary.project_id == project_id,
+        ConversationSummary.parent_id == None
+    ).cte('summary_roots')
+
+    project = select(Project.name, Project.path, Project.status).where(Project.id == project_id).cte('project')
+    context = build.object(
+        'project', build.value(select(build.row(project, ('name', 'path', 'status'))).scalar_subquery()),
+        'conversations', conversation_rows,
+        'decisions', decision_rows,
+        'tracked_files', file_rows,
+        # Compacted history older than the conversations above, oldest first
+        'summaries', func.coalesce(build.rows(summaries, SUMMARY_FIELDS, summaries.c.first_conversation_id),
+                                   build.empty_array()),
+        # Ranked lists are best-first; recent conversations are chronological
+        'ranked', build.object('conversations', conversations_ranked)
+    )
+
+    bundle = null()
+    if use_bundle and not ranked:
+        bundle = select(Checkpoint.context_bundle).where(
+            Checkpoint.project_id == project_id,
+            Checkpoint.context_key == state.c.context_key,
+            Checkpoint.context_bundle.isnot(None)
+        ).order_by(Checkpoint.timestamp.desc()).limit(1).scalar_subquery()
+        # History is only assembled when no bundle can stand in for it
+        context = case((bundle.is_(None), context))
+
+    row = session.execute(select(
+        state.c.context_key, state.c.conversation_id, state.c.decision_id, state.c.insights_at,
+        bundle.label('bundle'), context.label('context')
+    ).select_from(state)).one()
+    fetched = FetchedContext._make(row)
+    if isinstance(fetched.context, str):
+        fetched = fetched._replace(context=json.loads(fetched.context))  # SQLite returns JSON as text
+    return fetched
@@ -0,0 +1,276 @@
+# src/context_packer.py - Token-budgeted assembly of AI context from project memory
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from rich.console import Console
+from rich.table import Table
+
+from tokenizer import count_tokens, get_tokenizer
+
+# Lines kept from an overflowing file when summarizing the part that does not fit
+OUTLINE_PATTERN = re.compile(r"^\s*(?:async\s+def|def|class|function|export|interface|struct|impl|fn|func)\b")
+
+# Share of a truncated file's budget spent on its head; the tail gets a fifth and the outline the rest
+HEAD_SHARE = 0.6
+TAIL_SHARE = 0.2
+
+
+@dataclass
+class BucketReport:
+    """Token accounting for one context bucket"""
+    name: str
+    budget: int
+    used: int = 0
+    included: int = 0
+    dropped: int = 0
+    truncated: int = 0
+
+    @property
+    def over_budget(self) -> bool:
+        return self.used > self.budget
+
+
+@dataclass
+class PackedContext:
+    """Packed context text, fitted file contents and per-bucket accounting"""
+    context: str
+    files: Dict[str, str] = field(default_factory=dict)
+    truncated_files: List[str] = field(default_factory=list)
+    reports: List[BucketReport] = field(default_factory=list)
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(report.used for report in self.reports)
+
+    def report(self, name: str) -> BucketReport:
+        return next(report for report in self.reports if report.name == name)
+
+
+def format_conversation(conv: Dict[str, Any]) -> str:
+    return f"- {conv['command']}: {conv['response'] or 'No response'}"
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    return summary['summary']
+
+
+def format_decision(dec: Dict[str, Any]) -> str:
+    reasoning = f" - {dec['reasoning']}" if dec['reasoning'] else ""
+    return f"- [{dec['category'] or 'general'}] {dec['decision']}{reasoning}"
+
+
+def format_insight(file: Dict[str, Any]) -> str:
+    return f"- {file['path']}: {file['insights']}"
+
+
+def _summarize_lines(lines: List[str], costs: List[int], budget: int) -> str:
+    """Keep a head, a tail and an outline of the middle within roughly budget tokens"""
+    marker_cost = 12  # Each omission marker
+
+    head_budget = int(budget * HEAD_SHARE)
+    head_end = 0
+    spent = 0
+    while head_end < len(lines) and spent + costs[head_end] <= head_budget:
+        spent += costs[head_end]
+        head_end += 1
+
+    tail_budget = int(budget * TAIL_SHARE)
+    tail_start = len(lines)
+    tail_spent = 0
+    while tail_start > head_end and tail_spent + costs[tail_start - 1] <= tail_budget:
+        tail_start -= 1
+        tail_spent += costs[tail_start]
+    spent += tail_spent + marker_cost
+
+    # Outline of the middle, kept in source order
+    outline = []
+    for index in range(head_end, tail_start):
+        if OUTLINE_PATTERN.match(lines[index]):
+            if spent + costs[index] + marker_cost > budget:
+                break
+            outline.append(index)
+            spent += costs[index] + marker_cost
+
+    fitted = lines[:head_end]
+    previous = head_end
+    for index in outline + [tail_start]:
+        if index > previous:
+            fitted.append(f"[... {index - previous} lines omitted ...]")
+        if index < tail_start:
+            fitted.append(lines[index])
+        previous = index + 1
+    fitted.extend(lines[tail_start:])
+    return '\n'.join(fitted)
+
+
+def fit_text(text: str, budget: int) -> Tuple[str, bool]:
+    """Fit text into a token budget, summarizing what does not fit
+
+    Keeps the head and tail of the text and, in between, an outline of the
+    omitted lines (definitions and declarations) for as long as the budget
+    allows. Returns the fitted text and whether anything was cut.
+    """
+    tokenizer = get_tokenizer()
+    if budget <= 0:
+        return "", bool(text)
+    if tokenizer.count(text) <= budget:
+        return text, False
+
+    lines = text.splitlines()
+    costs = [tokenizer.count(line) + 1 for line in lines]
+
+    # Per-line costs only approximate the joined text, so shrink the target until it fits
+    target = budget
+    while True:
+        fitted = _summarize_lines(lines, costs, target)
+        overshoot = tokenizer.count(fitted) - budget
+        if overshoot <= 0 or target <= 0:
+            return fitted, True
+        target -= overshoot
+
+
+class ContextPacker:
+    """Fill the ContextManager token budgets greedily by relevance and recency
+
+    Buckets: 'instructions' (the agent system prompt, accounted but never
+    cut), 'recent' (conversations, then summaries of compacted history),
+    'files' (file contents sent with the prompt, summarized when they
+    overflow) and 'memory' (decisions and file insights). Items arrive best-first from get_context_for_ai; an item that
+    does not fit is skipped so smaller, lower-ranked ones can still use the
+    remaining budget.
+    """
+
+    def __init__(self, budgets: Dict[str, int], max_tokens: int, buffer_tokens: int = 0):
+        self.console = Console()
+        self.budgets = budgets
+        self.max_tokens = max_tokens
+        self.buffer_tokens = buffer_tokens
+
+    @classmethod
+    def from_context_manager(cls, context_manager) -> 'ContextPacker':
+        """Use the budgets configured on a ContextManager"""
+        return cls({
+            'instructions': context_manager.AGENT_INSTRUCTIONS_TOKENS,
+            'recent': context_manager.RECENT_CONTEXT_TOKENS,
+            'files': context_manager.FILE_CONTENT_TOKENS,
+            'memory': context_manager.MEMORY_INSIGHTS_TOKENS,
+        }, context_manager.MAX_CONTEXT_TOKENS, context_manager.BUFFER_TOKENS)
+
+    def pack(self, context: Dict[str, Any], instructions: str = "",
+             files: Optional[Dict[str, str]] = None) -> PackedContext:
+        """Pack get_context_for_ai output and file contents into the budgets"""
+        packed = PackedContext(context="")
+
+        instructions_report = BucketReport('instructions', self.budgets['instructions'],
+                                           used=count_tokens(instructions), included=1 if instructions else 0)
+
+        files_report = BucketReport('files', self.budgets['files'])
+        self._pack_files(files or {}, files_report, packed)
+
+        sections = []
+        memory_report = BucketReport('memory', self.budgets['memory'])
+        recent_report = BucketReport('recent', self.budgets['recent'])
+        if context:
+            header = f"Project: {context['project']['name']} ({context['project']['path']})"
+            memory_report.used = count_tokens(header)
+            sections.append(header)
+
+            decisions = self._fill(memory_report, [format_decision(dec) for dec in context['decisions']])
+            insights = self._fill(memory_report, [format_insight(file) for file in context['tracked_files']
+                                                  if file['insights']])
+
+            conversations = context['conversations']
+            if not context.get('ranked', {}).get('conversations'):
+                conversations = list(reversed(conversations))  # Unranked lists are chronological; fill newest first
+            chosen = self._fill(recent_report, [format_conversation(conv) for conv in conversations],
+                                keep=True)
+            # Present the surviving conversations in chronological order
+            chosen_conversations = sorted(
+                (conv for conv, keep in zip(conversations, chosen) if keep),
+                key=lambda conv: conv['timestamp'])
+
+            # Compacted history uses what raw turns left over, newest summaries first
+            summaries = list(reversed(context.get('summaries', [])))
+            chosen = self._fill(recent_report, [format_summary(summary) for summary in summaries], keep=True)
+            chosen_summaries = [format_summary(summary) for summary, keep
+                                in reversed(list(zip(summaries, chosen))) if keep]
+
+            if decisions:
+                sections.append("\nDecisions:\n" + '\n'.join(decisions))
+            if chosen_summaries:
+                sections.append("\nEarlier history:\n" + '\n\n'.join(chosen_summaries))
+            if chosen_conversations:
+                sections.append("\nRelated conversations:\n" +
+                                '\n'.join(format_conversation(conv) for conv in chosen_conversations))
+            if insights:
+                sections.append("\nFile insights:\n" + '\n'.join(insights))
+
+        packed.context = '\n'.join(sections)
+        packed.reports = [instructions_report, recent_report, files_report, memory_report]
+        return packed
+
+    def _fill(self, report: BucketReport, items: List[str], keep: bool = False) -> list:
+        """Greedily add items that fit the bucket
+
+        Returns the included items, or a parallel list of flags when keep is set.
+        """
+        included = []
+        flags = []
+        for item in items:
+            cost = count_tokens(item)
+            fits = report.used + cost <= report.budget
+            if fits:
+                report.used += cost
+                report.included += 1
+                included.append(item)
+            else:
+                report.dropped += 1
+            flags.append(fits)
+        return flags if keep else included
+
+    def _pack_files(self, files: Dict[str, str], report: BucketReport, packed: PackedContext) -> None:
+        """Give each file a fair share of the bucket, smallest first so leftovers roll forward"""
+        costs = {path: count_tokens(content) for path, content in files.items()}
+        remaining = report.budget
+        for position, path in enumerate(sorted(files, key=costs.get)):
+            share = remaining // (len(files) - position)
+            content = files[path]
+            if costs[path] > share:
+                content, _ = fit_text(content, share)
+                packed.truncated_files.append(path)
+                report.truncated += 1
+                costs[path] = count_tokens(content)
+            packed.files[path] = content
+            report.used += costs[path]
+            report.included += 1
+            remaining -= costs[path]
+
+    def display_report(self, packed: PackedContext) -> None:
+        """Show per-bucket token usage"""
+        table = Table(title="Context Budget")
+        table.add_column("Bucket", style="cyan")
+        table.add_column("Used", justify="right")
+        table.add_column("Budget", justify="right")
+        table.add_column("Items", justify="right")
+        table.add_column("Dropped", justify="right")
+        table.add_column("Truncated", justify="right")
+
+        for report in packed.reports:
+            used = f"[red]{report.used:,}[/red]" if report.over_budget else f"{report.used:,}"
+            table.add_row(report.name, used, f"{report.budget:,}", str(report.included),
+                          str(report.dropped), str(report.truncated))
+
+        limit = self.max_tokens - self.buffer_tokens
+        style = "red" if packed.total_tokens > limit else "green"
+        table.add_row("total", f"[{style}]{packed.total_tokens:,}[/{style}]", f"{limit:,}", "", "", "")
+        self.console.print(table)
+
+    def summary(self, packed: PackedContext) -> str:
+        """One-line usage summary for command output"""
+        parts = [f"{report.name} {report.used:,}/{report.budget:,}" +
+                 (" (truncated)" if report.truncated else "") +
+                 (" (over)" if report.over_budget else "")
+                 for report in packed.reports]
+        return f"Context {packed.total_tokens:,} tokens: " + ", ".join(parts)
@@ -1,9 +1,14 @@
 import os
+import hashlib
+import threading
 import psycopg2
 import redis
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
 
+from models import Base
+
 # Database configuration
 DB_CONFIG = {
     'host': 'localhost',
@@ -13,14 +18,141 @@ DB_CONFIG = {
     'password': 'ridge_pass'
 }
 
+# DBAPI driver for the engine URL: 'psycopg2' (default) or 'psycopg' (psycopg 3)
+DEFAULT_DRIVER = 'psycopg2'
+
+# Embedded backend (RIDGE_DB_BACKEND=sqlite): one WAL-mode database file, no services
+DEFAULT_SQLITE_PATH = os.path.join(os.path.expanduser('~'), '.ridge', 'ridge.db')
+
+def database_url(driver: str = None) -> str:
+    """SQLAlchemy URL for the configured backend, or RIDGE_DATABASE_URL when set
+    
+    RIDGE_DB_BACKEND picks 'postgres' (DB_CONFIG, the default) or 'sqlite'
+    (the file at RIDGE_SQLITE_PATH).
+    """
+    url = os.getenv('RIDGE_DATABASE_URL')
+    if url:
+        return url
+    if os.getenv('RIDGE_DB_BACKEND', 'postgres') == 'sqlite':
+        return f"sqlite:///{os.getenv('RIDGE_SQLITE_PATH', DEFAULT_SQLITE_PATH)}"
+    driver = driver or os.getenv('RIDGE_DB_DRIVER', DEFAULT_DRIVER)
+    return (f"postgresql+{driver}://{DB_CONFIG['user']}:{DB_CONFIG['password']}"
+            f"@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}")
+
+def database_key(url=None) -> str:
+    """Short stable name for a database, for state kept outside it (index files, cache keys)
+    
+    Defaults to the configured database_url(); the password never enters the hash.
+    """
+    url = make_url(url or database_url())
+    return hashlib.sha1(url.render_as_string(hide_password=True).encode('utf-8')).hexdigest()[:12]
+
+def engine_settings() -> dict:
+    """Pool and connection settings from the environment
+    
+    RIDGE_DB_POOL_SIZE / RIDGE_DB_MAX_OVERFLOW size the pool, RIDGE_DB_POOL_PRE_PING=0
+    skips the liveness check on checkout, RIDGE_DB_STATEMENT_TIMEOUT_MS (0 = none)
+    and RIDGE_DB_APPLICATION_NAME are set on every connection. With the psycopg 3
+    driver, RIDGE_DB_PREPARE_THRESHOLD turns on its server-side prepared statement
+    cache (statements are prepared after that many executions); it is off by
+    default because it does not survive transaction-pooling proxies such as PgBouncer.
+    """
+    return {
+        'pool_size': int(os.getenv('RIDGE_DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('RIDGE_DB_MAX_OVERFLOW', '10')),
+        'pool_pre_ping': os.getenv('RIDGE_DB_POOL_PRE_PING', '1') == '1',
+        'statement_timeout_ms': int(os.getenv('RIDGE_DB_STATEMENT_TIMEOUT_MS', '0')),
+        'application_name': os.getenv('RIDGE_DB_APPLICATION_NAME', 'ridge'),
+        'prepare_threshold': os.getenv('RIDGE_DB_PREPARE_THRESHOLD'),
+    }
+
+def create_database_engine(url: str = None, settings: dict = None) -> Engine:
+    """Build a pooled engine configured by engine_settings()"""
+    url = url or database_url()
+    settings = settings or engine_settings()
+    if url.startswith('sqlite'):
+        return create_sqlite_engine(url, settings)
+    
+    connect_args = {'application_name': settings['application_name']}
+    if settings['statement_timeout_ms']:
+        connect_args['options'] = f"-c statement_timeout={settings['statement_timeout_ms']}"
+    if url.startswith('postgresql+psycopg://'):
+        # psycopg 3 prepares after 5 executions by default; only opt in when configured
+        threshold = settings['prepare_threshold']
+        connect_args['prepare_threshold'] = int(threshold) if threshold else None
+    
+    return create_engine(
+        url,
+        pool_size=settings['pool_size'],
+        max_overflow=settings['max_overflow'],
+        pool_pre_ping=settings['pool_pre_ping'],
+        connect_args=connect_args
+    )
+
+def create_sqlite_engine(url: str, settings: dict) -> Engine:
+    """Build an engine on a SQLite file in WAL mode, creating the schema from models.py
+    
+    WAL lets readers run alongside the single writer; busy_timeout (the
+    statement timeout, 5s by default) makes writers wait for the lock
+    instead of failing.
+    """
+    path = url.split(':///', 1)[-1]
+    if path and path != ':memory:':
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    
+    engine = create_engine(
+        url,
+        pool_size=settings['pool_size'],
+        max_overflow=settings['max_overflow'],
+        pool_pre_ping=settings['pool_pre_ping'],
+        connect_args={'check_same_thread': False}  # Pooled connections move between threads (log writer)
+    )
+    busy_timeout = settings['statement_timeout_ms'] or 5000
+    
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout)}")
+        cursor.close()
+    
+    Base.metadata.create_all(engine)
+    return engine
+
+_engine = None
+_session_factory = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> Engine:
+    """Get the process-wide engine, so every manager shares one connection pool"""
+    global _engine, _session_factory
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_database_engine()
+            _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+        return _engine
+
+def get_session_factory() -> sessionmaker:
+    """Get the sessionmaker bound to the shared engine"""
+    get_engine()
+    return _session_factory
+
+def dispose_engine() -> None:
+    """Close pooled connections and drop the shared engine (the next use builds a new one)"""
+    global _engine, _session_factory
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _session_factory = None
+
 def test_postgres_connection():
     """Test basic PostgreSQL connection"""
     try:
-        # Create connection string
-        conn_string = f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
-
-        # Test with SQLAlchemy engine
-        engine = create_engine(conn_string)
+        # Test with the shared SQLAlchemy engine
+        engine = get_engine()
         with engine.connect() as conn:
             result = conn.execute(text("SELECT version();"))
             version = result.fetchone()[0]
@@ -74,10 +206,9 @@ class Database:
         self._setup_engine()
     
     def _setup_engine(self):
-        """Setup SQLAlchemy engine and session maker"""
-        conn_string = f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
-        self.engine = create_engine(conn_string)
-        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        """Use the shared engine and session maker (one pool per process)"""
+        self.engine = get_engine()
+        self.SessionLocal = get_session_factory()
     
     def get_session(self):
         """Get a new database session"""
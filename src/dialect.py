@@ -0,0 +1,60 @@
+# src/dialect.py - The few statements that differ between the Postgres and SQLite backends
+
+from typing import Any, List
+
+from sqlalchemy import ARRAY, any_, bindparam, case, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import Project
+
+
+def is_sqlite(session: Session) -> bool:
+    return session.get_bind().dialect.name == 'sqlite'
+
+
+def insert(session: Session, model):
+    """INSERT supporting on_conflict_do_update/excluded on either backend"""
+    return sqlite_insert(model) if is_sqlite(session) else pg_insert(model)
+
+
+def in_values(session: Session, column, name: str, values: List[Any], type_):
+    """column IN values: one array parameter on Postgres, expanded parameters on SQLite"""
+    if is_sqlite(session):
+        return column.in_(bindparam(name, values, expanding=True))
+    return column == any_(bindparam(name, values, type_=ARRAY(type_)))
+
+
+def position_in(session: Session, column, name: str, values: List[Any], type_):
+    """1-based position of column's value in values (array_position on Postgres)"""
+    if is_sqlite(session):
+        return case({value: position for position, value in enumerate(values, 1)}, value=column)
+    return func.array_position(bindparam(name, values, type_=ARRAY(type_)), column)
+
+
+def greatest(session: Session, *values):
+    # SQLite's multi-argument max() and min() are scalar functions
+    return func.max(*values) if is_sqlite(session) else func.greatest(*values)
+
+
+def least(session: Session, *values):
+    return func.min(*values) if is_sqlite(session) else func.least(*values)
+
+
+def strpos(session: Session, text, needle):
+    return func.instr(text, needle) if is_sqlite(session) else func.strpos(text, needle)
+
+
+def lock_project(session: Session, lock_id: int, project_id: int) -> None:
+    """Serialize a job per project for the rest of the transaction
+
+    Postgres takes a transaction-scoped advisory lock. SQLite has a single
+    writer, so a no-op write on the project row takes the database write
+    lock up front, before the job reads anything it is about to change.
+    """
+    if is_sqlite(session):
+        session.execute(update(Project).where(Project.id == project_id).values(id=Project.id),
+                        execution_options={'synchronize_session': False})
+    else:
+        session.execute(select(func.pg_advisory_xact_lock(lock_id, project_id)))
@@ -1,22 +1,64 @@
 # src/file_tracker.py - File Change Detection System
 
 import os
+import queue
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import List, Dict, Optional, Set
+from collections import defaultdict
+from typing import Any, List, Dict, Optional, Set, Tuple, Iterable, Iterator
 from pathlib import Path
+from sqlalchemy import String, delete, func, or_
 from sqlalchemy.orm import Session
 from rich.console import Console
 from rich.table import Table
 
-from models import FileTracked, Project
+from models import FileTracked, DirectoryTracked, Project
+from cache import get_cache
 from database import Database
+from dialect import in_values, insert, strpos
+from ignore import IgnoreMatcher, DEFAULT_IGNORE_FILES
+from git_index import GitIndex, GitSnapshot
+from hashing import get_hasher
+from tokenizer import count_file_tokens
+
+# Columns rewritten for files whose content did not change (touched, or rehashed
+# under a new algorithm)
+REFRESH_COLUMNS = ['hash', 'hash_algorithm', 'size', 'mtime_ns', 'inode']
+
+class ProjectWalk:
+    """Bookkeeping for one directory walk of a project"""
+    
+    def __init__(self, known_dirs: Optional[Dict[str, Tuple[int, List[str]]]] = None):
+        # relative dir -> (stored mtime_ns, stored child dirs); listing is skipped when mtime matches
+        self.known_dirs = known_dirs or {}
+        self.visited_dirs: Dict[str, int] = {}  # relative dir -> mtime_ns
+        self.skipped_dirs: Set[str] = set()
+        self.unreadable_dirs: List[str] = []
 
 class FileTracker:
-    def __init__(self):
+    def __init__(self, paranoid: bool = False, hash_workers: Optional[int] = None,
+                 trust_dir_mtime: Optional[bool] = None, max_file_size: Optional[int] = None):
         self.console = Console()
         self.db = Database()
         
+        # Paranoid mode rehashes every file instead of trusting stat signatures
+        self.paranoid = paranoid
+        
+        # Content hashes come from the process-wide service shared with backups and edits
+        self.hasher = get_hasher()
+        
+        # Hashing pipeline: worker threads fed by a bounded queue from the walker
+        self.hash_workers = max(1, hash_workers or int(os.getenv('RIDGE_HASH_WORKERS', '0'))
+                                or min(8, os.cpu_count() or 1))
+        self.hash_queue_size = int(os.getenv('RIDGE_HASH_QUEUE_SIZE', '256'))
+        
+        # Rows per INSERT ... ON CONFLICT / DELETE ... ANY statement during sync
+        self.sync_batch_size = 500
+        
+        # Above this many dirty directories their files are loaded in one unfiltered query
+        self.direct_dir_query_limit = 64
+        
         # File extensions to track by default
         self.tracked_extensions = {
             '.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.cpp', '.c', '.h',
@@ -28,23 +70,164 @@ class FileTracker:
         # Directories to ignore
         self.ignored_dirs = {
             '__pycache__', '.git', 'node_modules', '.next', 'dist', 'build',
-            '.vscode', '.idea', 'venv', 'env', '.env', 'target', 'vendor'
+            '.vscode', '.idea', 'venv', 'env', '.env', 'target', 'vendor',
+            '.ridge', '.ridge_index'
         }
+        
+        # Files larger than this are not tracked (1MB unless RIDGE_MAX_TRACKED_FILE_SIZE
+        # is set; 0 removes the cap). Hashing streams, so large files cost no extra memory.
+        if max_file_size is None:
+            max_file_size = int(os.getenv('RIDGE_MAX_TRACKED_FILE_SIZE', str(1024 * 1024)))
+        self.max_file_size = max_file_size or float('inf')
+        
+        # Nested ignore files honored during scans (empty tuple disables them)
+        self.ignore_file_names = DEFAULT_IGNORE_FILES
+        
+        # Ask the git index for candidate changes when the project is a work tree
+        self.use_git = os.getenv('RIDGE_USE_GIT', '1') != '0'
+        
+        # Skip listing and stat'ing files in directories whose mtime is unchanged.
+        # Opt-in: in-place writes do not touch the directory mtime.
+        if trust_dir_mtime is None:
+            trust_dir_mtime = os.getenv('RIDGE_TRUST_DIR_MTIME', '0') == '1'
+        self.trust_dir_mtime = trust_dir_mtime and not paranoid
     
     def get_file_hash(self, file_path: str) -> Optional[str]:
-        """Calculate SHA-256 hash of file content"""
+        """Calculate the content hash of a file (cached unless paranoid)"""
         try:
-            with open(file_path, 'rb') as f:
-                content = f.read()
-                return hashlib.sha256(content).hexdigest()
+            return self.hasher.hash_file(file_path, use_cache=not self.paranoid)
         except (IOError, OSError) as e:
             self.console.print(f"[red]Error reading file {file_path}: {e}[/red]")
             return None
     
+    def hash_files(self, project_path: str, file_paths: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Hash relative file paths on a thread pool fed through a bounded queue
+        
+        The caller's iterable is consumed on the current thread, so a lazy
+        directory walk blocks when the hashers fall behind instead of
+        buffering the whole tree. Returns {relative_path: hash or None}.
+        """
+        results: Dict[str, Optional[str]] = {}
+        
+        if self.hash_workers == 1:
+            for file_path in file_paths:
+                results[file_path] = self._hash_queued_file(project_path, file_path)
+            return results
+        
+        work_queue: queue.Queue = queue.Queue(maxsize=self.hash_queue_size)
+        
+        def hash_worker():
+            file_path = ''
+            try:
+                while True:
+                    file_path = work_queue.get()
+                    if file_path is None:
+                        return
+                    results[file_path] = self._hash_queued_file(project_path, file_path)
+            finally:
+                # A worker that dies early keeps taking paths until its sentinel,
+                # so the producer never blocks on a full queue
+                while file_path is not None:
+                    if file_path:
+                        results.setdefault(file_path, None)
+                    file_path = work_queue.get()
+        
+        with ThreadPoolExecutor(max_workers=self.hash_workers,
+                                thread_name_prefix='ridge-hash') as executor:
+            workers = [executor.submit(hash_worker) for _ in range(self.hash_workers)]
+            try:
+                for file_path in file_paths:
+                    work_queue.put(file_path)
+            finally:
+                # One sentinel per worker so every thread drains and exits
+                for _ in workers:
+                    work_queue.put(None)
+            for worker in workers:
+                worker.result()
+        
+        return results
+    
+    def _hash_queued_file(self, project_path: str, file_path: str) -> Optional[str]:
+        """Hash one file for hash_files; any failure is recorded as a missing hash"""
+        try:
+            return self.get_file_hash(os.path.join(project_path, file_path))
+        except Exception as e:
+            self.console.print(f"[red]Error hashing file {file_path}: {e}[/red]")
+            return None
+    
+    def get_stat_signature(self, file_path: str) -> Optional[Tuple[int, int, int]]:
+        """Get the (size, mtime_ns, inode) signature used to skip rehashing"""
+        try:
+            stat_result = os.stat(file_path)
+        except OSError:
+            return None
+        return self._signature_from_stat(stat_result)
+    
+    def _signature_from_stat(self, stat_result: os.stat_result) -> Tuple[int, int, int]:
+        """Build a stat signature from an existing stat result"""
+        return (stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino)
+    
+    def is_stat_unchanged(self, tracked_file: FileTracked,
+                          signature: Optional[Tuple[int, int, int]]) -> bool:
+        """Check whether a tracked file can skip rehashing
+        
+        Its stat signature must match, and its stored hash must come from the
+        current algorithm: digests from different algorithms never compare.
+        """
+        if self.paranoid or not self.is_current_algorithm(tracked_file):
+            return False
+        return self._signature_matches(tracked_file, signature)
+    
+    def _signature_matches(self, tracked_file: FileTracked,
+                           signature: Optional[Tuple[int, int, int]]) -> bool:
+        """Check a tracked file's recorded stat signature against a fresh one"""
+        if signature is None or tracked_file.mtime_ns is None:
+            return False
+        return (tracked_file.size, tracked_file.mtime_ns, tracked_file.inode) == signature
+    
+    def is_current_algorithm(self, tracked_file: FileTracked) -> bool:
+        """Check whether a tracked file's hash was computed with the hasher's algorithm"""
+        return tracked_file.hash_algorithm == self.hasher.algorithm
+    
+    def _is_rehash(self, tracked_file: FileTracked, signature: Optional[Tuple[int, int, int]]) -> bool:
+        """Whether a fresh hash only differs because the algorithm changed
+        
+        The old and new digests cannot be compared, so an unchanged stat
+        signature decides: the file was rehashed, not modified.
+        """
+        return not self.is_current_algorithm(tracked_file) and self._signature_matches(tracked_file, signature)
+    
+    def _set_stat_signature(self, tracked_file: FileTracked,
+                            signature: Optional[Tuple[int, int, int]]) -> None:
+        """Record a stat signature on a tracking record"""
+        if signature is None:
+            tracked_file.size = tracked_file.mtime_ns = tracked_file.inode = None
+        else:
+            tracked_file.size, tracked_file.mtime_ns, tracked_file.inode = signature
+    
+    def is_tracked_extension(self, file_name: str) -> bool:
+        """Check a file name against the tracked extension list"""
+        return os.path.splitext(file_name)[1].lower() in self.tracked_extensions
+    
+    def build_ignore_matcher(self, project_path: str) -> Optional[IgnoreMatcher]:
+        """Create the ignore-file matcher used for one scan"""
+        if not self.ignore_file_names:
+            return None
+        return IgnoreMatcher(project_path, self.ignore_file_names)
+    
+    def is_trackable_path(self, relative_path: str, matcher: Optional[IgnoreMatcher] = None) -> bool:
+        """Check a project-relative path against extensions, ignored directories and ignore files"""
+        parts = Path(relative_path).parts
+        if not self.is_tracked_extension(parts[-1]):
+            return False
+        if any(part in self.ignored_dirs for part in parts[:-1]):
+            return False
+        return matcher is None or not matcher.is_ignored_path(relative_path)
+    
     def should_track_file(self, file_path: Path) -> bool:
         """Determine if a file should be tracked"""
         # Check if file extension is in tracked list
-        if file_path.suffix.lower() not in self.tracked_extensions:
+        if not self.is_tracked_extension(file_path.name):
             return False
         
         # Check if file is in ignored directory
@@ -52,26 +235,80 @@ class FileTracker:
             if part in self.ignored_dirs:
                 return False
         
-        # Check file size (ignore very large files > 1MB)
+        # Check file size (ignore very large files)
         try:
-            if file_path.stat().st_size > 1024 * 1024:  # 1MB
+            if file_path.stat().st_size > self.max_file_size:
                 return False
         except OSError:
             return False
         
         return True
     
+    def iter_project_files(self, project_path: str,
+                           walk: Optional[ProjectWalk] = None
+                           ) -> Iterator[Tuple[str, Tuple[int, int, int]]]:
+        """Walk a project with os.scandir, yielding (relative_path, stat signature)
+        
+        Ignored directories (ignored_dirs and nested .gitignore/.ignore/
+        .ridgeignore rules) are pruned before descending, and the DirEntry stat
+        result is reused for both the size check and the rehash fast path.
+        With a ProjectWalk, directory mtimes and unreadable directories are
+        recorded, and known directories whose mtime is unchanged are not listed:
+        their stored subdirectories are visited and their files are skipped.
+        """
+        matcher = self.build_ignore_matcher(project_path)
+        pending_dirs = ['']
+        
+        while pending_dirs:
+            relative_dir = pending_dirs.pop()
+            full_dir = os.path.join(project_path, relative_dir)
+            try:
+                if walk is not None:
+                    mtime_ns = os.stat(full_dir).st_mtime_ns
+                    walk.visited_dirs[relative_dir] = mtime_ns
+                    
+                    known = walk.known_dirs.get(relative_dir)
+                    if known and known[0] == mtime_ns:
+                        walk.skipped_dirs.add(relative_dir)
+                        pending_dirs.extend(known[1])
+                        continue
+                
+                with os.scandir(full_dir) as entries:
+                    for entry in entries:
+                        relative_path = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if entry.name not in self.ignored_dirs and not (
+                                        matcher and matcher.is_ignored(relative_path, is_dir=True)):
+                                    pending_dirs.append(relative_path)
+                                continue
+                            
+                            if not entry.is_file() or not self.is_tracked_extension(entry.name):
+                                continue
+                            
+                            if matcher and matcher.is_ignored(relative_path):
+                                continue
+                            
+                            stat_result = entry.stat()
+                        except OSError:
+                            continue
+                        
+                        if stat_result.st_size > self.max_file_size:
+                            continue
+                        
+                        yield relative_path, self._signature_from_stat(stat_result)
+            except OSError as e:
+                self.console.print(f"[red]Error scanning {relative_dir or project_path}: {e}[/red]")
+                if walk is not None:
+                    walk.unreadable_dirs.append(relative_dir)
+    
     def scan_project_files(self, project: Project) -> List[str]:
         """Scan project directory for trackable files"""
-        project_path = Path(project.path)
         tracked_files = []
         
         try:
-            for file_path in project_path.rglob('*'):
-                if file_path.is_file() and self.should_track_file(file_path):
-                    # Store relative path from project root
-                    relative_path = file_path.relative_to(project_path)
-                    tracked_files.append(str(relative_path))
+            for relative_path, _ in self.iter_project_files(project.path):
+                tracked_files.append(relative_path)
         except Exception as e:
             self.console.print(f"[red]Error scanning project files: {e}[/red]")
         
@@ -82,10 +319,7 @@ class FileTracker:
         session = self.db.get_session()
         try:
             full_path = os.path.join(project.path, file_path)
-            file_hash = self.get_file_hash(full_path)
-            
-            if not file_hash:
-                return False
+            signature = self.get_stat_signature(full_path)
             
             # Check if file is already tracked
             tracked_file = session.query(FileTracked).filter_by(
@@ -93,15 +327,36 @@ class FileTracker:
                 path=file_path
             ).first()
             
+            if tracked_file and self.is_stat_unchanged(tracked_file, signature):
+                return False  # File unchanged, no need to rehash
+            
+            file_hash = self.get_file_hash(full_path)
+            
+            if not file_hash:
+                return False
+            
             if tracked_file:
                 # Update existing record if hash changed
-                if tracked_file.hash != file_hash:
+                if tracked_file.hash != file_hash and not self._is_rehash(tracked_file, signature):
                     tracked_file.hash = file_hash
+                    tracked_file.hash_algorithm = self.hasher.algorithm
+                    tracked_file.token_count = count_file_tokens(full_path)
+                    self._set_stat_signature(tracked_file, signature)
                     tracked_file.last_analyzed = datetime.now(timezone.utc)
                     if insights:
                         tracked_file.insights = insights
+                    self._write_directories(session, project, self._file_diff(file_path, file_hash, 'modified'))
                     session.commit()
+                    get_cache().bump_project(project.id)
                     return True  # File changed
+                
+                # Content is the same (e.g. touched or rehashed); refresh the hash and signature
+                if tracked_file.hash != file_hash:
+                    self._write_directories(session, project, self._file_diff(file_path, file_hash))
+                tracked_file.hash = file_hash
+                tracked_file.hash_algorithm = self.hasher.algorithm
+                self._set_stat_signature(tracked_file, signature)
+                session.commit()
                 return False  # File unchanged
             else:
                 # Create new tracking record
@@ -109,10 +364,15 @@ class FileTracker:
                     project_id=project.id,
                     path=file_path,
                     hash=file_hash,
-                    insights=insights
+                    hash_algorithm=self.hasher.algorithm,
+                    insights=insights,
+                    token_count=count_file_tokens(full_path)
                 )
+                self._set_stat_signature(tracked_file, signature)
                 session.add(tracked_file)
+                self._write_directories(session, project, self._file_diff(file_path, file_hash, 'new'))
                 session.commit()
+                get_cache().bump_project(project.id)
                 return True  # New file
                 
         except Exception as e:
@@ -122,101 +382,522 @@ class FileTracker:
         finally:
             self.db.close_session(session)
     
+    def _load_tracked_state(self, session: Session, project_id: int) -> Dict[str, Any]:
+        """Load path, hash and stat signature for every tracked file in one query"""
+        rows = session.query(
+            FileTracked.path,
+            FileTracked.hash,
+            FileTracked.hash_algorithm,
+            FileTracked.size,
+            FileTracked.mtime_ns,
+            FileTracked.inode
+        ).filter(FileTracked.project_id == project_id).all()
+        return {row.path: row for row in rows}
+    
+    def _upsert_tracked_files(self, session: Session, rows: List[Dict[str, Any]],
+                              update_columns: List[str], model=FileTracked) -> None:
+        """Insert tracking rows in batches, updating update_columns on (project_id, path) conflicts"""
+        for start in range(0, len(rows), self.sync_batch_size):
+            stmt = insert(session, model).values(rows[start:start + self.sync_batch_size])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[model.project_id, model.path],
+                set_={column: stmt.excluded[column] for column in update_columns}
+            )
+            session.execute(stmt)
+    
+    def _delete_tracked_paths(self, session: Session, project_id: int, paths: List[str],
+                              model=FileTracked) -> None:
+        """Delete tracking rows for the given paths in batches"""
+        for start in range(0, len(paths), self.sync_batch_size):
+            session.execute(
+                delete(model).where(
+                    model.project_id == project_id,
+                    in_values(session, model.path, 'paths', paths[start:start + self.sync_batch_size], String)
+                )
+            )
+    
+    def _load_directory_state(self, session: Session, project_id: int) -> Dict[str, Any]:
+        """Load path, rollup hash and mtime for every tracked directory in one query"""
+        rows = session.query(
+            DirectoryTracked.path,
+            DirectoryTracked.hash,
+            DirectoryTracked.mtime_ns
+        ).filter(DirectoryTracked.project_id == project_id).all()
+        return {row.path: row for row in rows}
+    
+    def _rollup_hash(self, entries: Iterable[Tuple[str, str, str]]) -> str:
+        """Hash a directory's (kind, name, hash) child entries"""
+        digest = hashlib.sha256()
+        for kind, name, child_hash in sorted(entries):
+            digest.update(f"{kind}\0{name}\0{child_hash}\n".encode(errors='surrogateescape'))
+        return digest.hexdigest()
+    
+    def _signature_columns(self, signature: Optional[Tuple[int, int, int]]) -> Dict[str, Optional[int]]:
+        """Map a stat signature onto FileTracked column values"""
+        size, mtime_ns, inode = signature or (None, None, None)
+        return {'size': size, 'mtime_ns': mtime_ns, 'inode': inode}
+    
+    def _diff_entries(self, project: Project, tracked: Dict[str, Any],
+                      entries: Iterable[Tuple[str, Tuple[int, int, int]]]) -> Dict[str, Any]:
+        """Hash entries whose stat signature moved and classify them against tracked rows
+        
+        entries yields (relative_path, signature) for files that exist and are
+        trackable; it is consumed lazily by the hashing pipeline. Deletions are
+        left to the caller, which knows whether the entries were exhaustive.
+        """
+        present = set()
+        signatures = {}
+        unchanged = 0
+        rehashed = []
+        
+        def files_to_hash():
+            nonlocal unchanged
+            for path, signature in entries:
+                present.add(path)
+                tracked_file = tracked.get(path)
+                
+                # Skip the read and hash entirely when the stat signature matches
+                if tracked_file and self.is_stat_unchanged(tracked_file, signature):
+                    unchanged += 1
+                    continue
+                
+                signatures[path] = signature
+                yield path
+        
+        hashes = self.hash_files(project.path, files_to_hash())
+        
+        changes = []
+        changed_rows = []
+        refreshed_rows = []
+        now = datetime.now(timezone.utc)
+        for path, signature in signatures.items():
+            file_hash = hashes.get(path)
+            if not file_hash:
+                continue
+            
+            row = {
+                'project_id': project.id,
+                'path': path,
+                'hash': file_hash,
+                'hash_algorithm': self.hasher.algorithm,
+                'last_analyzed': now,
+                **self._signature_columns(signature)
+            }
+            tracked_file = tracked.get(path)
+            
+            if tracked_file is None:
+                row['token_count'] = count_file_tokens(os.path.join(project.path, path))
+                changed_rows.append(row)
+                changes.append({'path': path, 'status': 'new', 'hash': file_hash})
+            elif self._is_rehash(tracked_file, signature):
+                # Stored under another algorithm; replace the digest without reporting a change
+                refreshed_rows.append(row)
+                rehashed.append(path)
+                unchanged += 1
+            elif tracked_file.hash != file_hash:
+                row['token_count'] = count_file_tokens(os.path.join(project.path, path))
+                changed_rows.append(row)
+                changes.append({
+                    'path': path,
+                    'status': 'modified',
+                    'old_hash': tracked_file.hash,
+                    'new_hash': file_hash
+                })
+            else:
+                # Same content, new signature: remember it for the next sweep
+                refreshed_rows.append(row)
+                unchanged += 1
+        
+        return {
+            'changes': changes,
+            'changed_rows': changed_rows,
+            'refreshed_rows': refreshed_rows,
+            'present': present,
+            'unchanged': unchanged,
+            'rehashed': rehashed,
+            'deleted_paths': []
+        }
+    
+    def _mark_deleted(self, diff: Dict[str, Any], tracked: Dict[str, Any]) -> None:
+        """Record tracked rows that were not seen by an exhaustive scan as deleted"""
+        for path, tracked_file in tracked.items():
+            if path not in diff['present']:
+                diff['deleted_paths'].append(path)
+                diff['changes'].append({'path': path, 'status': 'deleted', 'hash': tracked_file.hash})
+    
+    def _scan_changes(self, session: Session, project: Project) -> Dict[str, Any]:
+        """Diff a full directory walk against every tracked row"""
+        tracked = self._load_tracked_state(session, project.id)
+        
+        known_dirs = {}
+        if self.trust_dir_mtime:
+            directories = self._load_directory_state(session, project.id)
+            subdirs = defaultdict(list)
+            for path in directories:
+                if path:
+                    subdirs[os.path.dirname(path)].append(path)
+            known_dirs = {path: (row.mtime_ns, subdirs[path])
+                          for path, row in directories.items() if row.mtime_ns is not None}
+        
+        walk = ProjectWalk(known_dirs)
+        diff = self._diff_entries(project, tracked, self.iter_project_files(project.path, walk))
+        diff['walk'] = walk
+        
+        # Files in directories whose listing was skipped are assumed present and unchanged
+        if walk.skipped_dirs:
+            for path in tracked:
+                if path not in diff['present'] and os.path.dirname(path) in walk.skipped_dirs:
+                    diff['present'].add(path)
+                    diff['unchanged'] += 1
+        
+        # Only trust deletions when the whole tree was readable
+        if not walk.unreadable_dirs:
+            self._mark_deleted(diff, tracked)
+            diff['exhaustive'] = True
+        return diff
+    
+    def _path_changes(self, session: Session, project: Project, paths: Iterable[str],
+                      removed_dirs: Iterable[str] = ()) -> Dict[str, Any]:
+        """Diff an explicit set of candidate paths against their tracked rows
+        
+        Only the rows for the candidates (and for anything under removed_dirs)
+        are loaded. Candidates that no longer exist or stopped being trackable
+        come back as deleted.
+        """
+        candidates = set(paths)
+        removed_dirs = list(removed_dirs)
+        matcher = self.build_ignore_matcher(project.path)
+        
+        query = session.query(
+            FileTracked.path, FileTracked.hash, FileTracked.hash_algorithm,
+            FileTracked.size, FileTracked.mtime_ns, FileTracked.inode
+        ).filter(FileTracked.project_id == project.id)
+        
+        conditions = []
+        if candidates:
+            conditions.append(FileTracked.path.in_(candidates))
+        for removed_dir in removed_dirs:
+            conditions.append(FileTracked.path.startswith(removed_dir, autoescape=True))
+        tracked = {row.path: row for row in query.filter(or_(*conditions)).all()} if conditions else {}
+        
+        def existing_entries():
+            # Rows under removed directories may have been re-created in the same burst
+            for path in candidates | tracked.keys():
+                if not self.is_trackable_path(path, matcher):
+                    continue
+                full_path = os.path.join(project.path, path)
+                signature = self.get_stat_signature(full_path)
+                if signature is None or signature[0] > self.max_file_size or not os.path.isfile(full_path):
+                    continue
+                yield path, signature
+        
+        diff = self._diff_entries(project, tracked, existing_entries())
+        self._mark_deleted(diff, tracked)
+        return diff
+    
+    def _git_changes(self, session: Session, project: Project) -> Optional[Tuple[Dict[str, Any], GitSnapshot]]:
+        """Use the git index to find candidate changes instead of walking the tree
+        
+        Returns None when git cannot be used (not a repository, git missing,
+        paranoid mode, unknown previous HEAD, or edited ignore files), in which
+        case callers fall back to a full walk. Files that git itself ignores but
+        ridge tracks are only picked up by the full walk.
+        """
+        if self.paranoid or not self.use_git:
+            return None
+        
+        git = GitIndex(project.path)
+        snapshot = git.snapshot() if git.is_repository else None
+        if snapshot is None:
+            return None
+        
+        stored = session.query(
+            Project.snapshot_head, Project.snapshot_key, Project.snapshot_dirty
+        ).filter(Project.id == project.id).one()
+        
+        # Nothing changed since the last sync: a single comparison
+        if stored.snapshot_key == snapshot.key:
+            empty = {'changes': [], 'changed_rows': [], 'refreshed_rows': [],
+                     'present': set(), 'unchanged': 0, 'deleted_paths': [], 'snapshot_matched': True}
+            return empty, snapshot
+        
+        if not stored.snapshot_head:
+            # First git-backed sync: enumerate files from the index instead of walking
+            listed = git.ls_files()
+            if listed is None:
+                return None
+            untracked = [path for status, path in snapshot.dirty if status == '??']
+            tracked = self._load_tracked_state(session, project.id)
+            matcher = self.build_ignore_matcher(project.path)
+            
+            def listed_entries():
+                for path in set(listed) | set(untracked):
+                    if not self.is_trackable_path(path, matcher):
+                        continue
+                    signature = self.get_stat_signature(os.path.join(project.path, path))
+                    if signature is None or signature[0] > self.max_file_size:
+                        continue
+                    yield path, signature
+            
+            diff = self._diff_entries(project, tracked, listed_entries())
+            self._mark_deleted(diff, tracked)
+            diff['exhaustive'] = True
+            return diff, snapshot
+        
+        committed = set()
+        if stored.snapshot_head != snapshot.head:
+            committed = git.changed_between(stored.snapshot_head, snapshot.head)
+            if committed is None:
+                return None
+        
+        # Files dirty last time may have been reverted, so they stay candidates
+        previously_dirty = set(filter(None, (stored.snapshot_dirty or '').split('\n')))
+        candidates = committed | snapshot.dirty_paths | previously_dirty
+        
+        # Edited ignore rules can change what is tracked anywhere in the tree
+        if any(os.path.basename(path) in self.ignore_file_names for path in candidates):
+            return None
+        
+        return self._path_changes(session, project, candidates), snapshot
+    
+    def _collect_changes(self, session: Session,
+                         project: Project) -> Tuple[Dict[str, Any], Optional[GitSnapshot]]:
+        """Find changes via the git index when possible, otherwise by walking the tree"""
+        git_result = self._git_changes(session, project)
+        if git_result is not None:
+            return git_result
+        
+        diff = self._scan_changes(session, project)
+        if not self.use_git:
+            return diff, None
+        
+        git = GitIndex(project.path)
+        return diff, git.snapshot() if git.is_repository else None
+    
+    def _write_changes(self, session: Session, project: Project, diff: Dict[str, Any]) -> None:
+        """Persist a diff with batched upserts and deletes (caller commits)"""
+        self._upsert_tracked_files(session, diff['changed_rows'],
+                                   ['hash', 'hash_algorithm', 'size', 'mtime_ns', 'inode', 'last_analyzed',
+                                    'token_count'])
+        self._upsert_tracked_files(session, diff['refreshed_rows'], REFRESH_COLUMNS)
+        self._delete_tracked_paths(session, project.id, diff['deleted_paths'])
+    
+    def _direct_file_hashes(self, session: Session, project: Project, directories: Set[str],
+                            diff: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
+        """Hashes of the files directly inside each directory, with a not-yet-written diff applied
+        
+        Returns {relative_dir: {file_name: hash}}. Only the rows directly
+        under the given directories are loaded, unless there are too many
+        directories to list in one statement.
+        """
+        query = session.query(FileTracked.path, FileTracked.hash).filter(FileTracked.project_id == project.id)
+        if len(directories) <= self.direct_dir_query_limit:
+            conditions = []
+            for relative_dir in directories:
+                prefix = relative_dir + os.sep if relative_dir else ''
+                direct_child = strpos(session, func.substr(FileTracked.path, len(prefix) + 1), os.sep) == 0
+                if prefix:
+                    direct_child = FileTracked.path.startswith(prefix, autoescape=True) & direct_child
+                conditions.append(direct_child)
+            query = query.filter(or_(*conditions))
+        
+        files: Dict[str, Dict[str, str]] = defaultdict(dict)
+        for path, file_hash in query.all():
+            if os.path.dirname(path) in directories:
+                files[os.path.dirname(path)][os.path.basename(path)] = file_hash
+        for row in diff['refreshed_rows']:
+            relative_dir, name = os.path.split(row['path'])
+            if relative_dir in directories:
+                files[relative_dir][name] = row['hash']
+        for change in diff['changes']:
+            relative_dir, name = os.path.split(change['path'])
+            if relative_dir not in directories:
+                continue
+            if change['status'] == 'deleted':
+                files[relative_dir].pop(name, None)
+            else:
+                files[relative_dir][name] = change.get('new_hash', change.get('hash'))
+        return files
+    
+    def _directory_rollups(self, session: Session, project: Project,
+                           diff: Dict[str, Any]) -> Tuple[Dict[str, str], Set[str], Dict[str, Any]]:
+        """Recompute rollups for the directories a diff touched, reusing stored ones elsewhere
+        
+        A directory is dirty when a file directly inside it changed, its
+        mtime moved, it is new, or a child directory was added or removed;
+        its ancestors are dirty with it. Every other subtree keeps its stored
+        rollup, so an unchanged vendored tree costs nothing here. Returns
+        (rollups of dirty directories, removed directories, stored rows).
+        """
+        walk = diff.get('walk')
+        visited = walk.visited_dirs if walk else {}
+        complete_walk = walk is not None and not walk.unreadable_dirs
+        
+        stored = self._load_directory_state(session, project.id)
+        removed = set(stored.keys() - visited.keys()) if complete_walk else set()
+        
+        dirty = {os.path.dirname(change['path']) for change in diff['changes']}
+        dirty.update(os.path.dirname(path) for path in diff.get('rehashed', ()))
+        dirty.update(path for path, mtime_ns in visited.items()
+                     if path not in stored or stored[path].mtime_ns != mtime_ns)
+        dirty.update(os.path.dirname(path) for path in removed if path)
+        for relative_dir in list(dirty):
+            while relative_dir:
+                relative_dir = os.path.dirname(relative_dir)
+                dirty.add(relative_dir)
+        
+        # Without a complete walk, deletions may have taken their directory with them
+        if not complete_walk:
+            for relative_dir in [path for path in dirty if path]:
+                if not os.path.isdir(os.path.join(project.path, relative_dir)):
+                    prefix = relative_dir + os.sep
+                    removed.add(relative_dir)
+                    removed.update(path for path in stored if path.startswith(prefix))
+        dirty -= removed
+        if not dirty:
+            return {}, removed, stored
+        
+        subdirs = defaultdict(list)
+        for relative_dir in (stored.keys() | visited.keys() | dirty) - removed:
+            if relative_dir:
+                subdirs[os.path.dirname(relative_dir)].append(relative_dir)
+        files = self._direct_file_hashes(session, project, dirty, diff)
+        
+        rollups = {}
+        # Deepest directories first so children are hashed before their parents
+        for relative_dir in sorted(dirty, key=lambda d: d.count(os.sep) + bool(d), reverse=True):
+            entries = [('f', name, file_hash or '') for name, file_hash in files[relative_dir].items()]
+            for child in subdirs[relative_dir]:
+                child_hash = rollups[child] if child in rollups else stored[child].hash
+                entries.append(('d', os.path.basename(child), child_hash or ''))
+            rollups[relative_dir] = self._rollup_hash(entries)
+        
+        return rollups, removed, stored
+    
+    def _file_diff(self, path: str, file_hash: str, status: Optional[str] = None) -> Dict[str, Any]:
+        """A one-file diff for _write_directories; without a status only the digest was replaced"""
+        change = {'path': path, 'status': status, 'hash': file_hash}
+        if status:
+            return {'changes': [change], 'refreshed_rows': []}
+        return {'changes': [], 'refreshed_rows': [change], 'rehashed': [path]}
+    
+    def _write_directories(self, session: Session, project: Project, diff: Dict[str, Any]) -> bool:
+        """Store rollups for the directories a sync touched (caller commits); returns whether any moved"""
+        walk = diff.get('walk')
+        visited = walk.visited_dirs if walk else {}
+        rollups, removed, stored = self._directory_rollups(session, project, diff)
+        
+        rows = []
+        for path, rollup in rollups.items():
+            previous = stored.get(path)
+            mtime_ns = visited.get(path, previous.mtime_ns if previous else None)
+            if previous is None or previous.hash != rollup or previous.mtime_ns != mtime_ns:
+                rows.append({'project_id': project.id, 'path': path, 'hash': rollup, 'mtime_ns': mtime_ns})
+        
+        self._upsert_tracked_files(session, rows, ['hash', 'mtime_ns'], model=DirectoryTracked)
+        self._delete_tracked_paths(session, project.id, sorted(removed), model=DirectoryTracked)
+        return bool(rows or removed)
+    
+    def _store_snapshot(self, session: Session, project: Project,
+                        snapshot: Optional[GitSnapshot]) -> None:
+        """Remember the git snapshot the tracked rows now correspond to (caller commits)"""
+        if snapshot is None:
+            return
+        session.query(Project).filter(Project.id == project.id).update({
+            Project.snapshot_head: snapshot.head,
+            Project.snapshot_key: snapshot.key,
+            Project.snapshot_dirty: '\n'.join(sorted(snapshot.dirty_paths))
+        }, synchronize_session=False)
+    
     def get_changed_files(self, project: Project) -> List[Dict[str, any]]:
         """Get list of files that have changed since last scan"""
         session = self.db.get_session()
         try:
-            tracked_files = session.query(FileTracked).filter_by(
-                project_id=project.id
-            ).all()
-            
-            changed_files = []
-            current_files = set(self.scan_project_files(project))
-            tracked_paths = {tf.path for tf in tracked_files}
+            diff, _ = self._collect_changes(session, project)
             
-            # Check for new files
-            new_files = current_files - tracked_paths
-            for file_path in new_files:
-                changed_files.append({
-                    'path': file_path,
-                    'status': 'new',
-                    'hash': self.get_file_hash(os.path.join(project.path, file_path))
-                })
-            
-            # Check for modified files
-            for tracked_file in tracked_files:
-                if tracked_file.path in current_files:
-                    full_path = os.path.join(project.path, tracked_file.path)
-                    current_hash = self.get_file_hash(full_path)
-                    
-                    if current_hash and current_hash != tracked_file.hash:
-                        changed_files.append({
-                            'path': tracked_file.path,
-                            'status': 'modified',
-                            'old_hash': tracked_file.hash,
-                            'new_hash': current_hash
-                        })
-                else:
-                    # File was deleted
-                    changed_files.append({
-                        'path': tracked_file.path,
-                        'status': 'deleted',
-                        'hash': tracked_file.hash
-                    })
+            if diff['refreshed_rows']:
+                try:
+                    self._upsert_tracked_files(session, diff['refreshed_rows'], REFRESH_COLUMNS)
+                    session.commit()
+                except Exception:
+                    session.rollback()
             
-            return changed_files
+            return diff['changes']
             
         finally:
             self.db.close_session(session)
     
-    def sync_project_files(self, project: Project) -> Dict[str, int]:
-        """Synchronize all project files with tracking database"""
+    def get_changed_directories(self, project: Project) -> List[Dict[str, any]]:
+        """Get directories whose Merkle rollup hash differs from the last sync"""
         session = self.db.get_session()
         try:
-            current_files = self.scan_project_files(project)
-            stats = {'new': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+            diff, _ = self._collect_changes(session, project)
+            rollups, removed, stored = self._directory_rollups(session, project, diff)
             
-            # Track current files
-            for file_path in current_files:
-                full_path = os.path.join(project.path, file_path)
-                file_hash = self.get_file_hash(full_path)
+            empty_rollup = self._rollup_hash([])
+            changed_dirs = []
+            for path in sorted(rollups.keys() | removed):
+                old_hash = stored[path].hash if path in stored else None
+                new_hash = None if path in removed else rollups[path]
                 
-                if not file_hash:
+                # Directories without tracked files only matter for mtime bookkeeping
+                if old_hash in (None, empty_rollup) and new_hash in (None, empty_rollup):
+                    continue
+                if old_hash == new_hash:
                     continue
                 
-                tracked_file = session.query(FileTracked).filter_by(
-                    project_id=project.id,
-                    path=file_path
-                ).first()
-                
-                if tracked_file:
-                    if tracked_file.hash != file_hash:
-                        tracked_file.hash = file_hash
-                        tracked_file.last_analyzed = datetime.now(timezone.utc)
-                        stats['updated'] += 1
-                    else:
-                        stats['unchanged'] += 1
-                else:
-                    new_tracked_file = FileTracked(
-                        project_id=project.id,
-                        path=file_path,
-                        hash=file_hash
-                    )
-                    session.add(new_tracked_file)
+                status = 'new' if old_hash is None else 'deleted' if new_hash is None else 'modified'
+                changed_dirs.append({
+                    'path': path or '.',
+                    'status': status,
+                    'old_hash': old_hash,
+                    'new_hash': new_hash
+                })
+            
+            return changed_dirs
+            
+        except Exception as e:
+            self.console.print(f"[red]Error checking directory changes: {e}[/red]")
+            return []
+        finally:
+            self.db.close_session(session)
+    
+    def sync_project_files(self, project: Project) -> Dict[str, int]:
+        """Synchronize all project files with tracking database
+        
+        Candidates come from the git index when possible, otherwise from a full
+        walk diffed in memory against one bulk load of the tracked state.
+        Results are written with batched upserts and deletes, and only the
+        directory rollups above changed paths are recomputed. A matching git
+        snapshot returns before anything else is loaded.
+        """
+        session = self.db.get_session()
+        try:
+            diff, snapshot = self._collect_changes(session, project)
+            
+            stats = {'new': 0, 'updated': 0, 'unchanged': 0, 'deleted': len(diff['deleted_paths'])}
+            for change in diff['changes']:
+                if change['status'] == 'new':
                     stats['new'] += 1
+                elif change['status'] == 'modified':
+                    stats['updated'] += 1
             
-            # Remove tracking for deleted files
-            tracked_files = session.query(FileTracked).filter_by(
-                project_id=project.id
-            ).all()
+            if not diff.get('snapshot_matched'):
+                self._write_directories(session, project, diff)
+                self._write_changes(session, project, diff)
+                self._store_snapshot(session, project, snapshot)
+                session.commit()
             
-            current_file_set = set(current_files)
-            for tracked_file in tracked_files:
-                if tracked_file.path not in current_file_set:
-                    session.delete(tracked_file)
-                    stats['deleted'] += 1
+            # A full walk saw every file; other paths only diffed the candidates
+            if diff.get('exhaustive'):
+                stats['unchanged'] = diff['unchanged']
+            else:
+                stats['unchanged'] = session.query(FileTracked).filter(
+                    FileTracked.project_id == project.id
+                ).count() - stats['new'] - stats['updated']
             
-            session.commit()
+            if diff['changes']:
+                get_cache().bump_project(project.id)
             return stats
             
         except Exception as e:
@@ -226,9 +907,42 @@ class FileTracker:
         finally:
             self.db.close_session(session)
     
-    def display_file_changes(self, project: Project) -> None:
+    def apply_changes(self, project: Project, changed_paths: Iterable[str]) -> List[Dict[str, any]]:
+        """Resync only the given relative paths and return their change records
+        
+        Used by watch mode: only the FileTracked rows for reported paths are
+        loaded and written, along with the rollups of their directories. Paths
+        ending in os.sep stand for removed directories and delete every
+        tracked row underneath them.
+        """
+        changed_paths = list(changed_paths)
+        removed_dirs = [path for path in changed_paths if path.endswith(os.sep)]
+        candidates = [path for path in changed_paths if not path.endswith(os.sep)]
+        
+        if not candidates and not removed_dirs:
+            return []
+        
+        session = self.db.get_session()
+        try:
+            diff = self._path_changes(session, project, candidates, removed_dirs)
+            self._write_directories(session, project, diff)
+            self._write_changes(session, project, diff)
+            session.commit()
+            get_cache().bump_project(project.id)
+            return diff['changes']
+            
+        except Exception as e:
+            session.rollback()
+            self.console.print(f"[red]Error applying file changes: {e}[/red]")
+            return []
+        finally:
+            self.db.close_session(session)
+    
+    def display_file_changes(self, project: Project,
+                             changed_files: Optional[List[Dict[str, any]]] = None) -> None:
         """Display file changes in a nice table"""
-        changed_files = self.get_changed_files(project)
+        if changed_files is None:
+            changed_files = self.get_changed_files(project)
         
         if not changed_files:
             self.console.print("[green]No file changes detected[/green]")
@@ -253,16 +967,46 @@ class FileTracker:
         
         self.console.print(table)
     
+    def display_directory_changes(self, project: Project) -> None:
+        """Display directories whose rollup hash changed since the last sync"""
+        changed_dirs = self.get_changed_directories(project)
+        
+        if not changed_dirs:
+            self.console.print("[green]No directory changes detected[/green]")
+            return
+        
+        table = Table(title="Directory Changes Detected")
+        table.add_column("Directory", style="cyan", width=50)
+        table.add_column("Status", style="green", width=12)
+        table.add_column("Rollup", style="dim", width=16)
+        
+        for dir_info in changed_dirs:
+            status_color = {
+                'new': 'green',
+                'modified': 'yellow',
+                'deleted': 'red'
+            }.get(dir_info['status'], 'white')
+            
+            status = f"[{status_color}]{dir_info['status'].upper()}[/{status_color}]"
+            hash_display = (dir_info['new_hash'] or dir_info['old_hash'])[:12] + '...'
+            
+            table.add_row(dir_info['path'], status, hash_display)
+        
+        self.console.print(table)
+    
     def get_file_insights(self, project: Project, file_path: str) -> Optional[str]:
         """Get cached insights for a specific file"""
+        cache = get_cache()
+        return cache.get_or_load('insights', cache.project_key(project.id, 'insights', file_path),
+                                 lambda: self._load_file_insights(project, file_path))
+    
+    def _load_file_insights(self, project: Project, file_path: str) -> Optional[str]:
         session = self.db.get_session()
         try:
-            tracked_file = session.query(FileTracked).filter_by(
+            return session.query(FileTracked.insights).filter_by(
                 project_id=project.id,
                 path=file_path
-            ).first()
-            
-            return tracked_file.insights if tracked_file else None
+            ).scalar()
             
         finally:
             self.db.close_session(session)
@@ -280,6 +1024,7 @@ class FileTracker:
                 tracked_file.insights = insights
                 tracked_file.last_analyzed = datetime.now(timezone.utc)
                 session.commit()
+                get_cache().bump_project(project.id)
                 return True
             
             return False
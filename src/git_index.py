@@ -0,0 +1,137 @@
+# src/git_index.py - Git index queries for cheap change detection
+
+import os
+import hashlib
+import subprocess
+from typing import List, Optional, Set, Tuple
+
+
+class GitSnapshot:
+    """HEAD commit plus dirty set for a project inside a git work tree"""
+
+    __slots__ = ('head', 'dirty', 'key')
+
+    def __init__(self, head: str, dirty: List[Tuple[str, str]], key: str):
+        self.head = head
+        self.dirty = dirty  # [(porcelain status, project-relative path)]
+        self.key = key
+
+    @property
+    def dirty_paths(self) -> Set[str]:
+        return {path for _, path in self.dirty}
+
+    def __repr__(self):
+        return f"<GitSnapshot(head='{self.head[:8]}', dirty={len(self.dirty)})>"
+
+
+class GitIndex:
+    """Thin wrapper around git plumbing for one project directory
+
+    Paths returned by git are relative to the repository root; they are
+    rewritten relative to the project directory, which may be a subdirectory.
+    """
+
+    def __init__(self, project_path: str, timeout: float = 10.0):
+        self.project_path = project_path
+        self.timeout = timeout
+        self.prefix = None  # Project directory relative to the repo root ('' at the root)
+
+        output = self._git('rev-parse', '--is-inside-work-tree', '--show-prefix')
+        if output is not None:
+            lines = output.decode().split('\n')
+            if lines and lines[0] == 'true':
+                self.prefix = lines[1] if len(lines) > 1 else ''
+
+    @property
+    def is_repository(self) -> bool:
+        return self.prefix is not None
+
+    def _git(self, *args: str) -> Optional[bytes]:
+        """Run a git command in the project directory, returning stdout or None on failure"""
+        try:
+            result = subprocess.run(
+                ['git', '-C', self.project_path, *args],
+                capture_output=True, timeout=self.timeout
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return result.stdout if result.returncode == 0 else None
+
+    def _relative(self, repo_path: str) -> Optional[str]:
+        """Convert a repo-root-relative path to a project-relative one"""
+        if not repo_path.startswith(self.prefix):
+            return None
+        return repo_path[len(self.prefix):].replace('/', os.sep)
+
+    def head(self) -> Optional[str]:
+        """Get the current HEAD commit (None for an unborn branch)"""
+        output = self._git('rev-parse', '--verify', '--quiet', 'HEAD')
+        return output.decode().strip() if output else None
+
+    def dirty_entries(self) -> Optional[List[Tuple[str, str]]]:
+        """List modified, staged and untracked files from `git status --porcelain -z`"""
+        output = self._git('status', '--porcelain', '-z', '--untracked-files=all', '--', '.')
+        if output is None:
+            return None
+
+        entries = []
+        fields = output.decode(errors='surrogateescape').split('\0')
+        i = 0
+        while i < len(fields):
+            field = fields[i]
+            i += 1
+            if len(field) < 4:
+                continue
+            status, repo_path = field[:2], field[3:]
+            paths = [repo_path]
+            if 'R' in status or 'C' in status:
+                # Renames and copies are followed by the original path
+                paths.append(fields[i])
+                i += 1
+            for path in paths:
+                relative_path = self._relative(path)
+                if relative_path:
+                    entries.append((status, relative_path))
+        return entries
+
+    def changed_between(self, old_head: str, new_head: str) -> Optional[Set[str]]:
+        """Paths that differ between two commits (None if either is unknown)"""
+        output = self._git('diff', '--name-only', '-z', '--no-renames', old_head, new_head, '--', '.')
+        if output is None:
+            return None
+        paths = set()
+        for repo_path in output.decode(errors='surrogateescape').split('\0'):
+            relative_path = self._relative(repo_path) if repo_path else None
+            if relative_path:
+                paths.add(relative_path)
+        return paths
+
+    def ls_files(self) -> Optional[List[str]]:
+        """List files recorded in the index below the project directory"""
+        output = self._git('ls-files', '-z', '--', '.')
+        if output is None:
+            return None
+        return [path.replace('/', os.sep)
+                for path in output.decode(errors='surrogateescape').split('\0') if path]
+
+    def snapshot(self) -> Optional[GitSnapshot]:
+        """Build the snapshot key from HEAD and the dirty set
+
+        Dirty files contribute their stat signature so a file that keeps
+        changing while already dirty still produces a new key.
+        """
+        head = self.head()
+        dirty = self.dirty_entries() if head else None
+        if dirty is None:
+            return None
+
+        digest = hashlib.sha256(head.encode())
+        for status, path in sorted(dirty, key=lambda entry: entry[1]):
+            try:
+                stat_result = os.stat(os.path.join(self.project_path, path))
+                signature = f"{stat_result.st_size}:{stat_result.st_mtime_ns}"
+            except OSError:
+                signature = 'missing'
+            digest.update(f"\0{status}\0{path}\0{signature}".encode(errors='surrogateescape'))
+
+        return GitSnapshot(head, dirty, digest.hexdigest())
@@ -0,0 +1,113 @@
+# src/hashing.py - Shared content-hash service for tracking, backups and edits
+
+import os
+import mmap
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Streaming hash settings: read in fixed-size chunks, map files at or above the threshold
+HASH_CHUNK_SIZE = 1024 * 1024
+HASH_MMAP_THRESHOLD = 16 * 1024 * 1024
+
+# Supported algorithms; every digest is 32 bytes so it fits the 64-char hash columns
+HASH_ALGORITHMS = {
+    'sha256': hashlib.sha256,
+    'blake2b': lambda: hashlib.blake2b(digest_size=32),
+}
+
+
+def hash_file_stream(filepath: str, algorithm: str = 'sha256', chunk_size: int = HASH_CHUNK_SIZE,
+                     mmap_threshold: int = HASH_MMAP_THRESHOLD) -> str:
+    """Hash file bytes without loading the whole file into memory
+
+    Small files are read in chunk_size pieces; large files are mapped and fed
+    to the hasher one chunk-sized slice at a time, so memory stays flat
+    regardless of file size. Raises OSError like open().
+    """
+    digest = HASH_ALGORITHMS[algorithm]() if algorithm in HASH_ALGORITHMS else hashlib.new(algorithm)
+    with open(filepath, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= mmap_threshold:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    for offset in range(0, len(view), chunk_size):
+                        digest.update(view[offset:offset + chunk_size])
+                finally:
+                    view.release()
+        else:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentHasher:
+    """Hashes file contents with an in-process cache keyed by (path, size, mtime_ns)
+
+    One instance is shared per process (see get_hasher), so a file that the
+    tracker, the backup manager and the edit flow all look at in one run is
+    read once. Safe to call from the tracker's hashing threads.
+    """
+
+    def __init__(self, algorithm: Optional[str] = None, cache_size: Optional[int] = None):
+        self.algorithm = algorithm or os.getenv('RIDGE_HASH_ALGORITHM', 'sha256')
+        if self.algorithm not in HASH_ALGORITHMS:
+            raise ValueError(f"Unsupported hash algorithm '{self.algorithm}' "
+                             f"(choose from {', '.join(HASH_ALGORITHMS)})")
+
+        self.cache_size = cache_size if cache_size is not None else int(
+            os.getenv('RIDGE_HASH_CACHE_SIZE', '10000'))
+        self._cache: 'OrderedDict[Tuple[str, int, int], str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def hash_file(self, file_path: str, stat_result: Optional[os.stat_result] = None,
+                  use_cache: bool = True) -> str:
+        """Get the content hash for a file, reusing a cached digest while its stat is unchanged
+
+        Pass stat_result when the caller already has one; use_cache=False
+        forces a fresh read (paranoid mode). Raises OSError like open().
+        """
+        if not use_cache or not self.cache_size:
+            return hash_file_stream(file_path, self.algorithm)
+
+        if stat_result is None:
+            stat_result = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat_result.st_size, stat_result.st_mtime_ns)
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        file_hash = hash_file_stream(file_path, self.algorithm)
+
+        with self._lock:
+            self._cache[key] = file_hash
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return file_hash
+
+    def clear(self) -> None:
+        """Drop every cached digest"""
+        with self._lock:
+            self._cache.clear()
+
+
+_default_hasher: Optional[ContentHasher] = None
+_default_hasher_lock = threading.Lock()
+
+
+def get_hasher() -> ContentHasher:
+    """Get the process-wide ContentHasher"""
+    global _default_hasher
+    with _default_hasher_lock:
+        if _default_hasher is None:
+            _default_hasher = ContentHasher()
+        return _default_hasher
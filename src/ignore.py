@@ -0,0 +1,164 @@
+# src/ignore.py - Compiled .gitignore-style matcher for file tracking
+
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Ignore files read from every directory, in increasing order of precedence
+DEFAULT_IGNORE_FILES = ('.gitignore', '.ignore', '.ridgeignore')
+
+
+class IgnoreRule:
+    """A single compiled ignore pattern"""
+
+    __slots__ = ('pattern', 'regex', 'negated', 'dir_only')
+
+    def __init__(self, pattern: str, regex: 're.Pattern', negated: bool, dir_only: bool):
+        self.pattern = pattern
+        self.regex = regex
+        self.negated = negated
+        self.dir_only = dir_only
+
+    def __repr__(self):
+        return f"<IgnoreRule(pattern='{self.pattern}', negated={self.negated})>"
+
+
+def _translate_glob(glob: str) -> str:
+    """Translate a gitignore glob (without anchors) into a regex fragment"""
+    regex = []
+    i = 0
+    while i < len(glob):
+        char = glob[i]
+        if char == '*':
+            if glob.startswith('**/', i):
+                regex.append('(?:.*/)?')
+                i += 3
+                continue
+            if glob.startswith('**', i) and i + 2 == len(glob):
+                regex.append('.*')
+                i += 2
+                continue
+            regex.append('[^/]*')
+        elif char == '?':
+            regex.append('[^/]')
+        elif char == '[':
+            end = glob.find(']', i + 2 if glob.startswith('[!', i) or glob.startswith('[]', i) else i + 1)
+            if end == -1:
+                regex.append(re.escape(char))
+            else:
+                body = glob[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                regex.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif char == '\\' and i + 1 < len(glob):
+            i += 1
+            regex.append(re.escape(glob[i]))
+        else:
+            regex.append(re.escape(char))
+        i += 1
+    return ''.join(regex)
+
+
+def compile_rule(line: str) -> Optional[IgnoreRule]:
+    """Compile one ignore-file line, returning None for blanks and comments"""
+    line = line.rstrip('\n\r')
+
+    # Trailing spaces are ignored unless escaped
+    stripped = line.rstrip(' ')
+    if stripped.endswith('\\') and len(stripped) < len(line):
+        stripped += ' '
+    line = stripped
+
+    if not line or line.startswith('#'):
+        return None
+
+    pattern = line
+    negated = line.startswith('!')
+    if negated:
+        line = line[1:]
+    elif line.startswith('\\'):
+        line = line[1:]  # "\#" and "\!" match literal leading characters
+
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+
+    # A slash anywhere but the end anchors the pattern to the ignore file's directory
+    anchored = '/' in line
+    line = line.lstrip('/')
+
+    prefix = '^' if anchored else '^(?:.*/)?'
+    return IgnoreRule(pattern, re.compile(prefix + _translate_glob(line) + '$'), negated, dir_only)
+
+
+class IgnoreMatcher:
+    """Evaluates nested .gitignore/.ignore/.ridgeignore rules for one scan
+
+    Rules are loaded lazily per directory and combined with their parents'
+    rules once, so each path check is a reverse walk over precompiled
+    regexes where the last matching rule wins (negations re-include).
+    """
+
+    def __init__(self, root: str, ignore_file_names: Tuple[str, ...] = DEFAULT_IGNORE_FILES):
+        self.root = root
+        self.ignore_file_names = ignore_file_names
+        # relative dir -> [(base dir of rule file, rule)] effective in that dir
+        self._rules: Dict[str, List[Tuple[str, IgnoreRule]]] = {}
+
+    def _read_rules(self, relative_dir: str) -> List[IgnoreRule]:
+        """Read and compile the ignore files that live in one directory"""
+        file_paths = [os.path.join(self.root, relative_dir, name) for name in self.ignore_file_names]
+        if not relative_dir:
+            # Repository-local excludes sit below the root, ahead of .gitignore
+            file_paths.insert(0, os.path.join(self.root, '.git', 'info', 'exclude'))
+
+        rules = []
+        for file_path in file_paths:
+            try:
+                with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                    for line in f:
+                        rule = compile_rule(line)
+                        if rule:
+                            rules.append(rule)
+            except OSError:
+                continue
+        return rules
+
+    def _rules_for_dir(self, relative_dir: str) -> List[Tuple[str, IgnoreRule]]:
+        """Get the effective rule list for a directory, building parents first"""
+        cached = self._rules.get(relative_dir)
+        if cached is not None:
+            return cached
+
+        parent_rules = self._rules_for_dir(os.path.dirname(relative_dir)) if relative_dir else []
+        own_rules = [(relative_dir, rule) for rule in self._read_rules(relative_dir)]
+        rules = parent_rules + own_rules if own_rules else parent_rules
+        self._rules[relative_dir] = rules
+        return rules
+
+    def is_ignored(self, relative_path: str, is_dir: bool = False) -> bool:
+        """Check one path, assuming its parent directories are not ignored
+
+        This is what a top-down walk needs: ignored directories are pruned
+        before their contents are ever checked.
+        """
+        relative_path = relative_path.replace(os.sep, '/')
+        rules = self._rules_for_dir(os.path.dirname(relative_path))
+
+        for base_dir, rule in reversed(rules):
+            if rule.dir_only and not is_dir:
+                continue
+            candidate = relative_path[len(base_dir) + 1:] if base_dir else relative_path
+            if rule.regex.match(candidate):
+                return not rule.negated
+        return False
+
+    def is_ignored_path(self, relative_path: str) -> bool:
+        """Check a file path outside of a walk, including all its parent directories"""
+        parts = relative_path.replace(os.sep, '/').split('/')
+        for depth in range(1, len(parts)):
+            if self.is_ignored('/'.join(parts[:depth]), is_dir=True):
+                return True
+        return self.is_ignored(relative_path)
@@ -0,0 +1,237 @@
+# src/log_writer.py - Write-behind queue for memory logging with a crash-safe journal
+
+import os
+import re
+import json
+import time
+import uuid
+import queue
+import atexit
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from rich.console import Console
+
+# Journals live outside any project; one file per writer, named after its process, so
+# concurrent writers and ridge runs never replay each other's work
+DEFAULT_JOURNAL_DIR = os.path.join(os.path.expanduser('~'), '.ridge', 'log_journal')
+JOURNAL_NAME = re.compile(r'journal-(\d+)(?:-[0-9a-f]+)?\.jsonl')
+
+_STOP = object()
+
+# Journals written or claimed by writers in this process; replay() never touches them
+_owned_journals = set()
+_owned_journals_lock = threading.Lock()
+
+
+def _new_journal_path(journal_dir: str) -> str:
+    """Reserve a journal file name for a writer in this process"""
+    path = os.path.join(journal_dir, f"journal-{os.getpid()}-{uuid.uuid4().hex[:12]}.jsonl")
+    with _owned_journals_lock:
+        _owned_journals.add(path)
+    return path
+
+
+def _process_alive(pid: int) -> bool:
+    """Check whether a process id is still running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class LogWriter:
+    """Background writer that commits log entries in batches
+
+    submit() appends the entry to this process's journal and fsyncs it
+    before queueing, so once it returns the entry survives a crash. A
+    worker thread drains the bounded queue, hands each batch to
+    write_batch(session, entries) inside one transaction, records the
+    committed ids in the journal and then calls after_commit(entries). Journals left by dead processes are
+    replayed on start, skipping entries already marked as committed.
+    Each writer has its own journal, so several writers in one process
+    never replay or delete each other's pending entries.
+    """
+
+    def __init__(self, db, write_batch: Callable[[Any, List[Dict[str, Any]]], None],
+                 after_commit: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                 journal_dir: Optional[str] = None, batch_size: int = 50,
+                 flush_interval: float = 0.2, queue_size: int = 1000):
+        self.console = Console()
+        self.db = db
+        self.write_batch = write_batch
+        self.after_commit = after_commit
+        self.journal_dir = journal_dir or os.getenv('RIDGE_LOG_JOURNAL_DIR', DEFAULT_JOURNAL_DIR)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.journal_path = _new_journal_path(self.journal_dir)
+        self._journal_lock = threading.Lock()
+        self._pending = 0  # Entries journaled but not yet committed
+        self._idle = threading.Condition(self._journal_lock)
+        self._failed = False  # Failed batches stay in the journal for the next replay
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self) -> 'LogWriter':
+        """Replay orphaned journals, then start the worker thread"""
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self.replay()
+
+        self._worker = threading.Thread(target=self._run, name='ridge-log-writer', daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+        return self
+
+    # -- journal --------------------------------------------------------------
+
+    def _append_journal(self, records: List[Dict[str, Any]], journal_path: Optional[str] = None) -> None:
+        """Append records and fsync (caller holds the journal lock, or owns journal_path)"""
+        with open(journal_path or self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(record) + '\n' for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _read_journal(journal_path: str) -> List[Dict[str, Any]]:
+        """Read the uncommitted entries from one journal"""
+        entries: Dict[str, Dict[str, Any]] = {}
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # Torn final line: the entry was never acknowledged
+                if 'done' in record:
+                    for entry_id in record['done']:
+                        entries.pop(entry_id, None)
+                else:
+                    entries[record['entry_id']] = record
+        return list(entries.values())
+
+    def replay(self) -> int:
+        """Commit entries from journals whose process died before flushing them
+        
+        A journal is claimed by renaming it into this process's name space
+        first, so two ridge runs starting together never replay it twice,
+        and replayed batches are marked done as they commit.
+        """
+        replayed = 0
+        for name in sorted(os.listdir(self.journal_dir)):
+            match = JOURNAL_NAME.fullmatch(name)
+            if not match:
+                continue
+            journal_path = os.path.join(self.journal_dir, name)
+            pid = int(match.group(1))
+            if pid == os.getpid():
+                # Ours unless an earlier process had the same pid (e.g. in a container)
+                with _owned_journals_lock:
+                    if journal_path in _owned_journals:
+                        continue
+            elif _process_alive(pid):
+                continue
+
+            claimed_path = _new_journal_path(self.journal_dir)
+            try:
+                os.rename(journal_path, claimed_path)
+            except OSError:
+                continue  # Another process claimed it first
+
+            entries = self._read_journal(claimed_path)
+            for start in range(0, len(entries), self.batch_size):
+                batch = entries[start:start + self.batch_size]
+                if not self._commit(batch):
+                    self.console.print(f"[red]Could not replay log journal {claimed_path}; keeping it[/red]")
+                    break
+                self._append_journal([{'done': [entry['entry_id'] for entry in batch]}], claimed_path)
+                replayed += len(batch)
+            else:
+                os.remove(claimed_path)
+
+        if replayed:
+            self.console.print(f"[dim]Recovered {replayed} unsaved log entries[/dim]")
+        return replayed
+
+    # -- queue ----------------------------------------------------------------
+
+    def submit(self, kind: str, **fields: Any) -> None:
+        """Durably accept one log entry; blocks only when the queue is full"""
+        entry = {'entry_id': uuid.uuid4().hex, 'kind': kind, **fields}
+        with self._journal_lock:
+            self._append_journal([entry])
+            self._pending += 1
+        self.queue.put(entry)
+
+    def _commit(self, entries: List[Dict[str, Any]]) -> bool:
+        """Write one batch in a single transaction"""
+        session = self.db.get_session()
+        try:
+            self.write_batch(session, entries)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            self.console.print(f"[red]Error writing {len(entries)} log entries: {e}[/red]")
+            return False
+        finally:
+            self.db.close_session(session)
+
+        if self.after_commit:
+            try:
+                self.after_commit(entries)
+            except Exception as e:
+                self.console.print(f"[dim]Post-commit hook failed: {e}[/dim]")
+        return True
+
+    def _run(self) -> None:
+        """Worker loop: collect a batch for up to flush_interval, commit it, repeat"""
+        stopping = False
+        while not stopping:
+            entry = self.queue.get()
+            if entry is _STOP:
+                break
+
+            batch = [entry]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    entry = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+
+            committed = self._commit(batch)
+
+            with self._journal_lock:
+                if committed:
+                    self._append_journal([{'done': [entry['entry_id'] for entry in batch]}])
+                else:
+                    self._failed = True
+                self._pending -= len(batch)
+                if self._pending == 0:
+                    if not self._failed:
+                        # Everything acknowledged is committed; start the journal afresh
+                        try:
+                            os.remove(self.journal_path)
+                        except OSError:
+                            pass
+                    self._idle.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every submitted entry has been written (or failed)"""
+        with self._journal_lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Flush outstanding entries and stop the worker (registered with atexit)"""
+        if self._worker is None:
+            return
+        self.queue.put(_STOP)
+        self._worker.join(timeout)
+        self._worker = None
+        atexit.unregister(self.close)
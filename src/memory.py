@@ -1,37 +1,150 @@
 # src/memory.py - Updated with Context Management Integration
 
 import os
+import re
+import json
+import zlib
+import threading
 from datetime import datetime, timezone, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+from sqlalchemy import case, cast, column, func, literal, literal_column, table
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.exc import ProgrammingError
 from sqlalchemy.orm import Session
 from rich.console import Console
+from rich.markup import escape
 from rich.table import Table
 from rich.panel import Panel
 from rich.text import Text
 
-from models import Project, Conversation, Decision, FileTracked, Checkpoint
-from database import Database
+from models import Project, Conversation, Decision, Checkpoint, ProjectStats
+from cache import get_cache
+from database import Database, database_key
+from dialect import greatest, is_sqlite, least, strpos
+from project_stats import record_checkpoint, record_conversation
+from log_writer import LogWriter
+from tokenizer import count_tokens
+from retrieval import MemoryIndex
+from context_fetch import FetchedContext, fetch_context
+from rows import (ConversationPreview, DecisionPreview, CheckpointRow, select_conversation_previews,
+                  select_decision_previews, select_checkpoints, fetch_rows)
+
+# Text search configuration used by sql/migrate_memory_fts.sql
+SEARCH_CONFIG = 'english'
+
+# ts_headline markers, swapped for Rich markup after the snippet is escaped
+HEADLINE_START, HEADLINE_STOP = '\u00ab', '\u00bb'
+HEADLINE_OPTIONS = (f'StartSel={HEADLINE_START}, StopSel={HEADLINE_STOP}, '
+                    'MaxWords=20, MinWords=8, MaxFragments=2, FragmentDelimiter=" ... "')
+
+SEARCH_MODES = ('fts', 'trigram', 'like')
+
+# Characters of context kept on each side of a trigram match snippet
+SNIPPET_CONTEXT = 40
+
+# Server-side preview widths for search results: (command, response) and decision text
+RESULT_PREVIEW_CHARS = (30, 50)
+RESULT_DECISION_CHARS = 60
+
+# Items stored in the context bundle materialized with each checkpoint
+BUNDLE_LIMITS = {'conversations': 20, 'decisions': 10, 'tracked_files': 10}
+
+def build_tsquery(search_term: str) -> str:
+    """Turn a search string into to_tsquery syntax
+    
+    Words are ANDed together, "quoted phrases" become <-> phrase queries and a
+    trailing * makes a prefix match (sess* -> sess:*). Everything else is
+    stripped, so user input can never produce a tsquery syntax error.
+    """
+    clauses = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', search_term):
+        if phrase:
+            words = re.findall(r'\w+', phrase)
+            if words:
+                clauses.append('(' + ' <-> '.join(words) + ')')
+        else:
+            words = re.findall(r'\w+', word)
+            if not words:
+                continue
+            prefix = ':*' if word.endswith('*') else ''
+            # Punctuated words (file_tracker.py) keep their parts adjacent
+            if len(words) > 1:
+                clauses.append('(' + ' <-> '.join(words[:-1] + [words[-1] + prefix]) + ')')
+            else:
+                clauses.append(words[0] + prefix)
+    return ' & '.join(clauses)
+
+def build_fts5_query(search_term: str) -> str:
+    """Turn a search string into an FTS5 MATCH expression, with build_tsquery's rules
+    
+    Every word and phrase is double-quoted, so FTS5 operators and column
+    filters in user input are matched as plain text.
+    """
+    clauses = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', search_term):
+        words = re.findall(r'\w+', phrase or word)
+        if not words:
+            continue
+        prefix = '*' if not phrase and word.endswith('*') else ''
+        clauses.append('"' + ' '.join(words) + '"' + prefix)
+    return ' AND '.join(clauses)
+
+# FTS5 tables kept in sync by triggers on SQLite (see models.py)
+CONVERSATIONS_FTS = table('conversations_fts', column('rowid'))
+DECISIONS_FTS = table('decisions_fts', column('rowid'))
 
 class MemoryManager:
-    def __init__(self):
+    def __init__(self, write_behind: Optional[bool] = None):
         self.console = Console()
         self.db = Database()
         self.current_project = None
+        self._memory_index = None  # (project id, MemoryIndex), loaded on first use
+        self._index_lock = threading.Lock()  # The log writer thread also refreshes the index
+        
+        # Write-behind logging: log_* calls journal and return, a background thread commits.
+        # RIDGE_WRITE_BEHIND=0 makes every log call commit before returning.
+        if write_behind is None:
+            write_behind = os.getenv('RIDGE_WRITE_BEHIND', '1') == '1'
+        self.log_writer = None
+        if write_behind:
+            try:
+                self.log_writer = LogWriter(self.db, self._write_log_entries,
+                                            after_commit=self._after_log_commit).start()
+            except OSError as e:
+                self.console.print(f"[dim]Log journal unavailable, logging synchronously: {e}[/dim]")
         
         # Auto-load current project if there's only one active
         self._auto_load_project()
     
     def _auto_load_project(self):
-        """Automatically load the most recently active project"""
+        """Automatically load the most recently active project (cached until a project is initialized)"""
+        cache = get_cache()
+        fields = cache.get_or_load('project', f"active_project:{cache.version('projects')}",
+                                   self._load_active_project)
+        if fields:
+            self.current_project = Project(
+                **dict(fields,
+                       created_at=datetime.fromisoformat(fields['created_at']) if fields['created_at'] else None,
+                       last_active=datetime.fromisoformat(fields['last_active']) if fields['last_active'] else None)
+            )
+    
+    def _load_active_project(self) -> Optional[Dict[str, Any]]:
+        """Columns of the most recently active project, as cached by _auto_load_project"""
         session = self.db.get_session()
         try:
-            # Get the most recently active project
             project = session.query(Project).filter_by(
                 status='active'
             ).order_by(Project.last_active.desc()).first()
-        
-            if project:
-                self.current_project = project
+            if project is None:
+                return None
+            return {
+                'id': project.id,
+                'name': project.name,
+                'path': project.path,
+                'status': project.status,
+                'created_at': project.created_at.isoformat() if project.created_at else None,
+                'last_active': project.last_active.isoformat() if project.last_active else None,
+            }
         finally:
             self.db.close_session(session)
     
@@ -50,6 +163,7 @@ class MemoryManager:
                 existing_project.last_active = datetime.now(timezone.utc)
                 existing_project.status = 'active'
                 session.commit()
+                get_cache().bump('projects')
                 self.console.print(f"[green]✓[/green] Activated existing project: [bold]{project_name}[/bold]")
             else:
                 # Create new project
@@ -60,6 +174,7 @@ class MemoryManager:
                 )
                 session.add(new_project)
                 session.commit()
+                get_cache().bump('projects')
                 self.current_project = new_project
                 self.console.print(f"[green]✓[/green] Created new project: [bold]{project_name}[/bold]")
             
@@ -73,25 +188,33 @@ class MemoryManager:
             self.db.close_session(session)
     
     def log_conversation(self, command: str, context_snapshot: str = None, response: str = None) -> bool:
-        """Log a conversation with auto-checkpoint check"""
+        """Log a conversation with auto-checkpoint check
+        
+        With write-behind enabled this only journals the entry; the log
+        writer commits it (and runs the checkpoint check) in the background.
+        """
         if not self.current_project:
             self.console.print("[red]No active project. Use 'ridge memory init [project]' first.[/red]")
             return False
         
-        session = self.db.get_session()
-        try:
-            conversation = Conversation(
+        if self.log_writer:
+            self.log_writer.submit(
+                'conversation',
                 project_id=self.current_project.id,
+                timestamp=datetime.now(timezone.utc).isoformat(),
                 command=command,
                 context_snapshot=context_snapshot,
                 response=response
             )
-            
-            session.add(conversation)
+            return True
+        
+        session = self.db.get_session()
+        try:
+            self._add_conversation(session, self.current_project.id, command, context_snapshot, response)
             session.commit()
+            get_cache().bump_project(self.current_project.id)
             
-            # Check if auto-checkpoint is needed
-            self._check_auto_checkpoint(session)
+            self._update_memory_index(session)
             
             return True
             
@@ -102,70 +225,143 @@ class MemoryManager:
         finally:
             self.db.close_session(session)
     
-    def _check_auto_checkpoint(self, session: Session):
-        """Check if auto-checkpoint should be created"""
-        if not self.current_project:
-            return
+    def _add_conversation(self, session: Session, project_id: int, command: str, context_snapshot: str,
+                          response: str, timestamp: Optional[datetime] = None) -> Conversation:
+        """Insert a conversation, update project stats and auto-checkpoint (caller commits)"""
+        conversation = Conversation(
+            project_id=project_id,
+            command=command,
+            context_snapshot=context_snapshot,
+            response=response,
+            token_count=count_tokens(command, context_snapshot, response)
+        )
+        if timestamp:
+            conversation.timestamp = timestamp
         
-        # Count non-archived conversations
-        conversation_count = session.query(Conversation).filter_by(
-            project_id=self.current_project.id,
-            archived=False
-        ).count()
+        session.add(conversation)
+        session.flush()
         
-        # Get recent conversations for token estimation
-        recent_conversations = session.query(Conversation).filter_by(
-            project_id=self.current_project.id,
-            archived=False
-        ).order_by(Conversation.timestamp.desc()).limit(50).all()
+        # Counters and any auto-checkpoint commit together with the message
+        stats = record_conversation(session, conversation)
+        self._check_auto_checkpoint(session, stats, conversation.id)
+        return conversation
+    
+    def _write_log_entries(self, session: Session, entries: List[Dict[str, Any]]) -> None:
+        """Write a batch of journaled log entries in the log writer's transaction"""
+        for entry in entries:
+            timestamp = datetime.fromisoformat(entry['timestamp'])
+            if entry['kind'] == 'conversation':
+                self._add_conversation(session, entry['project_id'], entry['command'],
+                                       entry['context_snapshot'], entry['response'], timestamp)
+            elif entry['kind'] == 'decision':
+                session.add(Decision(
+                    project_id=entry['project_id'],
+                    category=entry['category'],
+                    decision=entry['decision'],
+                    reasoning=entry['reasoning'],
+                    timestamp=timestamp,
+                    token_count=count_tokens(entry['decision'], entry['reasoning'])
+                ))
+    
+    def _after_log_commit(self, entries: List[Dict[str, Any]]) -> None:
+        """Invalidate cached context for a committed write-behind batch and fold it into the memory index"""
+        for project_id in {entry['project_id'] for entry in entries}:
+            get_cache().bump_project(project_id)
+        if not self.current_project:
+            return
+        session = self.db.get_session()
+        try:
+            self._update_memory_index(session)
+        finally:
+            self.db.close_session(session)
+    
+    def flush_logs(self, timeout: Optional[float] = None) -> bool:
+        """Wait for write-behind log entries to be committed"""
+        return self.log_writer.flush(timeout) if self.log_writer else True
+    
+    def _check_auto_checkpoint(self, session: Session, stats: ProjectStats, message_id: int):
+        """Check if auto-checkpoint should be created (caller commits)
         
-        # Estimate tokens (rough approximation)
-        estimated_tokens = sum(
-            len(conv.context_snapshot or '') + len(conv.response or '')
-            for conv in recent_conversations
-        ) // 4  # ~4 chars per token
+        Reads the materialized project_stats row instead of counting and
+        scanning conversations, so this is O(1) per logged message.
+        """
+        conversation_count = stats.active_conversation_count
         
         # Check auto-checkpoint conditions
         should_checkpoint = (
             conversation_count > 0 and 
-            (conversation_count % 25 == 0 or estimated_tokens > 28000)
+            (conversation_count % 25 == 0 or stats.tokens_since_checkpoint > 28000)
         )
         
         if should_checkpoint:
             # Create auto-checkpoint
-            latest_conversation = session.query(Conversation).filter_by(
-                project_id=self.current_project.id
-            ).order_by(Conversation.timestamp.desc()).first()
-            
+            bundle_key, bundle = build_context_bundle(session, session.get(Project, stats.project_id))
             checkpoint = Checkpoint(
-                project_id=self.current_project.id,
-                message_id=latest_conversation.id if latest_conversation else 0,
+                project_id=stats.project_id,
+                message_id=message_id,
                 description=f"Auto-checkpoint at {conversation_count} messages",
-                auto_created=True
+                auto_created=True,
+                context_key=bundle_key,
+                context_bundle=bundle
             )
             
             session.add(checkpoint)
-            session.commit()
+            record_checkpoint(session, stats.project_id)
             
             self.console.print(f"[dim]Auto-checkpoint created at {conversation_count} messages[/dim]")
     
+    def _get_memory_index(self) -> MemoryIndex:
+        """Get the BM25 memory index for the current project"""
+        if self._memory_index is None or self._memory_index[0] != self.current_project.id:
+            project = self.current_project
+            self._memory_index = (project.id,
+                                  MemoryIndex(database_key(self.db.engine.url), project.id, project.created_at))
+        return self._memory_index[1]
+    
+    def _update_memory_index(self, session: Session) -> None:
+        """Fold newly logged rows into the memory index, if one has been built"""
+        try:
+            with self._index_lock:
+                memory_index = self._get_memory_index()
+                if memory_index.exists():
+                    memory_index.refresh(session, self.current_project.id)
+        except OSError as e:
+            # The index is a cache; logging must not fail because it can't be written
+            self.console.print(f"[dim]Memory index not updated: {e}[/dim]")
+    
     def log_decision(self, decision_text: str, category: str = "general", reasoning: str = None) -> bool:
         """Log an important project decision"""
         if not self.current_project:
             self.console.print("[red]No active project. Use 'ridge memory init [project]' first.[/red]")
             return False
         
+        if self.log_writer:
+            self.log_writer.submit(
+                'decision',
+                project_id=self.current_project.id,
+                timestamp=datetime.now(timezone.utc).isoformat(),
+                category=category,
+                decision=decision_text,
+                reasoning=reasoning
+            )
+            self.console.print(f"[green]✓[/green] Decision logged: [bold]{category}[/bold] - {decision_text[:50]}...")
+            return True
+        
         session = self.db.get_session()
         try:
             decision = Decision(
                 project_id=self.current_project.id,
                 category=category,
                 decision=decision_text,
-                reasoning=reasoning
+                reasoning=reasoning,
+                token_count=count_tokens(decision_text, reasoning)
             )
             
             session.add(decision)
             session.commit()
+            get_cache().bump_project(self.current_project.id)
+            
+            self._update_memory_index(session)
             
             self.console.print(f"[green]✓[/green] Decision logged: [bold]{category}[/bold] - {decision_text[:50]}...")
             return True
@@ -177,34 +373,204 @@ class MemoryManager:
         finally:
             self.db.close_session(session)
     
-    def search_memory(self, search_term: str) -> None:
-        """Search conversations and decisions for a term"""
+    def search_memory(self, search_term: str, mode: str = 'fts', limit: int = 10) -> None:
+        """Search conversations and decisions for a term
+        
+        mode 'fts' ranks matches from the tsvector indexes (see
+        sql/migrate_memory_fts.sql) and shows ts_headline snippets; 'trigram'
+        finds substrings and near-misses of identifiers through the pg_trgm
+        indexes (sql/migrate_memory_trgm.sql); 'like' is the unindexed
+        ILIKE substring scan. On SQLite 'fts' uses FTS5 tables and 'trigram'
+        finds substrings only.
+        """
         if not self.current_project:
             self.console.print("[red]No active project. Use 'ridge memory init [project]' first.[/red]")
             return
         
         session = self.db.get_session()
         try:
-            # Search conversations (excluding archived ones)
-            conversations = session.query(Conversation).filter(
-                Conversation.project_id == self.current_project.id,
-                Conversation.archived == False,
-                (Conversation.command.ilike(f'%{search_term}%') |
-                 Conversation.response.ilike(f'%{search_term}%'))
-            ).order_by(Conversation.timestamp.desc()).limit(10).all()
-            
-            # Search decisions
-            decisions = session.query(Decision).filter(
-                Decision.project_id == self.current_project.id,
-                (Decision.decision.ilike(f'%{search_term}%') |
-                 Decision.reasoning.ilike(f'%{search_term}%'))
-            ).order_by(Decision.timestamp.desc()).limit(10).all()
+            indexed_searches = {
+                'fts': (self._search_fts, 'sql/migrate_memory_fts.sql'),
+                'trigram': (self._search_trigram, 'sql/migrate_memory_trgm.sql'),
+            }
+            if mode in indexed_searches:
+                search, migration = indexed_searches[mode]
+                try:
+                    conversations, decisions = search(session, search_term, limit)
+                except ProgrammingError:
+                    session.rollback()
+                    self.console.print(f"[yellow]Search indexes missing; apply {migration}. "
+                                       "Falling back to substring search.[/yellow]")
+                    mode = 'like'
+            
+            if mode == 'like':
+                conversations, decisions = self._search_like(session, search_term, limit)
             
             self._display_search_results(search_term, conversations, decisions)
             
         finally:
             self.db.close_session(session)
     
+    def _search_like(self, session: Session, search_term: str,
+                     limit: int) -> Tuple[List[Tuple[ConversationPreview, Optional[str]]], List[Tuple[DecisionPreview, Optional[str]]]]:
+        """Substring search with ILIKE (sequential scan), newest first"""
+        # Search conversations (excluding archived ones)
+        conversations = fetch_rows(session, select_conversation_previews(*RESULT_PREVIEW_CHARS).where(
+            Conversation.project_id == self.current_project.id,
+            Conversation.archived == False,
+            (Conversation.command.ilike(f'%{search_term}%') |
+             Conversation.response.ilike(f'%{search_term}%'))
+        ).order_by(Conversation.timestamp.desc()).limit(limit), ConversationPreview)
+        
+        # Search decisions
+        decisions = fetch_rows(session, select_decision_previews(RESULT_DECISION_CHARS).where(
+            Decision.project_id == self.current_project.id,
+            (Decision.decision.ilike(f'%{search_term}%') |
+             Decision.reasoning.ilike(f'%{search_term}%'))
+        ).order_by(Decision.timestamp.desc()).limit(limit), DecisionPreview)
+        
+        return [(conv, None) for conv in conversations], [(decision, None) for decision in decisions]
+    
+    def _search_fts(self, session: Session, search_term: str,
+                    limit: int) -> Tuple[List[Tuple[ConversationPreview, Optional[str]]], List[Tuple[DecisionPreview, Optional[str]]]]:
+        """Ranked full-text search over the search_vector columns, with headline snippets"""
+        if is_sqlite(session):
+            return self._search_fts5(session, search_term, limit)
+        
+        query_text = build_tsquery(search_term)
+        if not query_text:
+            return [], []
+        
+        config = cast(SEARCH_CONFIG, REGCONFIG)
+        tsquery = func.to_tsquery(config, query_text)
+        
+        # search_vector is a generated column maintained by Postgres, so it is not mapped
+        conversation_vector = literal_column('conversations.search_vector')
+        conversation_rank = func.ts_rank(conversation_vector, tsquery)
+        conversation_text = func.coalesce(Conversation.command, '') + '\n' + func.coalesce(Conversation.response, '')
+        conversations = session.execute(select_conversation_previews(*RESULT_PREVIEW_CHARS).add_columns(
+            func.ts_headline(config, conversation_text, tsquery, HEADLINE_OPTIONS)
+        ).where(
+            Conversation.project_id == self.current_project.id,
+            Conversation.archived == False,
+            conversation_vector.op('@@')(tsquery)
+        ).order_by(conversation_rank.desc(), Conversation.timestamp.desc()).limit(limit)).all()
+        
+        decision_vector = literal_column('decisions.search_vector')
+        decision_rank = func.ts_rank(decision_vector, tsquery)
+        decision_text = Decision.decision + '\n' + func.coalesce(Decision.reasoning, '')
+        decisions = session.execute(select_decision_previews(RESULT_DECISION_CHARS).add_columns(
+            func.ts_headline(config, decision_text, tsquery, HEADLINE_OPTIONS)
+        ).where(
+            Decision.project_id == self.current_project.id,
+            decision_vector.op('@@')(tsquery)
+        ).order_by(decision_rank.desc(), Decision.timestamp.desc()).limit(limit)).all()
+        
+        return ([(ConversationPreview._make(row[:-1]), row[-1]) for row in conversations],
+                [(DecisionPreview._make(row[:-1]), row[-1]) for row in decisions])
+    
+    def _search_fts5(self, session: Session, search_term: str,
+                     limit: int) -> Tuple[List[Tuple[ConversationPreview, Optional[str]]], List[Tuple[DecisionPreview, Optional[str]]]]:
+        """SQLite full-text search: BM25-ranked FTS5 matches with snippets"""
+        query_text = build_fts5_query(search_term)
+        if not query_text:
+            return [], []
+        
+        def search(fts, stmt, model, *criteria):
+            fts_table = literal_column(fts.name)
+            return session.execute(stmt.add_columns(
+                func.snippet(fts_table, -1, HEADLINE_START, HEADLINE_STOP, ' ... ', 20)
+            ).join(fts, fts.c.rowid == model.id).where(
+                model.project_id == self.current_project.id,
+                fts_table.op('MATCH')(query_text),
+                *criteria
+            # bm25() is lower for better matches; the first column weighs double, like setweight 'A'
+            ).order_by(func.bm25(fts_table, 2.0, 1.0), model.timestamp.desc()).limit(limit)).all()
+        
+        conversations = search(CONVERSATIONS_FTS, select_conversation_previews(*RESULT_PREVIEW_CHARS),
+                               Conversation, Conversation.archived == False)
+        decisions = search(DECISIONS_FTS, select_decision_previews(RESULT_DECISION_CHARS), Decision)
+        
+        return ([(ConversationPreview._make(row[:-1]), row[-1]) for row in conversations],
+                [(DecisionPreview._make(row[:-1]), row[-1]) for row in decisions])
+    
+    def _search_trigram(self, session: Session, search_term: str,
+                        limit: int) -> Tuple[List[Tuple[ConversationPreview, Optional[str]]], List[Tuple[DecisionPreview, Optional[str]]]]:
+        """Substring and fuzzy search through pg_trgm GIN indexes, ranked by word similarity
+        
+        A row matches when a column contains the term (ILIKE, index-assisted
+        by trigrams) or has a word similar to it (the <% operator), so
+        'get_sess' finds get_session and 'file_trakcer' still finds file_tracker.
+        SQLite has no trigram similarity, so there it is a substring search,
+        newest first.
+        """
+        sqlite = is_sqlite(session)
+        # Build the pattern client-side so the planner sees a constant it can match to the index
+        pattern = '%' + search_term.replace('/', '//').replace('%', '/%').replace('_', '/_') + '%'
+        
+        def matches(column):
+            if sqlite:
+                return column.ilike(pattern, escape='/')
+            return column.ilike(pattern, escape='/') | literal(search_term).op('<%')(column)
+        
+        def similarity(*columns):
+            """Best word similarity first (nothing to rank by on SQLite)"""
+            if sqlite:
+                return []
+            return [greatest(session, *[func.coalesce(func.word_similarity(search_term, column), 0)
+                                        for column in columns]).desc()]
+        
+        def window(column):
+            """Text around the first literal match, cut server-side ('...' marks elided text)"""
+            position = strpos(session, func.lower(column), search_term.lower())
+            before = least(session, position - 1, SNIPPET_CONTEXT)
+            return (case((position - 1 > SNIPPET_CONTEXT, '...'), else_='') +
+                    func.substr(column, position - before, before + len(search_term) + SNIPPET_CONTEXT) +
+                    case((position - 1 + len(search_term) + SNIPPET_CONTEXT < func.length(column), '...'),
+                         else_=''))
+        
+        conversations = session.execute(select_conversation_previews(*RESULT_PREVIEW_CHARS).add_columns(
+            window(Conversation.command), window(Conversation.response)
+        ).where(
+            Conversation.project_id == self.current_project.id,
+            Conversation.archived == False,
+            matches(Conversation.command) | matches(Conversation.response)
+        ).order_by(*similarity(Conversation.command, Conversation.response),
+                   Conversation.timestamp.desc()).limit(limit)).all()
+        
+        decisions = session.execute(select_decision_previews(RESULT_DECISION_CHARS).add_columns(
+            window(Decision.decision), window(Decision.reasoning)
+        ).where(
+            Decision.project_id == self.current_project.id,
+            matches(Decision.decision) | matches(Decision.reasoning)
+        ).order_by(*similarity(Decision.decision, Decision.reasoning),
+                   Decision.timestamp.desc()).limit(limit)).all()
+        
+        return ([(ConversationPreview._make(row[:-2]), self._mark_snippet(search_term, *row[-2:]))
+                 for row in conversations],
+                [(DecisionPreview._make(row[:-2]), self._mark_snippet(search_term, *row[-2:]))
+                 for row in decisions])
+    
+    def _mark_snippet(self, search_term: str, *windows: Optional[str]) -> Optional[str]:
+        """Mark the literal match in the first window that has one, like a ts_headline snippet
+        
+        Windows come from the database (see _search_trigram); fuzzy-only
+        matches have none and fall back to the plain preview.
+        """
+        needle = search_term.lower()
+        for text in windows:
+            position = (text or '').lower().find(needle)
+            if position < 0:
+                continue
+            end = position + len(search_term)
+            return text[:position] + HEADLINE_START + text[position:end] + HEADLINE_STOP + text[end:]
+        return None
+    
+    def _format_snippet(self, snippet: str) -> str:
+        """Escape a ts_headline snippet and highlight its matches with Rich markup"""
+        snippet = escape(' '.join(snippet.split()))
+        return snippet.replace(HEADLINE_START, '[bold yellow]').replace(HEADLINE_STOP, '[/bold yellow]')
+    
     def get_recent_activity(self) -> None:
         """Show recent project activity with beautiful formatting"""
         if not self.current_project:
@@ -213,30 +579,36 @@ class MemoryManager:
         
         session = self.db.get_session()
         try:
-            # Get recent conversations (non-archived)
-            recent_conversations = session.query(Conversation).filter_by(
-                project_id=self.current_project.id,
-                archived=False
-            ).order_by(Conversation.timestamp.desc()).limit(5).all()
+            # Get recent conversations (non-archived), previews only
+            recent_conversations = fetch_rows(session, select_conversation_previews(command_chars=35).where(
+                Conversation.project_id == self.current_project.id,
+                Conversation.archived == False
+            ).order_by(Conversation.timestamp.desc()).limit(5), ConversationPreview)
             
             # Get recent decisions
-            recent_decisions = session.query(Decision).filter_by(
-                project_id=self.current_project.id
-            ).order_by(Decision.timestamp.desc()).limit(5).all()
+            recent_decisions = fetch_rows(session, select_decision_previews(decision_chars=50).where(
+                Decision.project_id == self.current_project.id
+            ).order_by(Decision.timestamp.desc()).limit(5), DecisionPreview)
             
-            # Get checkpoints
-            checkpoints = session.query(Checkpoint).filter_by(
-                project_id=self.current_project.id
-            ).order_by(Checkpoint.timestamp.desc()).limit(3).all()
+            # Get checkpoints (without their context bundles)
+            checkpoints = fetch_rows(session, select_checkpoints().where(
+                Checkpoint.project_id == self.current_project.id
+            ).order_by(Checkpoint.timestamp.desc()).limit(3), CheckpointRow)
             
             self._display_recent_activity(recent_conversations, recent_decisions, checkpoints)
             
         finally:
             self.db.close_session(session)
     
-    def _display_search_results(self, search_term: str, conversations: List[Conversation], decisions: List[Decision]):
-        """Display search results with Rich formatting"""
-        self.console.print(f"\n[bold]Search Results for '[cyan]{search_term}[/cyan]'[/bold]\n")
+    def _display_search_results(self, search_term: str,
+                                conversations: List[Tuple[ConversationPreview, Optional[str]]],
+                                decisions: List[Tuple[DecisionPreview, Optional[str]]]):
+        """Display search results with Rich formatting
+        
+        Results arrive as (row, snippet) pairs; rows without a snippet show a
+        plain preview.
+        """
+        self.console.print(f"\n[bold]Search Results for '[cyan]{escape(search_term)}[/cyan]'[/bold]\n")
         
         if conversations:
             table = Table(title="Conversations")
@@ -244,10 +616,13 @@ class MemoryManager:
             table.add_column("Command", style="cyan", width=30)
             table.add_column("Preview", style="white", width=50)
             
-            for conv in conversations:
+            for conv, snippet in conversations:
                 date_str = conv.timestamp.strftime("%m/%d %H:%M")
-                command = conv.command[:30] if conv.command else "N/A"
-                preview = (conv.response[:50] + "...") if conv.response else "No response"
+                command = escape(conv.command) if conv.command else "N/A"
+                if snippet:
+                    preview = self._format_snippet(snippet)
+                else:
+                    preview = escape(conv.preview + "...") if conv.has_response else "No response"
                 table.add_row(date_str, command, preview)
             
             self.console.print(table)
@@ -258,18 +633,22 @@ class MemoryManager:
             table.add_column("Category", style="green", width=15)
             table.add_column("Decision", style="white", width=60)
             
-            for decision in decisions:
+            for decision, snippet in decisions:
                 date_str = decision.timestamp.strftime("%m/%d %H:%M")
                 category = decision.category or "general"
-                decision_text = decision.decision[:60] if decision.decision else "N/A"
+                if snippet:
+                    decision_text = self._format_snippet(snippet)
+                else:
+                    decision_text = escape(decision.decision) if decision.decision else "N/A"
                 table.add_row(date_str, category, decision_text)
             
             self.console.print(table)
         
         if not conversations and not decisions:
-            self.console.print(f"[yellow]No results found for '{search_term}'[/yellow]")
+            self.console.print(f"[yellow]No results found for '{escape(search_term)}'[/yellow]")
     
-    def _display_recent_activity(self, conversations: List[Conversation], decisions: List[Decision], checkpoints: List[Checkpoint]):
+    def _display_recent_activity(self, conversations: List[ConversationPreview], decisions: List[DecisionPreview],
+                                 checkpoints: List[CheckpointRow]):
         """Display recent activity with Rich formatting"""
         
         # Project info panel
@@ -295,8 +674,8 @@ class MemoryManager:
             
             for conv in conversations:
                 time_str = conv.timestamp.strftime("%m/%d %H:%M")
-                command = conv.command[:35] if conv.command else "N/A"
-                status = "✓" if conv.response else "⏳"
+                command = conv.command or "N/A"
+                status = "✓" if conv.has_response else "⏳"
                 table.add_row(time_str, command, status)
             
             self.console.print(table)
@@ -313,7 +692,7 @@ class MemoryManager:
             for decision in decisions:
                 date_str = decision.timestamp.strftime("%m/%d %H:%M")
                 category = decision.category or "general"
-                decision_text = decision.decision[:50] if decision.decision else "N/A"
+                decision_text = decision.decision or "N/A"
                 table.add_row(date_str, category, decision_text)
             
             self.console.print(table)
@@ -337,60 +716,104 @@ class MemoryManager:
         else:
             self.console.print("[dim]No checkpoints created yet[/dim]")
     
-    def get_context_for_ai(self, limit_conversations: int = 20) -> Dict[str, Any]:
-        """Get relevant context for AI conversations"""
+    def get_context_for_ai(self, limit_conversations: int = 20, query: Optional[str] = None,
+                           limit_decisions: int = 10, limit_files: int = 10) -> Dict[str, Any]:
+        """Get relevant context for AI conversations
+        
+        Without a query this is the most recent history. With one (typically
+        the target file and prompt) conversations, decisions and file insights
+        are ranked by BM25 relevance from the project's memory index, falling
+        back to recency for any kind with no matches. When nothing has changed
+        since a checkpoint (e.g. right after a reset) the context bundle stored
+        with that checkpoint is returned instead of history. Either way the
+        database is read in a single round trip while the index is current,
+        and not at all while the result is cached (until the project's next
+        write).
+        """
         if not self.current_project:
             return {}
         
+        cache = get_cache()
+        key = cache.project_key(self.current_project.id, 'context', query,
+                                limit_conversations, limit_decisions, limit_files)
+        return cache.get_or_load('context', key, lambda: self._fetch_context_for_ai(
+            limit_conversations, query, limit_decisions, limit_files))
+    
+    def _fetch_context_for_ai(self, limit_conversations: int, query: Optional[str],
+                              limit_decisions: int, limit_files: int) -> Dict[str, Any]:
+        """Read get_context_for_ai's result from the database"""
+        limits = {'conversations': limit_conversations, 'decisions': limit_decisions, 'tracked_files': limit_files}
         session = self.db.get_session()
         try:
-            # Get recent non-archived conversations
-            recent_conversations = session.query(Conversation).filter_by(
-                project_id=self.current_project.id,
-                archived=False
-            ).order_by(Conversation.timestamp.desc()).limit(limit_conversations).all()
-            
-            # Get recent decisions
-            recent_decisions = session.query(Decision).filter_by(
-                project_id=self.current_project.id
-            ).order_by(Decision.timestamp.desc()).limit(10).all()
-            
-            # Get tracked files
-            tracked_files = session.query(FileTracked).filter_by(
-                project_id=self.current_project.id
-            ).order_by(FileTracked.last_analyzed.desc()).limit(10).all()
-            
-            context = {
-                "project": {
-                    "name": self.current_project.name,
-                    "path": self.current_project.path,
-                    "status": self.current_project.status
-                },
-                "conversations": [
-                    {
-                        "command": conv.command,
-                        "response": conv.response,
-                        "timestamp": conv.timestamp.isoformat()
-                    } for conv in reversed(recent_conversations)  # Chronological order
-                ],
-                "decisions": [
-                    {
-                        "category": dec.category,
-                        "decision": dec.decision,
-                        "reasoning": dec.reasoning,
-                        "timestamp": dec.timestamp.isoformat()
-                    } for dec in recent_decisions
-                ],
-                "tracked_files": [
-                    {
-                        "path": file.path,
-                        "insights": file.insights,
-                        "last_analyzed": file.last_analyzed.isoformat()
-                    } for file in tracked_files
-                ]
-            }
-            
-            return context
+            project_id = self.current_project.id
+            ranked = self._rank_memory(query, limits) if query else {}
+            # A checkpoint bundle only stands in for recency-ordered context
+            fetched = fetch_context(session, project_id, limits, ranked, use_bundle=query is None)
+            
+            if fetched.bundle is not None:
+                try:
+                    return trim_context(decode_context_bundle(fetched.bundle),
+                                        limit_conversations, limit_decisions, limit_files)
+                except (zlib.error, ValueError) as e:
+                    self.console.print(f"[dim]Ignoring unreadable context bundle: {e}[/dim]")
+                    fetched = fetch_context(session, project_id, limits, ranked, use_bundle=False)
+            
+            # Rows logged since the index was last refreshed: catch it up and rank again
+            if query and not self._memory_index_covers(fetched):
+                ranked = self._rank_memory(query, limits, session)
+                fetched = fetch_context(session, project_id, limits, ranked, use_bundle=False)
+            
+            return fetched.context
             
         finally:
-            self.db.close_session(session)
\ No newline at end of file
+            self.db.close_session(session)
+    
+    def _rank_memory(self, query: str, limits: Dict[str, int],
+                     session: Optional[Session] = None) -> Dict[str, List[Tuple[str, float]]]:
+        """Search the memory index for each kind of context, refreshing it first when given a session"""
+        try:
+            with self._index_lock:
+                memory_index = self._get_memory_index()
+                if session is not None:
+                    memory_index.refresh(session, self.current_project.id)
+                return {
+                    kind: memory_index.search(query, kind, limits[key] * 3)
+                    for kind, key in (('conversation', 'conversations'),
+                                      ('decision', 'decisions'),
+                                      ('file', 'tracked_files'))
+                }
+        except OSError as e:
+            self.console.print(f"[dim]Memory index unavailable, using recent context: {e}[/dim]")
+            return {}
+    
+    def _memory_index_covers(self, fetched: FetchedContext) -> bool:
+        """Whether the memory index has every row up to the fetched watermarks"""
+        try:
+            with self._index_lock:
+                return self._get_memory_index().is_current(fetched.conversation_id, fetched.decision_id,
+                                                           fetched.insights_at)
+        except OSError:
+            return True  # Nothing to refresh into; ranking already fell back to recency
+
+def trim_context(context: Dict[str, Any], limit_conversations: int, limit_decisions: int,
+                 limit_files: int) -> Dict[str, Any]:
+    """Cut a recency-ordered context down to smaller limits"""
+    return dict(context,
+                conversations=context['conversations'][-limit_conversations:] if limit_conversations else [],
+                decisions=context['decisions'][:limit_decisions],
+                tracked_files=context['tracked_files'][:limit_files])
+
+def build_context_bundle(session: Session, project: Project) -> Tuple[Optional[str], Optional[bytes]]:
+    """Materialize the recency context for a new checkpoint as (context_key, zlib-compressed JSON)
+    
+    Call after flushing the rows the checkpoint covers; returns (None, None)
+    when the project has no active conversations.
+    """
+    fetched = fetch_context(session, project.id, BUNDLE_LIMITS, use_bundle=False)
+    if fetched.context_key is None:
+        return None, None
+    return fetched.context_key, zlib.compress(json.dumps(fetched.context).encode('utf-8'))
+
+def decode_context_bundle(blob: bytes) -> Dict[str, Any]:
+    """Inverse of build_context_bundle's payload"""
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
@@ -1,6 +1,6 @@
 # src/models.py - Updated Database Models
 
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, Boolean, ForeignKey, Index, LargeBinary, UniqueConstraint, DDL, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
@@ -17,11 +17,19 @@ class Project(Base):
     last_active = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     status = Column(String(50), default='active')
     
+    # Git snapshot (HEAD + dirty set) the tracked files were last synced against
+    snapshot_head = Column(String(64))
+    snapshot_key = Column(String(64))
+    snapshot_dirty = Column(Text)
+    
     # Relationships
     conversations = relationship("Conversation", back_populates="project")
     decisions = relationship("Decision", back_populates="project")
     files_tracked = relationship("FileTracked", back_populates="project")
+    directories_tracked = relationship("DirectoryTracked", back_populates="project")
     checkpoints = relationship("Checkpoint", back_populates="project")
+    summaries = relationship("ConversationSummary", back_populates="project")
+    stats = relationship("ProjectStats", back_populates="project", uselist=False)
     
     def __repr__(self):
         return f"<Project(name='{self.name}', path='{self.path}')>"
@@ -36,6 +44,15 @@ class Conversation(Base):
     context_snapshot = Column(Text)
     response = Column(Text)
     archived = Column(Boolean, default=False)  # For context management
+    token_count = Column(Integer)  # Tokens across command, snapshot and response (see tokenizer.py)
+    
+    __table_args__ = (
+        # Active context is a small slice of a long history; resets scan only these rows
+        Index('idx_conversations_active', 'project_id', 'id',
+              postgresql_where=(archived == False), sqlite_where=(archived == False)),
+        # Ids are never reused once compaction moves rows to conversations_archive
+        {'sqlite_autoincrement': True},
+    )
     
     # Relationships
     project = relationship("Project", back_populates="conversations")
@@ -52,6 +69,7 @@ class Decision(Base):
     decision = Column(Text, nullable=False)
     reasoning = Column(Text)
     timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    token_count = Column(Integer)  # Tokens across decision and reasoning
     
     # Relationships
     project = relationship("Project", back_populates="decisions")
@@ -61,13 +79,21 @@ class Decision(Base):
 
 class FileTracked(Base):
     __tablename__ = 'files_tracked'
+    __table_args__ = (
+        UniqueConstraint('project_id', 'path', name='uq_files_tracked_project_path'),
+    )
     
     id = Column(Integer, primary_key=True)
     project_id = Column(Integer, ForeignKey('projects.id'), nullable=False)
     path = Column(String(1024), nullable=False)
-    hash = Column(String(64))  # SHA-256 hash
+    hash = Column(String(64))  # Content hash (SHA-256 or BLAKE2b-256, see hashing.py)
+    hash_algorithm = Column(String(16))  # Algorithm that produced hash
+    size = Column(BigInteger)  # Stat signature for the rehash fast path
+    mtime_ns = Column(BigInteger)
+    inode = Column(BigInteger)
     last_analyzed = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     insights = Column(Text)  # Cached analysis results
+    token_count = Column(Integer)  # Tokens in the file content at the tracked hash
     
     # Relationships
     project = relationship("Project", back_populates="files_tracked")
@@ -75,6 +101,24 @@ class FileTracked(Base):
     def __repr__(self):
         return f"<FileTracked(id={self.id}, path='{self.path}', hash='{self.hash[:8]}...')>"
 
+class DirectoryTracked(Base):
+    __tablename__ = 'directories_tracked'
+    __table_args__ = (
+        UniqueConstraint('project_id', 'path', name='uq_directories_tracked_project_path'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey('projects.id'), nullable=False)
+    path = Column(String(1024), nullable=False)  # '' is the project root
+    hash = Column(String(64))  # Merkle rollup over child file and directory hashes
+    mtime_ns = Column(BigInteger)  # Directory mtime when last walked
+    
+    # Relationships
+    project = relationship("Project", back_populates="directories_tracked")
+    
+    def __repr__(self):
+        return f"<DirectoryTracked(id={self.id}, path='{self.path}', hash='{(self.hash or '')[:8]}...')>"
+
 class Checkpoint(Base):
     __tablename__ = 'checkpoints'
     
@@ -85,8 +129,106 @@ class Checkpoint(Base):
     timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     auto_created = Column(Boolean, default=False)  # Distinguish auto vs manual checkpoints
     
+    # Recency context materialized at checkpoint time (zlib-compressed JSON, see memory.build_context_bundle)
+    context_key = Column(String(64))  # State the bundle was built from; matched to reuse it
+    context_bundle = Column(LargeBinary)
+    
+    __table_args__ = (
+        Index('idx_checkpoints_context_key', 'project_id', 'context_key',
+              postgresql_where=(context_key != None), sqlite_where=(context_key != None)),
+    )
+    
     # Relationships
     project = relationship("Project", back_populates="checkpoints")
     
     def __repr__(self):
-        return f"<Checkpoint(id={self.id}, description='{self.description}', auto_created={self.auto_created})>"
\ No newline at end of file
+        return f"<Checkpoint(id={self.id}, description='{self.description}', auto_created={self.auto_created})>"
+
+class ConversationSummary(Base):
+    __tablename__ = 'conversation_summaries'
+    
+    # Level 1 summarizes a run of compacted conversations; level n+1 folds level n summaries
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey('projects.id'), nullable=False)
+    level = Column(Integer, nullable=False)
+    parent_id = Column(Integer, ForeignKey('conversation_summaries.id'))  # Set once folded into the next level
+    first_conversation_id = Column(Integer, nullable=False)
+    last_conversation_id = Column(Integer, nullable=False)
+    conversation_count = Column(Integer, nullable=False)
+    started_at = Column(DateTime)
+    ended_at = Column(DateTime)
+    summary = Column(Text, nullable=False)
+    token_count = Column(Integer)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    
+    __table_args__ = (
+        # Unfolded summaries are the roots that cover all compacted history
+        Index('idx_conversation_summaries_roots', 'project_id', 'level', 'first_conversation_id',
+              postgresql_where=(parent_id == None), sqlite_where=(parent_id == None)),
+    )
+    
+    # Relationships
+    project = relationship("Project", back_populates="summaries")
+    
+    def __repr__(self):
+        return f"<ConversationSummary(id={self.id}, level={self.level}, conversations={self.first_conversation_id}-{self.last_conversation_id})>"
+
+class ConversationArchive(Base):
+    __tablename__ = 'conversations_archive'
+    
+    # Cold storage for compacted conversations, moved out of the hot conversations table
+    id = Column(Integer, primary_key=True)  # Original conversations.id
+    project_id = Column(Integer, ForeignKey('projects.id'), nullable=False)
+    timestamp = Column(DateTime)
+    command = Column(String(1024))
+    context_snapshot = Column(Text)
+    response = Column(Text)
+    archived = Column(Boolean)
+    token_count = Column(Integer)
+    summary_id = Column(Integer, ForeignKey('conversation_summaries.id'))  # Level 1 summary covering this row
+    
+    __table_args__ = (
+        Index('idx_conversations_archive_summary', 'summary_id'),
+    )
+    
+    def __repr__(self):
+        return f"<ConversationArchive(id={self.id}, project_id={self.project_id}, command='{self.command}')>"
+
+class ProjectStats(Base):
+    __tablename__ = 'project_stats'
+    
+    # One row per project, kept current in the same transaction as each logged message
+    project_id = Column(Integer, ForeignKey('projects.id'), primary_key=True)
+    conversation_count = Column(Integer, nullable=False, default=0)
+    active_conversation_count = Column(Integer, nullable=False, default=0)  # Non-archived
+    token_total = Column(BigInteger, nullable=False, default=0)  # Estimated tokens, non-archived
+    tokens_since_checkpoint = Column(BigInteger, nullable=False, default=0)
+    latest_message_id = Column(Integer)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    
+    # Relationships
+    project = relationship("Project", back_populates="stats")
+    
+    def __repr__(self):
+        return f"<ProjectStats(project_id={self.project_id}, conversations={self.conversation_count}, tokens={self.token_total})>"
+
+def _fts5_ddl(table: str, columns: list) -> list:
+    """FTS5 table over table's columns plus the triggers that keep it in sync"""
+    fts = f"{table}_fts"
+    names = ', '.join(columns)
+    new = ', '.join(f"new.{column}" for column in columns)
+    old = ', '.join(f"old.{column}" for column in columns)
+    insert = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new});"
+    delete = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{table}', content_rowid='id', "
+        "tokenize='porter unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {names} ON {table} BEGIN {delete} {insert} END",
+    ]
+
+# Memory search on SQLite (Postgres uses the tsvector columns from sql/migrate_memory_fts.sql);
+# commands and decisions come first so bm25() can weigh them like setweight 'A'
+for statement in _fts5_ddl('conversations', ['command', 'response']) + _fts5_ddl('decisions', ['decision', 'reasoning']):
+    event.listen(Base.metadata, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
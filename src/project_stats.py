@@ -0,0 +1,100 @@
+# src/project_stats.py - Materialized per-project conversation counters
+
+from datetime import datetime, timezone
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import Session
+
+from dialect import greatest, insert
+from models import Checkpoint, Conversation, ProjectStats
+
+
+def conversation_tokens():
+    """SQL expression for a conversation's stored token count
+    
+    Rows logged before token_count existed fall back to ~4 characters per token.
+    """
+    return func.coalesce(
+        Conversation.token_count,
+        (func.length(func.coalesce(Conversation.command, '')) +
+         func.length(func.coalesce(Conversation.context_snapshot, '')) +
+         func.length(func.coalesce(Conversation.response, ''))) // 4
+    )
+
+
+def rebuild_project_stats(session: Session, project_id: int) -> ProjectStats:
+    """Recompute a project's stats row from the conversations table (caller commits)
+
+    Used to seed projects that predate the table and after bulk changes such
+    as archiving; the logging hot path only ever increments.
+    """
+    message_tokens = conversation_tokens()
+    active = Conversation.archived == False
+
+    last_checkpoint_message = session.query(Checkpoint.message_id).filter(
+        Checkpoint.project_id == project_id
+    ).order_by(Checkpoint.timestamp.desc()).limit(1).scalar_subquery()
+
+    totals = session.query(
+        func.count(Conversation.id),
+        func.count(case((active, Conversation.id))),
+        func.coalesce(func.sum(case((active, message_tokens), else_=0)), 0),
+        func.coalesce(func.sum(case(
+            (active & (Conversation.id > func.coalesce(last_checkpoint_message, 0)), message_tokens),
+            else_=0)), 0),
+        func.max(Conversation.id)
+    ).filter(Conversation.project_id == project_id).one()
+
+    values = {
+        'conversation_count': totals[0],
+        'active_conversation_count': totals[1],
+        'token_total': int(totals[2]),
+        'tokens_since_checkpoint': int(totals[3]),
+        'latest_message_id': totals[4],
+        'updated_at': datetime.now(timezone.utc),
+    }
+    stmt = insert(session, ProjectStats).values(project_id=project_id, **values)
+    stmt = stmt.on_conflict_do_update(index_elements=[ProjectStats.project_id], set_=values)
+    return session.execute(stmt.returning(ProjectStats),
+                           execution_options={'populate_existing': True}).scalar_one()
+
+
+def get_project_stats(session: Session, project_id: int) -> ProjectStats:
+    """Get a project's stats row, seeding it on first use"""
+    stats = session.get(ProjectStats, project_id)
+    if stats is None:
+        stats = rebuild_project_stats(session, project_id)
+    return stats
+
+
+def record_conversation(session: Session, conversation: Conversation) -> ProjectStats:
+    """Count a newly added (flushed) conversation with one atomic UPDATE ... RETURNING"""
+    tokens = conversation.token_count or 0
+    result = session.execute(
+        update(ProjectStats).where(
+            ProjectStats.project_id == conversation.project_id
+        ).values(
+            conversation_count=ProjectStats.conversation_count + 1,
+            active_conversation_count=ProjectStats.active_conversation_count + 1,
+            token_total=ProjectStats.token_total + tokens,
+            tokens_since_checkpoint=ProjectStats.tokens_since_checkpoint + tokens,
+            latest_message_id=greatest(session, func.coalesce(ProjectStats.latest_message_id, 0), conversation.id),
+            updated_at=datetime.now(timezone.utc)
+        ).returning(ProjectStats),
+        execution_options={'synchronize_session': False, 'populate_existing': True}
+    ).scalar_one_or_none()
+
+    if result is None:
+        # No row yet: the rebuild already counts the flushed conversation
+        result = rebuild_project_stats(session, conversation.project_id)
+    return result
+
+
+def record_checkpoint(session: Session, project_id: int) -> None:
+    """Start a new token window after a checkpoint is created (caller commits)"""
+    session.execute(
+        update(ProjectStats).where(ProjectStats.project_id == project_id).values(
+            tokens_since_checkpoint=0,
+            updated_at=datetime.now(timezone.utc)
+        ),
+        execution_options={'synchronize_session': False}
+    )
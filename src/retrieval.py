@@ -0,0 +1,378 @@
+# src/retrieval.py - Local BM25 index over project memory for relevance-ranked AI context
+
+import os
+import re
+import json
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models import Conversation, Decision, FileTracked
+
+# Index files live under ~/.ridge (or RIDGE_INDEX_DIR), per database and project, so
+# writing them never touches the project tree that FileTracker and git watch
+DEFAULT_INDEX_ROOT = os.path.join(os.path.expanduser('~'), '.ridge', 'index')
+
+# Journal entries replayed on load before they are folded into the array snapshot
+JOURNAL_CHECKPOINT_LINES = 500
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+CAMEL_BOUNDARY = re.compile(r'([a-z0-9])([A-Z])')
+STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have if in into is it its of on or so that '
+    'the their then there these this to was were will with you your'.split()
+)
+
+
+def index_dir(database_key: str, project_id: int, created_at: Optional[datetime] = None) -> str:
+    """Directory holding one project's index files
+    
+    The project's creation time is part of the name, so a recreated
+    database that reuses project ids never picks up an older index.
+    """
+    name = f"{project_id}-{created_at:%Y%m%d%H%M%S%f}" if created_at else str(project_id)
+    return os.path.join(os.getenv('RIDGE_INDEX_DIR', DEFAULT_INDEX_ROOT), database_key, name)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase terms, breaking snake_case and camelCase identifiers apart"""
+    text = CAMEL_BOUNDARY.sub(r'\1 \2', text or '').lower()
+    return [token for token in TOKEN_PATTERN.findall(text) if len(token) > 1 and token not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over postings kept as COO arrays (doc id, term id, frequency)
+
+    New documents land in Python lists and an append-only journal; the
+    arrays and a term-sorted view (CSC-style indptr) are rebuilt lazily on
+    the next search. Replacing a document tombstones the old row, and
+    save() compacts tombstones away.
+    """
+
+    def __init__(self, index_dir: Optional[str] = None, k1: float = 1.2, b: float = 0.75):
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+
+        self.vocabulary: Dict[str, int] = {}
+        self.doc_keys: List[Optional[str]] = []  # None marks a removed document
+        self.doc_lookup: Dict[str, int] = {}
+        self.doc_lengths: List[int] = []
+        self.watermarks: Dict[str, Any] = {}
+
+        self._doc_ids = np.zeros(0, dtype=np.int32)
+        self._term_ids = np.zeros(0, dtype=np.int32)
+        self._freqs = np.zeros(0, dtype=np.float32)
+        self._pending: Tuple[List[int], List[int], List[int]] = ([], [], [])
+        self._by_term = None  # (indptr, doc ids, freqs) sorted by term, rebuilt after changes
+        self._journal_lines = 0
+        self._batch: Optional[List[Dict[str, Any]]] = None
+
+    # -- persistence --------------------------------------------------------
+
+    @property
+    def _arrays_path(self) -> str:
+        return os.path.join(self.index_dir, 'bm25.npz')
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.index_dir, 'bm25.json')
+
+    @property
+    def _journal_path(self) -> str:
+        return os.path.join(self.index_dir, 'bm25.journal')
+
+    @classmethod
+    def load(cls, index_dir: str) -> 'BM25Index':
+        """Load the array snapshot and replay the journal; a damaged index loads empty"""
+        index = cls(index_dir)
+        try:
+            if os.path.exists(index._meta_path):
+                with open(index._meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                with np.load(index._arrays_path) as arrays:
+                    index._doc_ids = arrays['doc_ids']
+                    index._term_ids = arrays['term_ids']
+                    index._freqs = arrays['freqs']
+                    index.doc_lengths = arrays['doc_lengths'].tolist()
+                index.vocabulary = {term: term_id for term_id, term in enumerate(meta['vocabulary'])}
+                index.doc_keys = meta['doc_keys']
+                index.doc_lookup = {key: doc_id for doc_id, key in enumerate(index.doc_keys) if key is not None}
+                index.watermarks = meta.get('watermarks', {})
+
+            if os.path.exists(index._journal_path):
+                with open(index._journal_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            break  # Torn final line from an interrupted write
+                        index._apply(entry)
+                        index._journal_lines += 1
+        except (OSError, ValueError, KeyError):
+            index = cls(index_dir)
+        return index
+
+    def exists(self) -> bool:
+        return bool(self.index_dir) and os.path.exists(self._meta_path)
+
+    def save(self) -> None:
+        """Write a compacted snapshot atomically and truncate the journal"""
+        if not self.index_dir:
+            return
+        self._compact()
+        os.makedirs(self.index_dir, exist_ok=True)
+
+        arrays_tmp = self._arrays_path + '.tmp.npz'
+        np.savez(arrays_tmp, doc_ids=self._doc_ids, term_ids=self._term_ids, freqs=self._freqs,
+                 doc_lengths=np.asarray(self.doc_lengths, dtype=np.int32))
+        meta_tmp = self._meta_path + '.tmp'
+        with open(meta_tmp, 'w', encoding='utf-8') as f:
+            terms = sorted(self.vocabulary, key=self.vocabulary.get)
+            json.dump({'vocabulary': terms, 'doc_keys': self.doc_keys, 'watermarks': self.watermarks}, f)
+
+        os.replace(arrays_tmp, self._arrays_path)
+        os.replace(meta_tmp, self._meta_path)
+        open(self._journal_path, 'w').close()
+        self._journal_lines = 0
+
+    def _journal(self, entry: Dict[str, Any]) -> None:
+        """Record one change, deferring the write while a batch is open"""
+        if self._batch is not None:
+            self._batch.append(entry)
+        else:
+            self._write_journal([entry])
+
+    def _write_journal(self, entries: List[Dict[str, Any]]) -> None:
+        """Append changes to the journal, or write a snapshot once it would grow long"""
+        if not self.index_dir:
+            return
+        if not self.exists() or self._journal_lines + len(entries) >= JOURNAL_CHECKPOINT_LINES:
+            self.save()
+            return
+        with open(self._journal_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+        self._journal_lines += len(entries)
+
+    @contextmanager
+    def batch(self):
+        """Group changes into a single journal append (or one snapshot when there are many)"""
+        self._batch = []
+        try:
+            yield self
+        finally:
+            entries, self._batch = self._batch, None
+            if entries:
+                self._write_journal(entries)
+
+    # -- updates ------------------------------------------------------------
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        """Apply a journal entry to the in-memory index"""
+        if entry['op'] == 'add':
+            self._add_counts(entry['key'], entry['terms'])
+        elif entry['op'] == 'remove':
+            self._remove(entry['key'])
+        elif entry['op'] == 'mark':
+            self.watermarks.update(entry['watermarks'])
+
+    def _add_counts(self, key: str, term_counts: Dict[str, int]) -> None:
+        self._remove(key)
+        doc_id = len(self.doc_keys)
+        self.doc_keys.append(key)
+        self.doc_lookup[key] = doc_id
+        self.doc_lengths.append(sum(term_counts.values()))
+
+        doc_ids, term_ids, freqs = self._pending
+        for term, count in term_counts.items():
+            term_id = self.vocabulary.setdefault(term, len(self.vocabulary))
+            doc_ids.append(doc_id)
+            term_ids.append(term_id)
+            freqs.append(count)
+        self._by_term = None
+
+    def _remove(self, key: str) -> None:
+        doc_id = self.doc_lookup.pop(key, None)
+        if doc_id is not None:
+            self.doc_keys[doc_id] = None
+            self._by_term = None
+
+    def add(self, key: str, text: Optional[str]) -> None:
+        """Index (or re-index) one document under a stable key"""
+        term_counts = dict(Counter(tokenize(text)))
+        self._add_counts(key, term_counts)
+        self._journal({'op': 'add', 'key': key, 'terms': term_counts})
+
+    def remove(self, key: str) -> None:
+        if key in self.doc_lookup:
+            self._remove(key)
+            self._journal({'op': 'remove', 'key': key})
+
+    def mark(self, **watermarks: Any) -> None:
+        """Record how far the index has caught up with the database"""
+        self.watermarks.update(watermarks)
+        self._journal({'op': 'mark', 'watermarks': watermarks})
+
+    def _fold_pending(self) -> None:
+        """Move postings added since the last fold into the COO arrays"""
+        doc_ids, term_ids, freqs = self._pending
+        if doc_ids:
+            self._doc_ids = np.concatenate([self._doc_ids, np.asarray(doc_ids, dtype=np.int32)])
+            self._term_ids = np.concatenate([self._term_ids, np.asarray(term_ids, dtype=np.int32)])
+            self._freqs = np.concatenate([self._freqs, np.asarray(freqs, dtype=np.float32)])
+            self._pending = ([], [], [])
+
+    def _compact(self) -> None:
+        """Fold pending postings into the arrays and drop removed documents"""
+        self._fold_pending()
+
+        if len(self.doc_lookup) == len(self.doc_keys):
+            return
+
+        # Renumber live documents densely
+        alive = np.array([key is not None for key in self.doc_keys], dtype=bool)
+        remap = np.cumsum(alive, dtype=np.int32) - 1
+        keep = alive[self._doc_ids]
+        self._doc_ids = remap[self._doc_ids[keep]]
+        self._term_ids = self._term_ids[keep]
+        self._freqs = self._freqs[keep]
+        self.doc_keys = [key for key in self.doc_keys if key is not None]
+        self.doc_lengths = [length for length, live in zip(self.doc_lengths, alive) if live]
+        self.doc_lookup = {key: doc_id for doc_id, key in enumerate(self.doc_keys)}
+        self._by_term = None
+
+    # -- queries ------------------------------------------------------------
+
+    def _term_view(self):
+        """Postings sorted by term with an indptr, so each query term is one slice"""
+        if self._by_term is None:
+            self._fold_pending()
+
+            order = np.argsort(self._term_ids, kind='stable')
+            indptr = np.searchsorted(self._term_ids[order], np.arange(len(self.vocabulary) + 1))
+            self._by_term = (indptr, self._doc_ids[order], self._freqs[order])
+        return self._by_term
+
+    def search(self, query: str, limit: int = 10, prefix: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Rank documents against a free-text query, optionally only keys starting with prefix"""
+        term_ids = {self.vocabulary[term] for term in tokenize(query) if term in self.vocabulary}
+        if not term_ids or not self.doc_lookup:
+            return []
+
+        indptr, doc_ids, freqs = self._term_view()
+        alive = np.array([key is not None for key in self.doc_keys], dtype=bool)
+        if prefix:
+            alive &= np.array([key is not None and key.startswith(prefix) for key in self.doc_keys], dtype=bool)
+        lengths = np.asarray(self.doc_lengths, dtype=np.float32)
+        doc_count = int(alive.sum())
+        if not doc_count:
+            return []
+        length_norm = self.k1 * (1 - self.b + self.b * lengths / max(lengths[alive].mean(), 1.0))
+
+        scores = np.zeros(len(self.doc_keys), dtype=np.float32)
+        for term_id in term_ids:
+            docs = doc_ids[indptr[term_id]:indptr[term_id + 1]]
+            tf = freqs[indptr[term_id]:indptr[term_id + 1]]
+            live = alive[docs]
+            docs, tf = docs[live], tf[live]
+            if not len(docs):
+                continue
+            idf = np.log1p((doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + length_norm[docs])
+
+        limit = min(limit, int((scores > 0).sum()))
+        if limit <= 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(self.doc_keys[doc_id], float(scores[doc_id])) for doc_id in top]
+
+
+class MemoryIndex:
+    """BM25 index over one project's conversations, decisions and file insights
+
+    Documents are keyed 'conversation:<id>', 'decision:<id>' and
+    'file:<path>'. refresh() catches up from id/timestamp watermarks, so
+    each call only reads rows added since the last one.
+    """
+
+    def __init__(self, database_key: str, project_id: int, created_at: Optional[datetime] = None):
+        self.index = BM25Index.load(index_dir(database_key, project_id, created_at))
+
+    def exists(self) -> bool:
+        return self.index.exists()
+
+    def is_current(self, conversation_id: Optional[int], decision_id: Optional[int],
+                   insights_at: Optional[datetime]) -> bool:
+        """Whether the index already covers rows up to these database watermarks"""
+        watermarks = self.index.watermarks
+        if (conversation_id or 0) > watermarks.get('conversation_id', 0):
+            return False
+        if (decision_id or 0) > watermarks.get('decision_id', 0):
+            return False
+        if insights_at and (not watermarks.get('insights_at') or
+                            insights_at > datetime.fromisoformat(watermarks['insights_at'])):
+            return False
+        return True
+
+    def refresh(self, session: Session, project_id: int) -> int:
+        """Index rows added or re-analyzed since the last refresh, returning how many"""
+        with self.index.batch():
+            return self._refresh_rows(session, project_id, self.index.watermarks)
+
+    def _refresh_rows(self, session: Session, project_id: int, watermarks: Dict[str, Any]) -> int:
+        """Read rows past the watermarks into the index and advance them"""
+        indexed = 0
+        conversations = session.query(
+            Conversation.id, Conversation.command, Conversation.context_snapshot, Conversation.response
+        ).filter(
+            Conversation.project_id == project_id,
+            Conversation.id > watermarks.get('conversation_id', 0)
+        ).order_by(Conversation.id).all()
+        for row in conversations:
+            self.index.add(f"conversation:{row.id}",
+                           '\n'.join(filter(None, (row.command, row.context_snapshot, row.response))))
+        indexed += len(conversations)
+
+        decisions = session.query(
+            Decision.id, Decision.category, Decision.decision, Decision.reasoning
+        ).filter(
+            Decision.project_id == project_id,
+            Decision.id > watermarks.get('decision_id', 0)
+        ).order_by(Decision.id).all()
+        for row in decisions:
+            self.index.add(f"decision:{row.id}", '\n'.join(filter(None, (row.category, row.decision, row.reasoning))))
+        indexed += len(decisions)
+
+        files_query = session.query(
+            FileTracked.path, FileTracked.insights, FileTracked.last_analyzed
+        ).filter(FileTracked.project_id == project_id, FileTracked.insights.isnot(None))
+        if watermarks.get('insights_at'):
+            files_query = files_query.filter(
+                FileTracked.last_analyzed > datetime.fromisoformat(watermarks['insights_at']))
+        files = files_query.all()
+        for row in files:
+            self.index.add(f"file:{row.path}", f"{row.path}\n{row.insights}")
+        indexed += len(files)
+
+        if indexed:
+            marks = {}
+            if conversations:
+                marks['conversation_id'] = conversations[-1].id
+            if decisions:
+                marks['decision_id'] = decisions[-1].id
+            if files:
+                marks['insights_at'] = max(row.last_analyzed for row in files).isoformat()
+            self.index.mark(**marks)
+        elif not self.exists():
+            self.index.save()  # Empty memory still gets an index, so logging keeps it current
+        return indexed
+
+    def search(self, query: str, kind: str, limit: int) -> List[Tuple[str, float]]:
+        """Rank one document kind ('conversation', 'decision' or 'file'), returning (id or path, score)"""
+        prefix = f"{kind}:"
+        return [(key[len(prefix):], score) for key, score in self.index.search(query, limit, prefix)]
@@ -0,0 +1,65 @@
+# src/rows.py - Column-projected selects and lightweight row types for memory read paths
+
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Type, TypeVar
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.orm import Session
+
+from models import Checkpoint, Conversation, Decision
+
+Row = TypeVar('Row')
+
+
+class ConversationPreview(NamedTuple):
+    """Listing row: previews are cut server-side, context_snapshot is never read"""
+    id: int
+    timestamp: datetime
+    command: Optional[str]
+    preview: Optional[str]  # Start of the response
+    has_response: bool
+
+
+class DecisionPreview(NamedTuple):
+    id: int
+    timestamp: datetime
+    category: Optional[str]
+    decision: Optional[str]  # Start of the decision text
+
+
+class CheckpointRow(NamedTuple):
+    """Checkpoint without its context bundle"""
+    id: int
+    message_id: Optional[int]
+    description: str
+    timestamp: datetime
+    auto_created: Optional[bool]
+
+
+def preview(column, chars: int):
+    """First chars characters of a column, cut by the database (substr works on Postgres and SQLite)"""
+    return func.substr(column, 1, chars)
+
+
+def select_conversation_previews(command_chars: int = 35, preview_chars: int = 50) -> Select:
+    return select(
+        Conversation.id,
+        Conversation.timestamp,
+        preview(Conversation.command, command_chars),
+        preview(Conversation.response, preview_chars),
+        Conversation.response.isnot(None) & (Conversation.response != '')
+    )
+
+
+def select_decision_previews(decision_chars: int = 50) -> Select:
+    return select(Decision.id, Decision.timestamp, Decision.category, preview(Decision.decision, decision_chars))
+
+
+def select_checkpoints() -> Select:
+    return select(Checkpoint.id, Checkpoint.message_id, Checkpoint.description, Checkpoint.timestamp,
+                  Checkpoint.auto_created)
+
+
+def fetch_rows(session: Session, stmt: Select, row_type: Type[Row]) -> List[Row]:
+    """Run a projected select and wrap each result in row_type"""
+    return [row_type._make(row) for row in session.execute(stmt)]
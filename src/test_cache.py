@@ -0,0 +1,96 @@
+from cache import MISS, Cache, LRUBackend
+
+class FlakyBackend(LRUBackend):
+    """Stands in for a Redis server shared by several processes, which can go away"""
+    name = 'redis'
+    
+    def __init__(self):
+        super().__init__()
+        self.down = False
+    
+    def ping(self):
+        if self.down:
+            raise ConnectionError('connection refused')
+    
+    def get(self, key):
+        self.ping()
+        return super().get(key)
+    
+    def set(self, key, value, ttl):
+        self.ping()
+        super().set(key, value, ttl)
+    
+    def incr(self, key):
+        self.ping()
+        return super().incr(key)
+
+def test_lru_eviction_keeps_versions():
+    """Test that the LRU evicts least recently used entries but never version counters"""
+    cache = Cache(LRUBackend(2))
+    cache.bump_project(1)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('test', 'a') == 1
+    cache.set('c', 3)
+    assert cache.get('test', 'b') is MISS
+    assert cache.get('test', 'a') == 1
+    assert cache.version('project:1') == 1
+    assert cache.stats()['hits'] == {'test': 2}
+    assert cache.stats()['misses'] == {'test': 1}
+
+def test_bump_project_invalidates():
+    """Test that bumping a project's version hides its entries, and that None is cached"""
+    cache = Cache()
+    loads = []
+    load = lambda: loads.append(1)
+    key = cache.project_key(7, 'insights', 'src/app.py')
+    assert cache.get_or_load('insights', key, load) is None
+    assert cache.get_or_load('insights', key, load) is None
+    assert len(loads) == 1
+    cache.bump_project(7)
+    key = cache.project_key(7, 'insights', 'src/app.py')
+    cache.get_or_load('insights', key, load)
+    assert len(loads) == 2
+
+def test_write_invalidates_other_processes():
+    """Test that a bump in one cache hides entries from another cache on the same backend"""
+    shared = FlakyBackend()
+    reader, writer = Cache(shared), Cache(shared)
+    reader.set(reader.project_key(3, 'context', 'query'), 'before')
+    assert writer.get('context', writer.project_key(3, 'context', 'query')) == 'before'
+    writer.bump_project(3)
+    assert reader.get('context', reader.project_key(3, 'context', 'query')) is MISS
+    
+    # Other databases on the same backend are untouched
+    other = Cache(shared, namespace='other')
+    other.set(other.project_key(3, 'context', 'query'), 'elsewhere')
+    writer.bump_project(3)
+    assert other.get('context', other.project_key(3, 'context', 'query')) == 'elsewhere'
+
+def test_redis_failure_queues_invalidations():
+    """Test that an outage moves the cache to the LRU and replays its bumps when Redis returns"""
+    shared = FlakyBackend()
+    reader, writer = Cache(shared), Cache(shared)
+    reader.set(reader.project_key(3, 'context', 'query'), 'before')
+    
+    shared.down = True
+    assert writer.get('context', 'anything') is MISS
+    writer.bump_project(3)
+    stats = writer.stats()
+    assert stats['backend'] == 'lru'
+    assert 'refused' in stats['error']
+    assert stats['pending_invalidations'] == 1
+    
+    shared.down = False
+    writer.bump_project(3)
+    assert writer.stats()['backend'] == 'redis'
+    assert writer.stats()['pending_invalidations'] == 0
+    assert shared.counters == {'ridge:version:project:3': 2}
+    assert reader.get('context', reader.project_key(3, 'context', 'query')) is MISS
+
+if __name__ == '__main__':
+    test_lru_eviction_keeps_versions()
+    test_bump_project_invalidates()
+    test_write_invalidates_other_processes()
+    test_redis_failure_queues_invalidations()
+    print("Cache tests passed")
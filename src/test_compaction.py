@@ -0,0 +1,25 @@
+from compaction import merge_summaries, summarize_conversation
+from tokenizer import count_tokens
+
+def test_summarize_conversation():
+    """Test that a summary line keeps the command and first sentence only"""
+    line = summarize_conversation("ridge app.py analyze", "Looks fine. But the loop is quadratic.")
+    assert line == "- ridge app.py analyze: Looks fine."
+    assert len(summarize_conversation("cmd", "x" * 500, max_chars=60)) == 60
+    assert summarize_conversation(None, None) == "- conversation: No response"
+
+def test_merge_summaries_round_robin():
+    """Test that every child keeps its first line before any child gets a second"""
+    children = [[f"Child {i}:"] + [f"- detail {i}.{j} " + "word " * 10 for j in range(5)] for i in range(4)]
+    merged = merge_summaries("Conversations 1-80:", children, budget=120)
+    lines = merged.split('\n')
+    assert lines[0] == "Conversations 1-80:"
+    assert all(f"Child {i}:" in lines for i in range(4))
+    assert count_tokens(merged) <= 120 + len(lines)
+    # Children stay in order
+    assert [line for line in lines if line.startswith("Child")] == [f"Child {i}:" for i in range(4)]
+
+if __name__ == '__main__':
+    test_summarize_conversation()
+    test_merge_summaries_round_robin()
+    print("Compaction tests passed")
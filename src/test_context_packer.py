@@ -0,0 +1,35 @@
+from context_packer import ContextPacker, fit_text
+from tokenizer import count_tokens
+
+def test_fit_text_keeps_outline():
+    """Test that overflowing text is cut to budget with its definitions outlined"""
+    source = "import os\n" + "".join(f"def handler_{i}(event):\n    return os.path.join('a', 'b', str(event))\n"
+                                     for i in range(200))
+    fitted, truncated = fit_text(source, 300)
+    assert truncated and count_tokens(fitted) <= 300
+    assert fitted.startswith("import os") and "lines omitted" in fitted
+    assert fit_text("short", 300) == ("short", False)
+
+def test_pack_fills_buckets_by_priority():
+    """Test greedy filling, newest-first recency and per-bucket accounting"""
+    packer = ContextPacker({'instructions': 100, 'recent': 30, 'files': 500, 'memory': 40}, 1000)
+    context = {
+        'project': {'name': 'demo', 'path': '/tmp/demo'},
+        'conversations': [{'command': f"cmd{i}", 'response': "done " * 10, 'timestamp': f"2025-01-0{i + 1}"}
+                          for i in range(4)],
+        'decisions': [{'category': 'arch', 'decision': "use postgres", 'reasoning': None, 'timestamp': ''}],
+        'tracked_files': [{'path': 'a.py', 'insights': None, 'last_analyzed': ''}],
+    }
+    packed = packer.pack(context, instructions="You are helpful.", files={'a.py': "x = 1\n"})
+
+    recent = packed.report('recent')
+    assert recent.used <= 30 and recent.dropped > 0
+    assert "cmd3" in packed.context and "cmd0" not in packed.context
+    assert "use postgres" in packed.context
+    assert packed.files['a.py'] == "x = 1\n" and not packed.truncated_files
+    assert packed.total_tokens == sum(report.used for report in packed.reports)
+
+if __name__ == '__main__':
+    test_fit_text_keeps_outline()
+    test_pack_fills_buckets_by_priority()
+    print("Context packer tests passed")
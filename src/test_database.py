@@ -0,0 +1,100 @@
+import os
+import tempfile
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+import database
+from context import ContextManager
+from context_fetch import fetch_context
+from database import Database, create_database_engine, database_url, dispose_engine, get_engine
+from memory import MemoryManager
+from models import Conversation, Project
+
+def test_engine_is_shared():
+    """Test that every Database uses one engine and pool until disposed"""
+    dispose_engine()
+    try:
+        engine = get_engine()
+        assert Database().engine is engine
+        assert Database().SessionLocal is Database().SessionLocal
+        assert engine.url.drivername == make_url(database_url()).drivername
+    finally:
+        dispose_engine()
+    assert database._engine is None
+
+def test_pool_settings_from_env():
+    """Test that pool sizing comes from the environment"""
+    os.environ['RIDGE_DB_POOL_SIZE'] = '2'
+    os.environ['RIDGE_DB_MAX_OVERFLOW'] = '0'
+    try:
+        engine = create_database_engine()
+        assert engine.pool.size() == 2
+        assert engine.pool._max_overflow == 0
+        engine.dispose()
+    finally:
+        del os.environ['RIDGE_DB_POOL_SIZE']
+        del os.environ['RIDGE_DB_MAX_OVERFLOW']
+
+def test_sqlite_backend():
+    """Test that the embedded backend runs in WAL mode with the schema and search tables"""
+    engine = create_database_engine(f"sqlite:///{tempfile.mkdtemp()}/ridge.db")
+    try:
+        with Session(engine) as session:
+            assert session.execute(text("PRAGMA journal_mode")).scalar() == 'wal'
+            project = Project(name='demo', path='/tmp')
+            session.add(project)
+            session.flush()
+            session.add(Conversation(project_id=project.id, command='sync files', response='Hashes are cached'))
+            session.commit()
+            
+            matches = session.execute(text(
+                "SELECT rowid FROM conversations_fts WHERE conversations_fts MATCH 'hash*'")).scalars().all()
+            assert len(matches) == 1
+            
+            limits = {'conversations': 5, 'decisions': 5, 'tracked_files': 5}
+            fetched = fetch_context(session, project.id, limits)
+            assert fetched.context['project']['name'] == 'demo'
+            assert [conv['command'] for conv in fetched.context['conversations']] == ['sync files']
+            assert fetched.context['ranked'] == {'conversations': False}
+    finally:
+        engine.dispose()
+
+def test_checkpoint_keeps_ranked_context():
+    """Test that a query still gets ranked rows after a checkpoint stores a recency bundle"""
+    scratch = tempfile.mkdtemp()
+    settings = {'RIDGE_DB_BACKEND': 'sqlite', 'RIDGE_SQLITE_PATH': f"{scratch}/ridge.db",
+                'RIDGE_INDEX_DIR': f"{scratch}/index", 'RIDGE_WRITE_BEHIND': '0'}
+    saved = {name: os.environ.get(name) for name in settings}
+    os.environ.update(settings)
+    dispose_engine()
+    try:
+        MemoryManager().init_project('ranked', scratch)
+        memory_manager = MemoryManager()
+        memory_manager.log_conversation('analyze src/file_tracker.py', response='Hashes files on a thread pool')
+        memory_manager.log_conversation('analyze src/api.py', response='Picks a model from the mode flags')
+        context_manager = ContextManager()
+        context_manager.set_current_project(memory_manager.current_project)
+        assert context_manager.create_checkpoint('before ranking')
+        
+        recent = memory_manager.get_context_for_ai(limit_conversations=1)
+        assert [conv['command'] for conv in recent['conversations']] == ['analyze src/api.py']
+        
+        ranked = memory_manager.get_context_for_ai(limit_conversations=1, query='thread pool hashing')
+        assert [conv['command'] for conv in ranked['conversations']] == ['analyze src/file_tracker.py']
+        assert ranked['ranked'] == {'conversations': True}
+    finally:
+        dispose_engine()
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+if __name__ == '__main__':
+    test_engine_is_shared()
+    test_pool_settings_from_env()
+    test_sqlite_backend()
+    test_checkpoint_keeps_ranked_context()
+    print("Database tests passed")
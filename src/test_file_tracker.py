@@ -0,0 +1,195 @@
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from database import Database, dispose_engine
+from file_tracker import FileTracker
+from memory import MemoryManager
+from models import DirectoryTracked, FileTracked
+
+@contextmanager
+def sqlite_project(*files):
+    """Create a project on a scratch SQLite database holding the given relative files"""
+    scratch = tempfile.mkdtemp()
+    project_dir = os.path.join(scratch, 'project')
+    for path in files:
+        os.makedirs(os.path.join(project_dir, os.path.dirname(path)), exist_ok=True)
+        write_file(project_dir, path, f"# {path}\n")
+    
+    settings = {'RIDGE_DB_BACKEND': 'sqlite', 'RIDGE_SQLITE_PATH': f"{scratch}/ridge.db",
+                'RIDGE_INDEX_DIR': f"{scratch}/index", 'RIDGE_WRITE_BEHIND': '0',
+                'RIDGE_CACHE': 'lru', 'RIDGE_USE_GIT': '0'}
+    saved = {name: os.environ.get(name) for name in settings}
+    os.environ.update(settings)
+    dispose_engine()
+    try:
+        MemoryManager().init_project('tracked', project_dir)
+        yield MemoryManager().current_project
+    finally:
+        dispose_engine()
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+def write_file(project_dir, path, content):
+    with open(os.path.join(project_dir, path), 'w') as f:
+        f.write(content)
+
+def record_hashes(tracker):
+    """Make tracker record every path it reads and hashes"""
+    hashed = []
+    get_file_hash = tracker.get_file_hash
+    def recording(file_path):
+        hashed.append(os.path.basename(file_path))
+        return get_file_hash(file_path)
+    tracker.get_file_hash = recording
+    return hashed
+
+def stored_hashes(project):
+    """Map each tracked file to its stored content hash"""
+    session = Database().get_session()
+    try:
+        return dict(session.query(FileTracked.path, FileTracked.hash).filter_by(project_id=project.id).all())
+    finally:
+        session.close()
+
+def stored_rollups(project):
+    """Map each tracked directory to its stored rollup hash"""
+    session = Database().get_session()
+    try:
+        rows = session.query(DirectoryTracked.path, DirectoryTracked.hash).filter_by(project_id=project.id)
+        return dict(rows.all())
+    finally:
+        session.close()
+
+def rebuilt_rollups(project):
+    """Drop the stored rollups and let a full sync rebuild them from scratch"""
+    session = Database().get_session()
+    try:
+        session.query(DirectoryTracked).filter_by(project_id=project.id).delete()
+        session.commit()
+    finally:
+        session.close()
+    FileTracker().sync_project_files(project)
+    return stored_rollups(project)
+
+def test_apply_changes_updates_rollups():
+    """Test that watch-mode and single-file updates keep directory rollups current"""
+    with sqlite_project('a/x.py', 'a/b/y.py', 'z.py') as project:
+        tracker = FileTracker()
+        tracker.sync_project_files(project)
+        synced = stored_rollups(project)
+        
+        # In-place edit through the watch-mode path
+        write_file(project.path, 'a/x.py', "print('edited')\n")
+        assert [change['status'] for change in tracker.apply_changes(project, ['a/x.py'])] == ['modified']
+        updated = stored_rollups(project)
+        assert updated['a'] != synced['a'] and updated[''] != synced['']
+        assert updated['a/b'] == synced['a/b']
+        assert tracker.sync_project_files(project)['updated'] == 0
+        assert tracker.get_changed_directories(project) == []
+        assert updated == rebuilt_rollups(project)
+        
+        # New file in a new directory through the analyze path
+        os.makedirs(os.path.join(project.path, 'a/c'))
+        write_file(project.path, 'a/c/w.py', "print('new')\n")
+        assert tracker.update_file_tracking(project, 'a/c/w.py')
+        assert tracker.get_changed_directories(project) == []
+        assert stored_rollups(project) == rebuilt_rollups(project)
+
+def test_unchanged_files_skip_hashing():
+    """Test that matching stat signatures skip the read, and that paranoid mode rehashes anyway"""
+    with sqlite_project('a/x.py', 'z.py') as project:
+        FileTracker().sync_project_files(project)
+        
+        tracker = FileTracker()
+        hashed = record_hashes(tracker)
+        assert tracker.sync_project_files(project) == {'new': 0, 'updated': 0, 'unchanged': 2, 'deleted': 0}
+        assert hashed == []
+        
+        # A touched file is read again but its unchanged content is not reported
+        os.utime(os.path.join(project.path, 'z.py'), ns=(1, 1))
+        assert tracker.sync_project_files(project)['updated'] == 0
+        assert hashed == ['z.py']
+        
+        paranoid = FileTracker(paranoid=True)
+        hashed = record_hashes(paranoid)
+        assert paranoid.sync_project_files(project) == {'new': 0, 'updated': 0, 'unchanged': 2, 'deleted': 0}
+        assert sorted(hashed) == ['x.py', 'z.py']
+
+def test_hash_errors_do_not_stall_workers():
+    """Test that a file failing to hash is recorded as missing while the rest still get hashed"""
+    with sqlite_project(*[f"f{i}.py" for i in range(20)]) as project:
+        tracker = FileTracker(hash_workers=2)
+        tracker.hash_queue_size = 1
+        get_file_hash = tracker.get_file_hash
+        def failing(file_path):
+            if file_path.endswith('f3.py'):
+                raise RuntimeError('unreadable')
+            return get_file_hash(file_path)
+        tracker.get_file_hash = failing
+        
+        results = {}
+        paths = [f"f{i}.py" for i in range(20)]
+        hasher = threading.Thread(target=lambda: results.update(tracker.hash_files(project.path, paths)))
+        hasher.start()
+        hasher.join(10)
+        assert not hasher.is_alive()
+        assert results.keys() == set(paths)
+        assert results['f3.py'] is None
+        assert all(results[path] for path in paths if path != 'f3.py')
+
+def test_apply_changes_edits_and_deletes():
+    """Test that watch-mode changes rewrite, delete and sweep the rows for the reported paths"""
+    with sqlite_project('a/x.py', 'a/b/y.py', 'z.py') as project:
+        tracker = FileTracker()
+        tracker.sync_project_files(project)
+        
+        write_file(project.path, 'a/x.py', "print('edited')\n")
+        os.remove(os.path.join(project.path, 'z.py'))
+        changes = tracker.apply_changes(project, ['a/x.py', 'z.py'])
+        assert sorted((change['path'], change['status']) for change in changes) == [
+            ('a/x.py', 'modified'), ('z.py', 'deleted')]
+        hashes = stored_hashes(project)
+        assert hashes.keys() == {'a/x.py', 'a/b/y.py'}
+        assert hashes['a/x.py'] == tracker.get_file_hash(os.path.join(project.path, 'a/x.py'))
+        
+        shutil.rmtree(os.path.join(project.path, 'a/b'))
+        changes = tracker.apply_changes(project, ['a/b' + os.sep])
+        assert [(change['path'], change['status']) for change in changes] == [('a/b/y.py', 'deleted')]
+        assert stored_hashes(project).keys() == {'a/x.py'}
+        assert 'a/b' not in stored_rollups(project)
+        assert tracker.apply_changes(project, []) == []
+
+def test_trusted_dir_mtime_skips_listing():
+    """Test that --trust-dir-mtime only lists directories whose mtime moved"""
+    with sqlite_project('a/x.py', 'b/y.py') as project:
+        tracker = FileTracker(trust_dir_mtime=True)
+        tracker.sync_project_files(project)
+        
+        # In-place writes leave the directory mtime alone, so they go unseen by design
+        write_file(project.path, 'a/x.py', "print('edited')\n")
+        write_file(project.path, 'b/new.py', "print('new')\n")
+        session = Database().get_session()
+        try:
+            diff = tracker._scan_changes(session, project)
+        finally:
+            session.close()
+        assert diff['walk'].skipped_dirs == {'', 'a'}
+        assert [(change['path'], change['status']) for change in diff['changes']] == [('b/new.py', 'new')]
+        assert diff['unchanged'] == 2
+        
+        # Without trust every directory is listed again
+        assert FileTracker().sync_project_files(project)['updated'] == 1
+
+if __name__ == '__main__':
+    test_apply_changes_updates_rollups()
+    test_unchanged_files_skip_hashing()
+    test_hash_errors_do_not_stall_workers()
+    test_apply_changes_edits_and_deletes()
+    test_trusted_dir_mtime_skips_listing()
+    print("File tracker tests passed")
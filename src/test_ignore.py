@@ -0,0 +1,68 @@
+import os
+import tempfile
+
+from ignore import IgnoreMatcher, compile_rule
+
+def write(root, relative_path, content):
+    """Create a file (and its parent directories) under root"""
+    full_path = os.path.join(root, relative_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, 'w') as f:
+        f.write(content)
+
+def test_compile_rule():
+    """Test translation of individual gitignore patterns"""
+    assert compile_rule("# comment") is None
+    assert compile_rule("   ") is None
+
+    rule = compile_rule("*.log")
+    assert rule.regex.match("debug.log")
+    assert rule.regex.match("logs/debug.log")
+    assert not rule.regex.match("debug.log.txt")
+
+    rule = compile_rule("/build")
+    assert rule.regex.match("build")
+    assert not rule.regex.match("src/build")
+
+    rule = compile_rule("docs/**/*.md")
+    assert rule.regex.match("docs/a.md")
+    assert rule.regex.match("docs/x/y/a.md")
+
+    rule = compile_rule("out/")
+    assert rule.dir_only
+
+    rule = compile_rule("!keep.log")
+    assert rule.negated and rule.regex.match("keep.log")
+
+    rule = compile_rule(r"\#notes.txt")
+    assert rule.regex.match("#notes.txt")
+
+def test_nested_ignore_files():
+    """Test nested ignore files, negation and directory-only rules"""
+    root = tempfile.mkdtemp()
+    write(root, '.gitignore', "*.log\n!keep.log\ngenerated/\n/dist\n")
+    write(root, 'pkg/.ridgeignore', "fixtures/*.json\n!keep.log\nkeep.log\n")
+    write(root, '.git/info/exclude', "local.txt\n")
+
+    matcher = IgnoreMatcher(root)
+    assert matcher.is_ignored('debug.log')
+    assert not matcher.is_ignored('keep.log')
+    assert matcher.is_ignored('generated', is_dir=True)
+    assert not matcher.is_ignored('generated')  # A file named like the directory
+    assert matcher.is_ignored('dist', is_dir=True)
+    assert not matcher.is_ignored('pkg/dist', is_dir=True)
+    assert matcher.is_ignored('local.txt')
+
+    # Deeper rules win over parents, and the last matching rule wins within a file
+    assert matcher.is_ignored('pkg/keep.log')
+    assert matcher.is_ignored('pkg/fixtures/data.json')
+    assert not matcher.is_ignored('fixtures/data.json')
+
+    # Paths checked outside a walk account for ignored parent directories
+    assert matcher.is_ignored_path('src/generated/models.py')
+    assert not matcher.is_ignored_path('src/models.py')
+
+if __name__ == '__main__':
+    test_compile_rule()
+    test_nested_ignore_files()
+    print("Ignore matcher tests passed")
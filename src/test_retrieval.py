@@ -0,0 +1,41 @@
+import tempfile
+
+from retrieval import BM25Index, tokenize
+
+def test_tokenize():
+    """Test identifier splitting and stopword removal"""
+    assert tokenize("The FileTracker in file_tracker.py") == ['file', 'tracker', 'file', 'tracker', 'py']
+    assert tokenize(None) == []
+
+def test_bm25_ranking_and_persistence():
+    """Test ranking, replacement and reload from snapshot plus journal"""
+    index_dir = tempfile.mkdtemp()
+
+    index = BM25Index(index_dir)
+    index.add('conversation:1', 'hash files on a thread pool')
+    index.add('conversation:2', 'thread the session through the context manager')
+    index.add('decision:1', 'use a thread pool for hashing')
+    index.save()
+
+    results = index.search('thread pool', limit=5)
+    assert [key for key, _ in results][:2] in (['conversation:1', 'decision:1'], ['decision:1', 'conversation:1'])
+    assert index.search('thread pool', limit=5, prefix='decision:')[0][0] == 'decision:1'
+    assert index.search('unknown words', limit=5) == []
+
+    # Journaled changes survive a reload without another snapshot
+    index.add('conversation:2', 'rewritten without the shared word')
+    index.mark(conversation_id=2)
+
+    reloaded = BM25Index.load(index_dir)
+    assert reloaded.watermarks == {'conversation_id': 2}
+    assert 'conversation:2' not in [key for key, _ in reloaded.search('session context', limit=5)]
+    assert reloaded.search('rewritten', limit=5)[0][0] == 'conversation:2'
+
+    # Compaction drops the replaced document
+    reloaded.save()
+    assert sorted(BM25Index.load(index_dir).doc_keys) == ['conversation:1', 'conversation:2', 'decision:1']
+
+if __name__ == '__main__':
+    test_tokenize()
+    test_bm25_ranking_and_persistence()
+    print("Retrieval tests passed")
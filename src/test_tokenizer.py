@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+from tokenizer import ApproximateTokenizer, count_tokens, count_file_tokens
+
+def test_approximate_counts():
+    """Test that symbols and long words cost more than a flat character ratio"""
+    tokenizer = ApproximateTokenizer()
+    assert tokenizer.count("def f(x):") == 6
+    assert tokenizer.count("internationalization") == 5
+    assert count_tokens(None, '', 'hello') == 2
+
+def test_file_counts_match_text():
+    """Test chunked file counting and unreadable files"""
+    text = "import os\n\nprint(os.getcwd())\n" * 50
+    with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+        f.write(text)
+    try:
+        assert count_file_tokens(f.name) == ApproximateTokenizer().count(text)
+    finally:
+        os.remove(f.name)
+    assert count_file_tokens(f.name) is None
+
+if __name__ == '__main__':
+    test_approximate_counts()
+    test_file_counts_match_text()
+    print("Tokenizer tests passed")
@@ -1,7 +1,8 @@
 import os
-import hashlib
 from pathlib import Path
 
+from hashing import get_hasher
+
 def file_exists(filepath):
     """Check if file exists and is readable"""
     path = Path(filepath)
@@ -24,10 +25,9 @@ def read_file_content(filepath):
         return f"[Error reading {filepath}: {str(e)}]"
 
 def get_file_hash(filepath):
-    """Generate has for file change detection"""
+    """Generate hash for file change detection"""
     try:
-        content = read_file_content(filepath)
-        return hashlib.md5(content.encode()).hexdigest()
+        return get_hasher().hash_file(filepath)
     except Exception:
         return None
 
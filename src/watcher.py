@@ -0,0 +1,259 @@
+# src/watcher.py - Event-driven file watching (inotify with a polling fallback)
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from typing import Callable, Dict, Optional, Set, Tuple
+
+# inotify event masks (see <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+# Returned by wait_for_changes when events were lost and a full rescan is needed
+RESCAN = None
+
+
+class InotifyWatcher:
+    """Recursive directory watcher built on Linux inotify
+
+    Blocks in select() while idle, then debounces bursts of events (git
+    checkout, formatter runs) into a single set of relative paths.
+    """
+
+    mode = 'inotify'
+
+    def __init__(self, root: str, should_watch_dir: Callable[[str], bool],
+                 debounce: float = 0.25, max_latency: float = 2.0):
+        self.root = os.path.abspath(root)
+        self.should_watch_dir = should_watch_dir
+        self.debounce = debounce
+        self.max_latency = max_latency
+        self.watches: Dict[int, str] = {}  # wd -> relative directory
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        try:
+            self._watch_tree('')
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, relative_dir: str) -> None:
+        """Add a watch for one directory"""
+        path = os.path.join(self.root, relative_dir).encode()
+        wd = self.libc.inotify_add_watch(self.fd, path, WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                return  # Directory vanished or is unreadable; nothing to watch
+            raise OSError(error, f"inotify_add_watch failed for {relative_dir or self.root}")
+        self.watches[wd] = relative_dir
+
+    def _watch_tree(self, relative_dir: str) -> Set[str]:
+        """Watch a directory and its non-ignored subdirectories, returning the files found"""
+        files_found = set()
+        pending_dirs = [relative_dir]
+
+        while pending_dirs:
+            current = pending_dirs.pop()
+            self._add_watch(current)
+            try:
+                with os.scandir(os.path.join(self.root, current)) as entries:
+                    for entry in entries:
+                        relative_path = os.path.join(current, entry.name) if current else entry.name
+                        if entry.is_dir(follow_symlinks=False):
+                            if self.should_watch_dir(relative_path):
+                                pending_dirs.append(relative_path)
+                        else:
+                            files_found.add(relative_path)
+            except OSError:
+                continue
+
+        return files_found
+
+    def _unwatch_tree(self, relative_dir: str) -> None:
+        """Drop watches for a directory that moved or was removed"""
+        prefix = relative_dir + os.sep
+        for wd, watched_dir in list(self.watches.items()):
+            if watched_dir == relative_dir or watched_dir.startswith(prefix):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                self.watches.pop(wd, None)
+
+    def _rewatch(self) -> None:
+        """Rebuild the watch set after the kernel queue overflowed
+
+        Events that would have added watches for new directories or dropped
+        them for removed ones were lost, so discard whatever is still queued,
+        re-walk the tree and release watches whose directory is gone.
+        """
+        while True:
+            try:
+                os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+
+        self._watch_tree('')
+        for wd, watched_dir in list(self.watches.items()):
+            if not os.path.isdir(os.path.join(self.root, watched_dir)):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                self.watches.pop(wd, None)
+
+    def _read_events(self, changed: Set[str]) -> bool:
+        """Drain pending events into changed; returns False on queue overflow"""
+        while True:
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return True
+
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _cookie, name_length = EVENT_HEADER.unpack_from(buffer, offset)
+                offset += EVENT_HEADER.size
+                name = buffer[offset:offset + name_length].rstrip(b'\0').decode(errors='surrogateescape')
+                offset += name_length
+
+                if mask & IN_Q_OVERFLOW:
+                    return False
+                if mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+                    continue
+
+                relative_dir = self.watches.get(wd)
+                if relative_dir is None or not name:
+                    continue
+
+                relative_path = os.path.join(relative_dir, name) if relative_dir else name
+                if mask & IN_ISDIR:
+                    if not self.should_watch_dir(relative_path):
+                        continue
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        # Files can land before the new watch exists, so report them all
+                        changed.update(self._watch_tree(relative_path))
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        # Caller resolves everything below this prefix as deleted
+                        self._unwatch_tree(relative_path)
+                        changed.add(relative_path + os.sep)
+                    continue
+
+                changed.add(relative_path)
+
+    def wait_for_changes(self, timeout: Optional[float] = None) -> Optional[Set[str]]:
+        """Block until files change, then return the debounced set of relative paths
+
+        Returns an empty set on timeout and RESCAN if the kernel queue overflowed.
+        Paths ending in os.sep denote removed directories.
+        """
+        changed: Set[str] = set()
+
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return changed
+
+        burst_started = time.monotonic()
+        while True:
+            if not self._read_events(changed):
+                self._rewatch()
+                return RESCAN
+
+            remaining = self.max_latency - (time.monotonic() - burst_started)
+            if remaining <= 0:
+                break
+
+            # Keep collecting until the tree has been quiet for the debounce window
+            ready, _, _ = select.select([self.fd], [], [], min(self.debounce, remaining))
+            if not ready:
+                break
+
+        return changed
+
+    def close(self) -> None:
+        """Release the inotify file descriptor"""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """Fallback watcher that diffs stat signatures on a fixed interval"""
+
+    mode = 'polling'
+
+    def __init__(self, root: str, snapshot: Callable[[], Dict[str, Tuple[int, int, int]]],
+                 interval: float = 2.0):
+        self.root = root
+        self.snapshot = snapshot
+        self.interval = interval
+        self.previous = snapshot()
+
+    def wait_for_changes(self, timeout: Optional[float] = None) -> Optional[Set[str]]:
+        """Sleep for one interval and return paths whose stat signature changed"""
+        time.sleep(self.interval if timeout is None else min(self.interval, timeout))
+
+        current = self.snapshot()
+        changed = {
+            path for path in current.keys() | self.previous.keys()
+            if current.get(path) != self.previous.get(path)
+        }
+        self.previous = current
+        return changed
+
+    def close(self) -> None:
+        """Nothing to release for the polling watcher"""
+        pass
+
+
+def inotify_available() -> bool:
+    """Check whether the running platform exposes inotify through libc"""
+    if not sys.platform.startswith('linux'):
+        return False
+    library = ctypes.util.find_library('c')
+    return bool(library) and hasattr(ctypes.CDLL(library), 'inotify_init1')
+
+
+def create_watcher(root: str, file_tracker, debounce: float = 0.25):
+    """Create an inotify watcher for root, falling back to polling
+
+    Set RIDGE_WATCH_MODE=poll to force the polling watcher.
+    """
+    if os.getenv('RIDGE_WATCH_MODE', 'auto') != 'poll' and inotify_available():
+        matcher = file_tracker.build_ignore_matcher(root)
+
+        def should_watch_dir(relative_dir: str) -> bool:
+            if os.path.basename(relative_dir) in file_tracker.ignored_dirs:
+                return False
+            return matcher is None or not matcher.is_ignored(relative_dir, is_dir=True)
+
+        try:
+            return InotifyWatcher(root, should_watch_dir=should_watch_dir, debounce=debounce)
+        except OSError as e:
+            # ENOSPC means fs.inotify.max_user_watches is exhausted
+            file_tracker.console.print(f"[yellow]inotify unavailable ({e}); falling back to polling[/yellow]")
+
+    return PollingWatcher(root, snapshot=lambda: dict(file_tracker.iter_project_files(root)))